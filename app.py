@@ -2,6 +2,7 @@
 import os
 
 from aws_cdk import App, Aspects, Environment
+from app_components.goals_svc_backend.component import GoalsBackend
 from app_components.project_svc_backend.component import ProjectBackend
 from app_components.frontend.component import FrontEndHosting
 from app_components.shared.component import SharedServices
@@ -22,20 +23,41 @@ ss = SharedServices(
     description=description,
 )
 
+# the app clients whose tokens the APIs accept, tokens of any other client are rejected:
+# cdk deploy -c jwt_audience=<app client id>[,<client id>...] [-c api_type=http]
+jwt_audience = app.node.try_get_context("jwt_audience")
+if isinstance(jwt_audience, str):
+    jwt_audience = jwt_audience.split(",")
+
+gb = GoalsBackend(
+    app,
+    "GoalsSvcBackend" + "Sandbox",
+    description=description,
+    jwt_audience=jwt_audience,
+)
+
 pb = ProjectBackend(
     app,
     "ProjectSvcBackend" + "Sandbox",
     description=description,
     dynamodb_table_name="Projects",
+    api_type=app.node.try_get_context("api_type") or "rest",
+    jwt_audience=jwt_audience,
+    # read by GET /profiles/{profile_id}/dashboard
+    goals_api_url=gb.api_url,
 )
 
 feh = FrontEndHosting(
     app,
     "FrontEndHosting" + "Sandbox",
     description=description,
+    api_domain_name=pb.api_domain_name,
 )
 
+gb.add_dependency(ss)
+pb.add_dependency(gb)
 feh.add_dependency(ss)
+feh.add_dependency(pb)
 
 Aspects.of(app).add(AwsSolutionsChecks())
 
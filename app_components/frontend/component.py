@@ -1,4 +1,4 @@
-from typing import Any
+from typing import Any, Optional
 
 from aws_cdk import (
     Stack,
@@ -6,7 +6,6 @@ from aws_cdk import (
 )
 
 from constructs import Construct
-from cdk_nag import NagSuppressions, NagPackSuppression
 
 from app_components.frontend.hosting.infrastructure import HostedWebApp
 
@@ -16,6 +15,7 @@ class FrontEndHosting(Stack):
         self,
         scope: Construct,
         id_: str,
+        api_domain_name: Optional[str] = None,
         **kwargs: Any,
     ):
         super().__init__(scope, id_, **kwargs)
@@ -23,6 +23,8 @@ class FrontEndHosting(Stack):
         frontend = HostedWebApp(
             self,
             "Identity",
+            # ProjectBackend's API, served under /api/* on the app's own origin
+            api_domain_name=api_domain_name,
         )
 
          # Output the CloudFront URL
@@ -40,17 +42,9 @@ class FrontEndHosting(Stack):
             self, 'UserAppClientId',
             value=frontend.app_client.user_pool_client_id
         )
-        
-        # Suppress the Lambda runtime warning for CDK BucketDeployment
-        NagSuppressions.add_resource_suppressions_by_path(
-            self,
-            "/FrontEndHostingSandbox/Custom::CDKBucketDeployment8693BB64968944B69AAFB0CC9EB8756C/Resource",
-            [
-                NagPackSuppression(
-                    id="AwsSolutions-L1",
-                    reason="CDK BucketDeployment uses a managed Lambda runtime that we cannot control"
-                )
-            ]
-        )
-
 
+        if api_domain_name:
+            self.api_endpoint = CfnOutput(
+                self, 'APIEndpoint',
+                value=f'https://{frontend.react_app_distribution.distribution_domain_name}/api'
+            )
@@ -0,0 +1,94 @@
+#!/usr/bin/env python3
+"""Write brotli and gzip variants of the text files in a web build.
+
+Every file with a compressible extension gets ``<name>.br`` (brotli quality
+11, text mode, 16 MiB window) and ``<name>.gz`` (gzip level 9, zeroed mtime
+so identical inputs give identical bytes) next to it. Both variants are
+always written, even when they don't save anything, so the CloudFront
+Function that picks a variant per ``Accept-Encoding`` never has to know
+which ones exist; its extension list must match ``COMPRESSIBLE_EXTENSIONS``.
+
+Runs as the bundling step of the frontend asset, locally or in Docker:
+
+    python precompress.py /asset-output [--report sizes.json]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+
+import brotli
+
+COMPRESSIBLE_EXTENSIONS = (
+    '.html', '.js', '.mjs', '.css', '.json', '.map', '.svg', '.txt', '.xml', '.webmanifest', '.wasm',
+)
+VARIANT_SUFFIXES = ('.br', '.gz')
+BROTLI_WINDOW_BITS = 24
+
+
+def compressible(name):
+    return name.lower().endswith(COMPRESSIBLE_EXTENSIONS)
+
+
+def compress(data):
+    """Return the brotli and gzip variants of ``data``."""
+    br = brotli.compress(data, mode=brotli.MODE_TEXT, quality=11, lgwin=BROTLI_WINDOW_BITS)
+    gz = gzip.compress(data, compresslevel=9, mtime=0)
+    return br, gz
+
+
+def precompress(build_dir):
+    """Write the variants and return ``{path: {original, br, gz}}`` sizes."""
+    report = {}
+    for root, _, files in os.walk(build_dir):
+        for name in sorted(files):
+            if not compressible(name):
+                continue
+            path = os.path.join(root, name)
+            with open(path, 'rb') as f:
+                data = f.read()
+            br, gz = compress(data)
+            for suffix, variant in zip(VARIANT_SUFFIXES, (br, gz)):
+                with open(path + suffix, 'wb') as f:
+                    f.write(variant)
+            report[os.path.relpath(path, build_dir).replace(os.sep, '/')] = {
+                'original': len(data),
+                'br': len(br),
+                'gz': len(gz),
+            }
+    return report
+
+
+def format_report(report):
+    lines = [f"{'file':<48} {'original':>10} {'br':>10} {'gz':>10}"]
+    totals = {'original': 0, 'br': 0, 'gz': 0}
+    for path, sizes in sorted(report.items()):
+        lines.append(f"{path:<48} {sizes['original']:>10} {sizes['br']:>10} {sizes['gz']:>10}")
+        for key in totals:
+            totals[key] += sizes[key]
+    if totals['original']:
+        lines.append(
+            f"{'total':<48} {totals['original']:>10} {totals['br']:>10} {totals['gz']:>10}"
+            f"  (br {totals['br'] / totals['original']:.0%}, gz {totals['gz'] / totals['original']:.0%})"
+        )
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Write .br and .gz variants of a web build.')
+    parser.add_argument('build_dir')
+    parser.add_argument('--report', help='also write the sizes as JSON to this file')
+    args = parser.parse_args(argv)
+
+    report = precompress(args.build_dir)
+    print(format_report(report))
+    if args.report:
+        with open(args.report, 'w') as f:
+            json.dump(report, f, indent=2, sort_keys=True)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
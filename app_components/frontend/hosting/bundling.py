@@ -0,0 +1,56 @@
+import os
+import shutil
+
+import jsii
+from aws_cdk import BundlingOptions, DockerVolume, ILocalBundling, aws_lambda as lambda_
+
+dirname = os.path.dirname(__file__)
+build_tools_dir = os.path.join(dirname, 'build_tools')
+
+
+@jsii.implements(ILocalBundling)
+class PrecompressBundling:
+    """Local bundling for the web build: a copy with ``.br``/``.gz`` variants.
+
+    ``try_bundle`` returns ``False`` to fall back to Docker when the brotli
+    module is not installed locally, or when ``CDK_DOCKER_BUNDLING`` is set.
+    """
+
+    def __init__(self, source_dir: str):
+        self.source_dir = source_dir
+
+    def try_bundle(self, output_dir: str, options) -> bool:
+        if os.environ.get('CDK_DOCKER_BUNDLING'):
+            return False
+        try:
+            from app_components.frontend.hosting.build_tools import precompress
+        except ImportError:
+            print('PrecompressBundling: brotli is not installed, falling back to Docker')
+            return False
+
+        shutil.copytree(self.source_dir, output_dir, dirs_exist_ok=True)
+        precompress.main([output_dir])
+        return True
+
+
+def precompressed_bundling(source_dir: str) -> BundlingOptions:
+    '''
+    Bundling options that add maximum-level brotli and gzip variants to the
+    text files of source_dir, locally when possible and in Docker otherwise.
+    '''
+    return BundlingOptions(
+        local=PrecompressBundling(source_dir),
+        image=lambda_.Runtime.PYTHON_3_13.bundling_image,
+        volumes=[
+            DockerVolume(
+                host_path=build_tools_dir,
+                container_path='/build-tools'
+            )
+        ],
+        command=[
+            'bash', '-c',
+            'pip install --quiet --target /tmp/brotli brotli && '
+            'cp -r /asset-input/. /asset-output && '
+            'PYTHONPATH=/tmp/brotli python /build-tools/precompress.py /asset-output'
+        ]
+    )
@@ -0,0 +1,282 @@
+"""Incremental deploy of the built React app to the hosting bucket.
+
+A CloudFormation custom resource hands this function the ``dist`` tree as a
+zip asset. Each deploy is a release:
+
+* a manifest of the tree (SHA-256, size, ``Content-Type`` and
+  ``Cache-Control`` per file) is compared with the previous release's, and
+  only new or changed files are uploaded, concurrently: the hashed files
+  first, then, once all of them are in place, the entry points that
+  reference them;
+* ``assets/`` files are content-hashed by Vite and get an immutable,
+  year-long ``Cache-Control``; everything else (``index.html`` and the other
+  entry points) is ``no-cache``;
+* the ``.br``/``.gz`` variants from ``build_tools/precompress.py`` get the
+  ``Content-Type`` of their original and a ``Content-Encoding``;
+* only the changed or removed unhashed paths are invalidated in CloudFront,
+  since a changed hashed file always has a new name;
+* the last ``KeepReleases`` manifests are kept under ``.deploy/``, which the
+  distribution is denied, and any object none of them references is
+  deleted, so clients still running an older ``index.html`` find its chunks
+  while stale ones don't pile up.
+"""
+
+import concurrent.futures
+import hashlib
+import io
+import json
+import logging
+import mimetypes
+import os
+import time
+import zipfile
+
+import boto3
+
+logger = logging.getLogger(__name__)
+
+DEPLOY_PREFIX = '.deploy/'
+RELEASES_KEY = DEPLOY_PREFIX + 'releases.json'
+HASHED_PREFIX = 'assets/'
+UPLOAD_WORKERS = int(os.environ.get('UPLOAD_WORKERS', 16))
+DEFAULT_KEEP_RELEASES = 3
+DEFAULT_ASSET_MAX_AGE = 365 * 24 * 3600
+ENTRY_CACHE_CONTROL = 'no-cache'
+DEFAULT_CONTENT_TYPE = 'application/octet-stream'
+# not in every mimetypes table
+CONTENT_TYPES = {
+    '.js': 'text/javascript',
+    '.mjs': 'text/javascript',
+    '.css': 'text/css',
+    '.html': 'text/html',
+    '.json': 'application/json',
+    '.map': 'application/json',
+    '.svg': 'image/svg+xml',
+    '.webmanifest': 'application/manifest+json',
+    '.woff2': 'font/woff2',
+    '.txt': 'text/plain',
+}
+TEXT_TYPES = ('text/', 'application/json', 'application/manifest+json', 'image/svg+xml')
+# variants written by build_tools/precompress.py
+ENCODINGS = {'.br': 'br', '.gz': 'gzip'}
+
+
+def encoding(path):
+    """The ``Content-Encoding`` of a precompressed variant, and its original's path."""
+    for suffix, coding in ENCODINGS.items():
+        if path.endswith(suffix):
+            return coding, path[:-len(suffix)]
+    return None, path
+
+
+def content_type(path):
+    _, path = encoding(path)
+    _, ext = os.path.splitext(path)
+    ctype = CONTENT_TYPES.get(ext.lower()) or mimetypes.guess_type(path)[0] or DEFAULT_CONTENT_TYPE
+    if ctype.startswith(TEXT_TYPES) and 'charset' not in ctype:
+        ctype += '; charset=utf-8'
+    return ctype
+
+
+def is_hashed(path):
+    return path.startswith(HASHED_PREFIX)
+
+
+def cache_control(path, asset_max_age=DEFAULT_ASSET_MAX_AGE):
+    if is_hashed(path):
+        return f'public, max-age={asset_max_age}, immutable'
+    return ENTRY_CACHE_CONTROL
+
+
+def build_manifest(files, asset_max_age=DEFAULT_ASSET_MAX_AGE):
+    """``{path: entry}`` for ``files``, an iterable of ``(path, bytes)``."""
+    manifest = {}
+    for path, data in files:
+        entry = manifest[path] = {
+            'sha256': hashlib.sha256(data).hexdigest(),
+            'size': len(data),
+            'content_type': content_type(path),
+            'cache_control': cache_control(path, asset_max_age),
+        }
+        coding, _ = encoding(path)
+        if coding:
+            entry['content_encoding'] = coding
+    return manifest
+
+
+def diff(manifest, previous):
+    """The paths to upload and the paths that are gone since ``previous``."""
+    changed = sorted(path for path, entry in manifest.items() if previous.get(path) != entry)
+    removed = sorted(set(previous) - set(manifest))
+    return changed, removed
+
+
+def invalidation_paths(paths):
+    """CloudFront paths for the unhashed files among ``paths``."""
+    result = set()
+    for path in paths:
+        if is_hashed(path):
+            continue
+        result.add('/' + path)
+        if path == 'index.html' or path.endswith('/index.html'):
+            # served for the directory through the default root object
+            result.add('/' + path[:-len('index.html')])
+    return sorted(result)
+
+
+def read_zip(data):
+    with zipfile.ZipFile(io.BytesIO(data)) as archive:
+        return [
+            (info.filename, archive.read(info))
+            for info in archive.infolist()
+            if not info.is_dir()
+        ]
+
+
+class Releases:
+    """Release manifests kept in the hosting bucket, oldest first."""
+
+    def __init__(self, s3, bucket):
+        self.s3 = s3
+        self.bucket = bucket
+
+    def _get_json(self, key, default):
+        try:
+            body = self.s3.get_object(Bucket=self.bucket, Key=key)['Body'].read()
+        except self.s3.exceptions.NoSuchKey:
+            return default
+        return json.loads(body)
+
+    def _put_json(self, key, value):
+        self.s3.put_object(
+            Bucket=self.bucket,
+            Key=key,
+            Body=json.dumps(value, separators=(',', ':')).encode(),
+            ContentType='application/json',
+            CacheControl='no-store',
+        )
+
+    def ids(self):
+        return self._get_json(RELEASES_KEY, [])
+
+    def manifest(self, release_id):
+        return self._get_json(f'{DEPLOY_PREFIX}{release_id}.json', {})
+
+    def record(self, release_id, manifest, keep):
+        """Add a release, keeping only the last ``keep``."""
+        self._put_json(f'{DEPLOY_PREFIX}{release_id}.json', manifest)
+        ids = [i for i in self.ids() if i != release_id] + [release_id]
+        self._put_json(RELEASES_KEY, ids[-keep:])
+
+
+def upload(s3, bucket, files, manifest, paths):
+    data = dict(files)
+
+    def put(path):
+        entry = manifest[path]
+        params = {}
+        if 'content_encoding' in entry:
+            params['ContentEncoding'] = entry['content_encoding']
+        s3.put_object(
+            Bucket=bucket,
+            Key=path,
+            Body=data[path],
+            ContentType=entry['content_type'],
+            CacheControl=entry['cache_control'],
+            **params,
+        )
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers=UPLOAD_WORKERS) as executor:
+        # an entry point must not go live before the chunks it references;
+        # list() waits for every upload of a phase and re-raises the first failure
+        list(executor.map(put, [path for path in paths if is_hashed(path)]))
+        list(executor.map(put, [path for path in paths if not is_hashed(path)]))
+
+
+def collect_garbage(s3, bucket, releases):
+    """Delete objects that none of the kept releases reference.
+
+    The manifests of releases that are no longer kept go the same way.
+    """
+    referenced = {RELEASES_KEY}
+    for release_id in releases.ids():
+        referenced.add(f'{DEPLOY_PREFIX}{release_id}.json')
+        referenced.update(releases.manifest(release_id))
+
+    garbage = []
+    for page in s3.get_paginator('list_objects_v2').paginate(Bucket=bucket):
+        garbage.extend(obj['Key'] for obj in page.get('Contents', []) if obj['Key'] not in referenced)
+
+    for start in range(0, len(garbage), 1000):
+        s3.delete_objects(
+            Bucket=bucket,
+            Delete={'Objects': [{'Key': key} for key in garbage[start:start + 1000]], 'Quiet': True},
+        )
+    return garbage
+
+
+def deploy(files, *, bucket, release_id, distribution_id=None, keep=DEFAULT_KEEP_RELEASES,
+           asset_max_age=DEFAULT_ASSET_MAX_AGE, s3=None, cloudfront=None):
+    """Publish ``files`` as release ``release_id`` and return what was done."""
+    s3 = s3 or boto3.client('s3')
+    releases = Releases(s3, bucket)
+    ids = releases.ids()
+    previous = releases.manifest(ids[-1]) if ids else {}
+
+    manifest = build_manifest(files, asset_max_age)
+    changed, removed = diff(manifest, previous)
+    upload(s3, bucket, files, manifest, changed)
+    releases.record(release_id, manifest, keep)
+
+    # nothing is known about what the edge holds before the first release
+    invalidated = invalidation_paths(changed + removed) if previous else ['/*']
+    if distribution_id and invalidated:
+        (cloudfront or boto3.client('cloudfront')).create_invalidation(
+            DistributionId=distribution_id,
+            InvalidationBatch={
+                'Paths': {'Quantity': len(invalidated), 'Items': invalidated},
+                'CallerReference': f'{release_id}-{time.time_ns()}',
+            },
+        )
+
+    deleted = collect_garbage(s3, bucket, releases)
+    return {
+        'release_id': release_id,
+        'files': len(manifest),
+        'uploaded': changed,
+        'removed': removed,
+        'invalidated': invalidated,
+        'deleted': deleted,
+        'uploaded_bytes': sum(manifest[path]['size'] for path in changed),
+    }
+
+
+# CloudFormation custom resource handler (through the cdk Provider framework)
+def on_event(event, context):
+    logging.getLogger().setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+    props = event['ResourceProperties']
+    physical_id = f"{props['DestinationBucket']}-deployment"
+    if event['RequestType'] == 'Delete':
+        # the bucket empties itself when it is removed
+        return {'PhysicalResourceId': physical_id}
+
+    s3 = boto3.client('s3')
+    archive = s3.get_object(Bucket=props['SourceBucket'], Key=props['SourceKey'])['Body'].read()
+    result = deploy(
+        read_zip(archive),
+        bucket=props['DestinationBucket'],
+        release_id=props['ReleaseId'],
+        distribution_id=props.get('DistributionId'),
+        keep=int(props.get('KeepReleases', DEFAULT_KEEP_RELEASES)),
+        asset_max_age=int(props.get('AssetMaxAge', DEFAULT_ASSET_MAX_AGE)),
+        s3=s3,
+    )
+    logger.info(
+        'release %s: %s files, %s uploaded (%s bytes), %s removed, %s deleted, invalidated %s',
+        result['release_id'], result['files'], len(result['uploaded']), result['uploaded_bytes'],
+        len(result['removed']), len(result['deleted']), result['invalidated'],
+    )
+    return {
+        'PhysicalResourceId': physical_id,
+        'Data': {'Uploaded': len(result['uploaded']), 'Deleted': len(result['deleted'])},
+    }
@@ -0,0 +1,34 @@
+// Viewer request: serve the .br or .gz variant written by build_tools/precompress.py.
+// The rewritten URI is the cache key, so each encoding is cached separately.
+// Keep the extension list in sync with COMPRESSIBLE_EXTENSIONS in precompress.py.
+var COMPRESSIBLE = /\.(html|js|mjs|css|json|map|svg|txt|xml|webmanifest|wasm)$/i;
+
+function accepts(header, coding) {
+    var codings = header.split(',');
+    for (var i = 0; i < codings.length; i++) {
+        var params = codings[i].split(';');
+        if (params[0].trim().toLowerCase() === coding) {
+            // "br;q=0" explicitly refuses the coding
+            return !(params.length > 1 && /^q=0(\.0*)?$/.test(params[1].trim()));
+        }
+    }
+    return false;
+}
+
+function handler(event) {
+    var request = event.request;
+    var uri = request.uri;
+    if (uri.endsWith('/')) {
+        uri += 'index.html';
+    }
+    var header = request.headers['accept-encoding'];
+    if (header && COMPRESSIBLE.test(uri)) {
+        if (accepts(header.value, 'br')) {
+            uri += '.br';
+        } else if (accepts(header.value, 'gzip')) {
+            uri += '.gz';
+        }
+    }
+    request.uri = uri;
+    return request;
+}
@@ -11,18 +11,50 @@ from aws_cdk import (
     aws_lambda_event_sources as event_source,
     aws_cloudfront_origins as origins,
     aws_cloudfront as cloudfront,
-    aws_s3_deployment as s3deploy,
+    aws_s3_assets as s3_assets,
+    aws_lambda as lambda_,
+    custom_resources as cr,
+    CustomResource,
     RemovalPolicy,
     aws_cognito as cognito)
 from constructs import Construct
 from cdk_nag import NagSuppressions, NagPackSuppression
 import os.path
+from typing import Optional
+
+from app_components.frontend.hosting.bundling import precompressed_bundling
+
+DIST_PATH = os.path.join(os.path.dirname(__file__), '../vite-tanstack-router-app/dist')
 
 class HostedWebApp(Construct):
+    '''
+    The React app in a private bucket behind CloudFront.
+
+    Vite emits content-hashed files under /assets/, so they are cached for
+    asset_max_age at the edge and in browsers and marked immutable. Everything
+    else (index.html and the other entry points) is revalidated on every
+    request, so a deploy is visible at once without evicting the assets.
+
+    Text files are shipped with maximum-level brotli and gzip variants, and a
+    CloudFront Function serves the best one the viewer accepts.
+
+    With api_domain_name, /api/* is routed to that API Gateway stage, so the app
+    calls its API on its own origin.
+
+    Deploys are incremental releases: only changed files are uploaded and only
+    changed entry points invalidated, and the assets of the last keep_releases
+    releases stay in the bucket for clients still running an older index.html.
+    '''
+
     def __init__(
         self,
         scope: Construct,
-        id_: str
+        id_: str,
+        *,
+        dist_path: str = DIST_PATH,
+        asset_max_age: Duration = Duration.days(365),
+        keep_releases: int = 3,
+        api_domain_name: Optional[str] = None
     ):
         super().__init__(scope, id_)
 
@@ -40,21 +72,152 @@ class HostedWebApp(Construct):
         
         )
 
+        hosting_origin = origins.S3BucketOrigin.with_origin_access_control(hosting_bucket, origin_access_levels=[cloudfront.AccessLevel.READ, cloudfront.AccessLevel.READ_VERSIONED, cloudfront.AccessLevel.WRITE, cloudfront.AccessLevel.DELETE])
+
+        #both behaviors pick a .br/.gz variant by Accept-Encoding (serve_precompressed below), so
+        #shared caches past CloudFront must key on it as well; S3 sends no Vary of its own here
+        vary_accept_encoding = cloudfront.ResponseCustomHeader(
+            header='Vary',
+            value='Accept-Encoding',
+            override=True
+        )
+
+        #hashed assets never change under the same name: cache them for as long as allowed
+        asset_cache_policy = cloudfront.CachePolicy(
+            self,
+            'AssetCachePolicy',
+            comment='content-hashed build assets',
+            default_ttl=asset_max_age,
+            min_ttl=asset_max_age,
+            max_ttl=asset_max_age,
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True
+        )
+
+        asset_headers_policy = cloudfront.ResponseHeadersPolicy(
+            self,
+            'AssetHeadersPolicy',
+            comment='immutable caching for content-hashed build assets',
+            custom_headers_behavior=cloudfront.ResponseCustomHeadersBehavior(
+                custom_headers=[
+                    cloudfront.ResponseCustomHeader(
+                        header='Cache-Control',
+                        value=f'public, max-age={int(asset_max_age.to_seconds())}, immutable',
+                        override=True
+                    ),
+                    vary_accept_encoding
+                ]
+            )
+        )
+
+        #index.html and other entry points: the edge revalidates with S3 (ETag) on every request
+        html_cache_policy = cloudfront.CachePolicy(
+            self,
+            'HtmlCachePolicy',
+            comment='index.html and other unhashed entry points',
+            default_ttl=Duration.seconds(0),
+            min_ttl=Duration.seconds(0),
+            max_ttl=Duration.minutes(5),
+            enable_accept_encoding_gzip=True,
+            enable_accept_encoding_brotli=True
+        )
+
+        html_headers_policy = cloudfront.ResponseHeadersPolicy(
+            self,
+            'HtmlHeadersPolicy',
+            comment='browsers revalidate index.html and other unhashed entry points',
+            custom_headers_behavior=cloudfront.ResponseCustomHeadersBehavior(
+                custom_headers=[
+                    cloudfront.ResponseCustomHeader(
+                        header='Cache-Control',
+                        value='no-cache',
+                        override=True
+                    ),
+                    vary_accept_encoding
+                ]
+            )
+        )
+
+        #the build ships .br/.gz variants of its text files (see build_tools/precompress.py);
+        #pick one per Accept-Encoding before the cache lookup
+        serve_precompressed = cloudfront.Function(
+            self,
+            'ServePrecompressed',
+            comment='serves the brotli or gzip variant of text assets',
+            runtime=cloudfront.FunctionRuntime.JS_2_0,
+            code=cloudfront.FunctionCode.from_file(
+                file_path=os.path.join(os.path.dirname(__file__), 'functions', 'serve_precompressed.js')
+            )
+        )
+        precompressed_associations = [
+            cloudfront.FunctionAssociation(
+                function=serve_precompressed,
+                event_type=cloudfront.FunctionEventType.VIEWER_REQUEST
+            )
+        ]
+
         self.react_app_distribution = cloudfront.Distribution(
             self,
             'react-router-app-cdnDistro',
             default_behavior=cloudfront.BehaviorOptions(
-                origin=origins.S3BucketOrigin.with_origin_access_control(hosting_bucket, origin_access_levels=[cloudfront.AccessLevel.READ, cloudfront.AccessLevel.READ_VERSIONED, cloudfront.AccessLevel.WRITE, cloudfront.AccessLevel.DELETE]),
+                origin=hosting_origin,
                 viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
-                cache_policy=cloudfront.CachePolicy.CACHING_OPTIMIZED,
-                origin_request_policy=cloudfront.OriginRequestPolicy.CORS_S3_ORIGIN
+                cache_policy=html_cache_policy,
+                origin_request_policy=cloudfront.OriginRequestPolicy.CORS_S3_ORIGIN,
+                response_headers_policy=html_headers_policy,
+                function_associations=precompressed_associations,
+                compress=True
             ),
+            additional_behaviors={
+                '/assets/*': cloudfront.BehaviorOptions(
+                    origin=hosting_origin,
+                    viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.REDIRECT_TO_HTTPS,
+                    cache_policy=asset_cache_policy,
+                    origin_request_policy=cloudfront.OriginRequestPolicy.CORS_S3_ORIGIN,
+                    response_headers_policy=asset_headers_policy,
+                    function_associations=precompressed_associations,
+                    compress=True
+                )
+            },
             default_root_object='index.html',
             enable_logging=False,
             minimum_protocol_version=cloudfront.SecurityPolicyProtocol.TLS_V1_2_2021,
             price_class=cloudfront.PriceClass.PRICE_CLASS_100
         )
 
+        if api_domain_name:
+            #API Gateway stage (named 'api') on the same origin: /api/* is proxied as-is, so no CORS preflights
+            api_cache_policy = cloudfront.CachePolicy(
+                self,
+                'ApiCachePolicy',
+                comment='API responses: honour the origin Cache-Control, keyed on caller, path and query',
+                default_ttl=Duration.seconds(0),
+                min_ttl=Duration.seconds(0),
+                max_ttl=Duration.days(1),
+                #Authorization is part of the key, so one caller never gets another's cached response
+                header_behavior=cloudfront.CacheHeaderBehavior.allow_list('Authorization'),
+                query_string_behavior=cloudfront.CacheQueryStringBehavior.all(),
+                cookie_behavior=cloudfront.CacheCookieBehavior.none(),
+                enable_accept_encoding_gzip=True,
+                enable_accept_encoding_brotli=True
+            )
+
+            self.react_app_distribution.add_behavior(
+                '/api/*',
+                origins.HttpOrigin(
+                    api_domain_name,
+                    protocol_policy=cloudfront.OriginProtocolPolicy.HTTPS_ONLY,
+                    origin_ssl_protocols=[cloudfront.OriginSslPolicy.TLS_V1_2]
+                ),
+                viewer_protocol_policy=cloudfront.ViewerProtocolPolicy.HTTPS_ONLY,
+                allowed_methods=cloudfront.AllowedMethods.ALLOW_ALL,
+                cached_methods=cloudfront.CachedMethods.CACHE_GET_HEAD,
+                cache_policy=api_cache_policy,
+                #API Gateway routes on its own Host header
+                origin_request_policy=cloudfront.OriginRequestPolicy.ALL_VIEWER_EXCEPT_HOST_HEADER,
+                compress=True
+            )
+
         hosting_bucket.add_to_resource_policy(
             iam.PolicyStatement(
                 actions=["s3:GetObject"],
@@ -67,6 +230,15 @@ class HostedWebApp(Construct):
                 }
             )
         )
+        #the deployer's release manifests (deployer.DEPLOY_PREFIX) are not part of the site
+        hosting_bucket.add_to_resource_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.DENY,
+                actions=["s3:GetObject"],
+                resources=[hosting_bucket.arn_for_objects(".deploy/*")],
+                principals=[iam.ServicePrincipal("cloudfront.amazonaws.com")]
+            )
+        )
         react_app_domain_name = self.react_app_distribution.distribution_domain_name
         shared_user_pool_arn = Fn.import_value("CognitoUserPoolArn")
 
@@ -125,7 +297,7 @@ class HostedWebApp(Construct):
             ]
         )
 
-        # Create a custom IAM role for the BucketDeployment with CloudFront invalidation permissions
+        # Create a custom IAM role for the deployer with CloudFront invalidation permissions
         deployment_role = iam.Role(
             self, 'CloudFrontInvalidationRole',
             assumed_by=iam.ServicePrincipal('lambda.amazonaws.com')
@@ -138,7 +310,12 @@ class HostedWebApp(Construct):
                     "cloudfront:GetInvalidation",
                     "cloudfront:CreateInvalidation"
                 ],
-                resources=["*"]
+                resources=[Stack.of(self).format_arn(
+                    service='cloudfront',
+                    region='',
+                    resource='distribution',
+                    resource_name=self.react_app_distribution.distribution_id
+                )]
             )
         )
         
@@ -165,15 +342,52 @@ class HostedWebApp(Construct):
             )
         )
         
-        # Deploy the React app to S3 with the custom role
-        deployment = s3deploy.BucketDeployment(
-            self, 'DeployReactApp',
-            sources=[s3deploy.Source.asset(os.path.join(os.path.dirname(__file__), '../vite-tanstack-router-app/dist'))],
-            destination_bucket=hosting_bucket,
-            distribution=self.react_app_distribution,
-            distribution_paths=['/*'],  # Invalidate all cached files after deployment
-            prune=False,  # Don't delete files that no longer exist in the source
-            role=deployment_role  # Use our custom role with CloudFront permissions
+        # Deployer: uploads only what changed since the last release, invalidates the changed
+        # entry points and deletes objects no kept release references (see deployer/deployer.py)
+        dist_asset = s3_assets.Asset(
+            self,
+            'ReactAppDist',
+            path=dist_path,
+            bundling=precompressed_bundling(dist_path)
+        )
+        dist_asset.grant_read(deployment_role)
+
+        deployer_lambda = lambda_.Function(
+            self,
+            'DeployerLambda',
+            description='incrementally deploys the React app build to the hosting bucket',
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            code=lambda_.Code.from_asset(os.path.join(os.path.dirname(__file__), 'deployer')),
+            handler='deployer.on_event',
+            role=deployment_role,
+            memory_size=1024,
+            timeout=Duration.minutes(10),
+            environment={
+                'LOG_LEVEL': log_level
+            }
+        )
+
+        deployer_provider = cr.Provider(
+            self,
+            'DeployerProvider',
+            on_event_handler=deployer_lambda
+        )
+
+        self.deployment = CustomResource(
+            self,
+            'DeployReactApp',
+            service_token=deployer_provider.service_token,
+            resource_type='Custom::IncrementalDeployment',
+            properties={
+                'SourceBucket': dist_asset.s3_bucket_name,
+                'SourceKey': dist_asset.s3_object_key,
+                # a new release whenever the build output changes
+                'ReleaseId': dist_asset.asset_hash,
+                'DestinationBucket': hosting_bucket.bucket_name,
+                'DistributionId': self.react_app_distribution.distribution_id,
+                'KeepReleases': str(keep_releases),
+                'AssetMaxAge': str(int(asset_max_age.to_seconds()))
+            }
         )
 
         #Suppressions
@@ -212,21 +426,23 @@ class HostedWebApp(Construct):
             ]
         )
 
-        # 3. Suppress BucketDeployment construct IAM errors
-        custom_resource_construct = deployment.node.find_child("CustomResourceHandler")
-        if custom_resource_construct:
-            NagSuppressions.add_resource_suppressions(
-                custom_resource_construct,
-                apply_to_children=True,
-                suppressions=[
-                    NagPackSuppression(
-                        id="AwsSolutions-IAM5",
-                        reason="CDK BucketDeployment uses wildcard permissions for S3 operations, which is required for deployment functionality."
-                    )
-                ]
-            )
+        # 3. Suppress the Provider framework's IAM errors
+        NagSuppressions.add_resource_suppressions(
+            deployer_provider,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id="AwsSolutions-IAM4",
+                    reason="The CDK Provider framework function uses the AWS Lambda Basic Execution Role to write logs."
+                ),
+                NagPackSuppression(
+                    id="AwsSolutions-IAM5",
+                    reason="The CDK Provider framework may invoke every version of the deployer function."
+                )
+            ]
+        )
 
-        # 4. Suppress the Lambda CDK BucketDeployment service role IAM errors
+        # 4. Suppress the deployer role IAM errors
         # Apply suppressions directly to our custom role
         NagSuppressions.add_resource_suppressions(
             deployment_role,
@@ -238,25 +454,11 @@ class HostedWebApp(Construct):
                 ),
                 NagPackSuppression(
                     id="AwsSolutions-IAM5",
-                    reason="CDK BucketDeployment requires these S3 permissions to deploy assets from source to destination bucket."
+                    reason="The deployer uploads, lists and deletes objects anywhere in the hosting bucket and reads the build asset."
                 )
             ]
         )
         
-        # Try to find the bucket deployment construct for Lambda runtime suppression
-        for child in self.node.children:
-            if "CDKBucketDeployment" in child.node.id:
-                NagSuppressions.add_resource_suppressions(
-                    child,
-                    suppressions=[
-                        NagPackSuppression(
-                            id="AwsSolutions-L1",
-                            reason="Using CDK provided Lambda runtime which is managed by AWS CDK team."
-                        )
-                    ]
-                )
-                break
-
         # 5. Add resource-level suppressions for any remaining resources that might be harder to target directly
         # Note: Stack-level suppressions should be applied at the Stack level, not in this construct
         NagSuppressions.add_resource_suppressions(
@@ -265,11 +467,11 @@ class HostedWebApp(Construct):
             suppressions=[
                 NagPackSuppression(
                     id="AwsSolutions-IAM5",
-                    reason="Wildcard permissions required by CDK BucketDeployment custom resource."
+                    reason="Wildcard permissions required by the deployer custom resource."
                 ),
                 NagPackSuppression(
                     id="AwsSolutions-L1",
-                    reason="Using CDK provided Lambda runtime which is managed by AWS CDK team."
+                    reason="The Provider framework uses a CDK provided Lambda runtime which is managed by AWS CDK team."
                 )
             ]
         )
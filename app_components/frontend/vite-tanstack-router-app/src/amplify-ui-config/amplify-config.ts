@@ -18,6 +18,8 @@ const amplifyConfigTemplate: AmplifyConfig = {
     REST: {
       // First API - YourFirstAPIName
       AppSvcAPI: {
+        // FrontEndHosting's APIEndpoint output, 'https://<distribution>.cloudfront.net/api':
+        // same origin as the app, so requests need no CORS preflight
         endpoint: 'APPSVC_API_ENDPOINT', //'https://api.execute-api.region.amazonaws.com/stage'
       }
       
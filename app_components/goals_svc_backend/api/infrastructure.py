@@ -0,0 +1,204 @@
+import os
+from typing import Optional, Sequence
+
+from aws_cdk import (
+    Duration,
+    Stack,
+    aws_lambda as lambda_,
+    aws_iam as iam,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_authorizers as apigwv2_authorizers,
+    aws_apigatewayv2_integrations as apigwv2_integrations,
+    aws_dynamodb as dynamodb)
+from constructs import Construct
+from cdk_nag import NagSuppressions, NagPackSuppression
+
+from app_components.project_svc_backend.api.bundling import runtime_code, runtime_dir as shared_runtime_dir
+
+goals_runtime_dir = os.path.join(os.path.dirname(__file__), 'runtime')
+
+
+class GoalsAPI(Construct):
+    '''
+    HTTP API (payload format 2.0) for a profile's goals.
+
+    The function runs goals.main from this component's runtime directory,
+    bundled on top of the project service's runtime modules so it shares the
+    adapter, auth, metrics and clients modules; it reads and writes only the
+    goals table. With jwt_audience set the routes sit behind a Cognito JWT
+    authorizer; the function verifies the tokens either way, as the /profiles
+    routes of the project API do, and rejects every request when
+    user_pool_id or jwt_audience is not set.
+    '''
+
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        table: dynamodb.ITable,
+        runtime: lambda_.Runtime = lambda_.Runtime.PYTHON_3_13,
+        architecture: lambda_.Architecture = lambda_.Architecture.X86_64,
+        memory_size: int = 512,
+        emit_metrics: bool = True,
+        metrics_namespace: str = 'GoalsAPI',
+        user_pool_id: Optional[str] = None,
+        jwt_audience: Optional[Sequence[str]] = None
+    ):
+        super().__init__(scope, id_)
+
+        function_name = 'goals-svc-lambda-flask'
+        stack = Stack.of(self)
+
+        goals_lambda_role = iam.Role(
+            self,
+            'GoalsLambdaRole',
+            assumed_by=iam.ServicePrincipal('lambda.amazonaws.com')
+        )
+
+        goals_lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    'logs:CreateLogGroup',
+                    'logs:CreateLogStream',
+                    'logs:PutLogEvents'
+                ],
+                resources=[':'.join([
+                    'arn',
+                    'aws',
+                    'logs',
+                    stack.region,
+                    stack.account,
+                    'log-group',
+                    f'/aws/lambda/{function_name}',
+                    '*'
+                ])]
+            )
+        )
+
+        self.goals_lambda = lambda_.Function(
+            self,
+            'GoalsLambda',
+            description='flask compute serving the goals of a profile',
+            function_name=function_name,
+            runtime=runtime,
+            architecture=architecture,
+            code=runtime_code(
+                goals_runtime_dir,
+                runtime=runtime,
+                architecture=architecture,
+                shared_dirs=[shared_runtime_dir],
+                entry_module='goals'
+            ),
+            role=goals_lambda_role,
+            handler='goals.main',
+            memory_size=memory_size,
+            timeout=Duration.seconds(10),
+            environment={
+                'LOG_LEVEL': 'INFO',
+                'GOALS_TABLE_NAME': table.table_name,
+                'METRICS_ENABLED': str(emit_metrics).lower(),
+                'METRICS_NAMESPACE': metrics_namespace
+            }
+        )
+
+        if user_pool_id:
+            self.goals_lambda.add_environment('COGNITO_USER_POOL_ID', user_pool_id)
+            self.goals_lambda.add_environment('COGNITO_REGION', stack.region)
+            self.goals_lambda.add_environment('COGNITO_APP_CLIENT_IDS', ','.join(jwt_audience or []))
+
+        table.grant_read_write_data(self.goals_lambda)
+
+        self.goals_alias = lambda_.Alias(
+            self,
+            'GoalsLiveAlias',
+            alias_name='live',
+            version=self.goals_lambda.current_version
+        )
+
+        integration = apigwv2_integrations.HttpLambdaIntegration(
+            'GoalsIntegration',
+            self.goals_alias,
+            payload_format_version=apigwv2.PayloadFormatVersion.VERSION_2_0
+        )
+
+        authorizer = None
+        if jwt_audience:
+            authorizer = apigwv2_authorizers.HttpJwtAuthorizer(
+                'GoalsJwtAuthorizer',
+                f'https://cognito-idp.{stack.region}.amazonaws.com/{user_pool_id}',
+                jwt_audience=list(jwt_audience)
+            )
+
+        self.http_api = apigwv2.HttpApi(
+            self,
+            'goals-http-api',
+            description='HTTP API for the goals service',
+            create_default_stage=False,
+            default_authorizer=authorizer
+        )
+
+        self.http_api.add_routes(
+            path='/profiles/{profile_id}/goals',
+            methods=[apigwv2.HttpMethod.GET],
+            integration=integration
+        )
+
+        self.http_api.add_routes(
+            path='/profiles/{profile_id}/goals/{goal_id}',
+            methods=[apigwv2.HttpMethod.PUT, apigwv2.HttpMethod.DELETE],
+            integration=integration
+        )
+
+        #same /api base path as the project API; the adapter strips it from rawPath
+        stage = self.http_api.add_stage(
+            'ApiStage',
+            stage_name='api',
+            auto_deploy=True
+        )
+        self.api_url = stage.url
+
+        NagSuppressions.add_resource_suppressions(
+            goals_lambda_role,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-IAM5',
+                    reason='Wildcards are scoped to the log group and the table indexes'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            self.goals_lambda,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-L1',
+                    reason='runtime version selected based on dependency support'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            stage,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-APIG1',
+                    reason='Access logging is not required for this development API'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            self.http_api,
+            apply_to_children=True,
+            suppressions=[
+                {
+                    "id": "AwsSolutions-APIG4",
+                    "reason": "Routes use the Cognito JWT authorizer when jwt_audience is set; the function verifies tokens either way and rejects every request when user_pool_id or jwt_audience is not set"
+                }
+            ]
+        )
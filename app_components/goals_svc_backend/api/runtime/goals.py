@@ -0,0 +1,124 @@
+#!/usr/bin/env python3
+"""Goals service: a profile's goals, in their own table.
+
+Runs as its own function (``goals.main``) behind its own API. Its asset is
+this directory on top of the project service's runtime modules (adapter,
+auth, repository, ...), which it imports by top-level name. Goals use the project service's key
+conventions in a table of their own:
+
+=====  ====================  ================
+item   pk                    sk
+=====  ====================  ================
+goal   ``PROFILE#<owner>``   ``GOAL#<id>``
+=====  ====================  ================
+
+so one ``Query`` on the profile's partition lists its goals. The project
+service reads them over HTTP for its dashboard (see ``handler.dashboard``).
+"""
+
+import os
+
+from flask import Flask, jsonify, abort, request
+from werkzeug.exceptions import HTTPException
+
+import adapter
+import auth
+import conditional
+import fastjson
+import metrics
+import schemas
+from repository import InvalidCursorError, Repository, MANAGED_ATTRIBUTES
+
+GOAL_PREFIX = 'GOAL#'
+PROFILE_PREFIX = 'PROFILE#'
+MAX_PAGE_SIZE = 100
+
+
+def goal_key(profile_id, goal_id):
+    return {'pk': f'{PROFILE_PREFIX}{profile_id}', 'sk': f'{GOAL_PREFIX}{goal_id}'}
+
+
+class GoalRepository(Repository):
+    """Goal reads and writes; versioning and pagination as in ``Repository``."""
+
+    def __init__(self, table_name=None, **kwargs):
+        super().__init__(table_name or os.environ.get('GOALS_TABLE_NAME', 'Goals'), **kwargs)
+
+    def put_goal(self, profile_id, goal_id, attributes):
+        values = {k: v for k, v in attributes.items() if k not in MANAGED_ATTRIBUTES + ('profile_id',)}
+        values.update({'id': goal_id, 'profile_id': profile_id})
+        return self._update(goal_key(profile_id, goal_id), values)
+
+    def delete_goal(self, profile_id, goal_id):
+        self.client.delete_item(TableName=self.table_name, Key=goal_key(profile_id, goal_id))
+
+    def list_goals(self, profile_id, *, limit=50, cursor=None):
+        return self._query_partition(f'{PROFILE_PREFIX}{profile_id}', GOAL_PREFIX, limit=limit, cursor=cursor)
+
+
+app = Flask(__name__)
+app.after_request(conditional.add_content_etag)
+fastjson.install(app)
+metrics.install(app)
+
+# module-global so the shared boto3 resource is reused across warm invocations
+repository = GoalRepository()
+
+
+def page_args():
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        abort(400, description='limit must be an integer')
+    return {
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+        'cursor': request.args.get('cursor'),
+    }
+
+
+@app.route('/profiles/<profile_id>/goals', methods=['GET'])
+@auth.required
+@auth.own_profile
+@schemas.route(query=schemas.PAGE_QUERY, responses={200: schemas.page('goals')})
+def get_goals(profile_id):
+    goals, next_cursor = repository.list_goals(profile_id, **page_args())
+    return conditional.respond({"goals": goals, "next_cursor": next_cursor}, goals, next_cursor)
+
+@app.route('/profiles/<profile_id>/goals/<goal_id>', methods=['PUT'])
+@auth.required
+@auth.own_profile
+@schemas.route(body=schemas.ITEM_BODY, responses={200: schemas.ITEM})
+def put_goal(profile_id, goal_id):
+    return jsonify(repository.put_goal(profile_id, goal_id, schemas.json_body()))
+
+@app.route('/profiles/<profile_id>/goals/<goal_id>', methods=['DELETE'])
+@auth.required
+@auth.own_profile
+def delete_goal(profile_id, goal_id):
+    repository.delete_goal(profile_id, goal_id)
+    return '', 204
+
+# Error handlers
+@app.errorhandler(InvalidCursorError)
+def invalid_cursor(e):
+    return jsonify(error=str(e)), 400
+
+@app.errorhandler(HTTPException)
+def handle_http_exception(e):
+    return jsonify(error=e.description), e.code
+
+@app.errorhandler(Exception)
+def handle_exception(e):
+    return jsonify(error=str(e)), 500
+
+# AWS Lambda handler
+def main(event, context):
+    # API Gateway HTTP API (2.0) proxy integration
+    try:
+        return adapter.handle(app, event, context)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": str(e),
+            "headers": {"Content-Type": "application/json"},
+        }
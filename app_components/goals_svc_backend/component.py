@@ -0,0 +1,52 @@
+from typing import Any, Optional, Sequence
+
+from aws_cdk import (
+    Fn,
+    Stack,
+    CfnOutput
+)
+
+from constructs import Construct
+
+from app_components.goals_svc_backend.api.infrastructure import GoalsAPI
+from app_components.goals_svc_backend.database.infrastructure import GoalsDatabase
+
+
+class GoalsBackend(Stack):
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        jwt_audience: Optional[Sequence[str]] = None,
+        **kwargs: Any,
+    ):
+        super().__init__(scope, id_, **kwargs)
+
+        database = GoalsDatabase(
+            self,
+            "Database",
+        )
+        api = GoalsAPI(
+            self,
+            "API",
+            table=database.dynamodb_table,
+            # issued by the SharedServices user pool; always set, auth.required rejects every request without it
+            user_pool_id=Fn.import_value("CognitoUserPoolId"),
+            jwt_audience=jwt_audience,
+        )
+
+        # read by the project service's dashboard
+        self.api_url = api.api_url
+
+        self.api_endpoint = CfnOutput(
+            self,
+            "APIEndpoint",
+            value=api.api_url,  # type: ignore
+        )
+
+        self.goals_table = CfnOutput(
+            self,
+            "GoalsTable",
+            value=database.dynamodb_table.table_name
+        )
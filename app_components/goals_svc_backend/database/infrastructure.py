@@ -0,0 +1,32 @@
+from aws_cdk import (
+    RemovalPolicy,
+    aws_dynamodb as dynamodb)
+from constructs import Construct
+
+class GoalsDatabase(Construct):
+    '''
+    Goals table, keyed like the project service's items: pk is the owning
+    profile, sk the goal, so a profile's goals are one Query. See
+    goals_svc_backend/api/runtime/goals.py for the key layout.
+    '''
+
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        billing_mode: dynamodb.BillingMode = dynamodb.BillingMode.PAY_PER_REQUEST
+    ):
+        super().__init__(scope, id_)
+
+        self.dynamodb_table = dynamodb.Table(
+            self,
+            'GoalsTable',
+            partition_key=dynamodb.Attribute(name='pk', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name='sk', type=dynamodb.AttributeType.STRING),
+            billing_mode=billing_mode,
+            point_in_time_recovery_specification=dynamodb.PointInTimeRecoverySpecification(
+                point_in_time_recovery_enabled=True
+            ),
+            removal_policy=RemovalPolicy.DESTROY  # DESTROY for development; use RETAIN for production
+        )
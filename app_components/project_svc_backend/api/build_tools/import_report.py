@@ -0,0 +1,130 @@
+#!/usr/bin/env python3
+"""Report the cold-import cost of a bundled Lambda asset.
+
+Runs ``python -X importtime -c "import <module>"`` inside the asset directory
+in fresh interpreters, prints the most expensive imports and exits non-zero
+when the median cumulative import time of the module exceeds the budget.
+
+Used as the last step of the ProjectAPI bundling command, and runnable by
+hand against any asset directory:
+
+    python import_report.py cdk.out/asset.<hash> --budget-ms 800
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+
+def measure(asset_dir, module, python=sys.executable):
+    """Import ``module`` once in a fresh interpreter and return its import tree.
+
+    The result lists ``(depth, name, self_us, cumulative_us)`` for ``module``
+    (depth 0) and everything it imported, in ``-X importtime`` order. Imports
+    made by interpreter start-up are dropped. Bytecode is never written so
+    the asset directory is left untouched.
+    """
+    env = dict(os.environ, PYTHONDONTWRITEBYTECODE='1', PYTHONPATH=asset_dir)
+    completed = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        cwd=asset_dir,
+        env=env,
+        capture_output=True,
+        text=True,
+    )
+    if completed.returncode != 0:
+        raise RuntimeError(f'importing {module} failed:\n{completed.stderr}')
+
+    rows = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, cumulative_us, name = line[len('import time:'):].split('|')
+        # nested imports are indented by two spaces per level
+        name = name[1:]
+        depth = (len(name) - len(name.lstrip())) // 2
+        rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+        if depth == 0 and name.strip() == module:
+            break
+        if depth == 0:
+            # a finished start-up import, not part of the module's tree
+            rows.clear()
+    return rows
+
+
+def report(asset_dir, module='handler', runs=5, top=15, python=sys.executable):
+    """Measure ``runs`` cold imports and summarise the median one."""
+    samples = sorted(
+        (measure(asset_dir, module, python) for _ in range(runs)),
+        key=lambda rows: rows[-1][3],
+    )
+    totals = [rows[-1][3] for rows in samples]
+    median_run = samples[len(samples) // 2]
+
+    by_cumulative = sorted(
+        ((name, cumulative) for depth, name, _, cumulative in median_run if depth == 1),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    by_self = sorted(
+        ((name, own) for _, name, own, _ in median_run),
+        key=lambda item: item[1],
+        reverse=True,
+    )
+    return {
+        'module': module,
+        'runs': runs,
+        'median_ms': statistics.median(totals) / 1000,
+        'min_ms': totals[0] / 1000,
+        'max_ms': totals[-1] / 1000,
+        'top_cumulative': [{'module': n, 'ms': us / 1000} for n, us in by_cumulative[:top]],
+        'top_self': [{'module': n, 'ms': us / 1000} for n, us in by_self[:top]],
+    }
+
+
+def format_report(result):
+    lines = [
+        f"cold import of {result['module']}: median {result['median_ms']:.1f} ms "
+        f"(min {result['min_ms']:.1f}, max {result['max_ms']:.1f}, {result['runs']} runs)",
+        f"top imports of {result['module']} by cumulative time:",
+    ]
+    lines += [f"  {row['ms']:8.1f} ms  {row['module']}" for row in result['top_cumulative']]
+    lines.append('top modules by self time:')
+    lines += [f"  {row['ms']:8.1f} ms  {row['module']}" for row in result['top_self']]
+    return '\n'.join(lines)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Report cold-import cost of a Lambda asset.')
+    parser.add_argument('asset_dir')
+    parser.add_argument('--module', default='handler')
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--top', type=int, default=15)
+    parser.add_argument('--budget-ms', type=float, default=None,
+                        help='fail when the median cold import exceeds this many milliseconds')
+    parser.add_argument('--json', dest='json_path', default=None,
+                        help='also write the report as JSON to this path')
+    args = parser.parse_args(argv)
+
+    result = report(os.path.abspath(args.asset_dir), args.module, args.runs, args.top)
+    print(format_report(result))
+
+    if args.json_path:
+        with open(args.json_path, 'w') as f:
+            json.dump(result, f, indent=2)
+
+    if args.budget_ms is not None and result['median_ms'] > args.budget_ms:
+        print(
+            f"cold import of {args.module} took {result['median_ms']:.1f} ms, "
+            f"over the {args.budget_ms:.0f} ms budget",
+            file=sys.stderr,
+        )
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,274 @@
+import hashlib
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from typing import Optional, Sequence
+
+import jsii
+from aws_cdk import AssetHashType, BundlingOptions, DockerVolume, ILocalBundling, aws_lambda as lambda_
+
+dirname = os.path.dirname(__file__)
+runtime_dir = os.path.join(dirname, 'runtime')
+build_tools_dir = os.path.join(dirname, 'build_tools')
+
+# manylinux tags accepted by the Lambda Python runtimes (Amazon Linux 2023, glibc 2.34)
+MANYLINUX_TAGS = ('manylinux2014', 'manylinux_2_17', 'manylinux_2_28', 'manylinux_2_34')
+
+DEFAULT_CACHE_DIR = os.path.join(
+    os.environ.get('XDG_CACHE_HOME', os.path.join(os.path.expanduser('~'), '.cache')),
+    'cdk-python-bundling',
+)
+
+
+@jsii.implements(ILocalBundling)
+class CachedPythonBundling:
+    """Local bundling for a Python Lambda asset with a cached dependency tree.
+
+    Dependencies are installed with pip's cross-platform options
+    (``--platform``/``--python-version``/``--only-binary``) so the wheels match
+    the Lambda runtime whatever the host is. The slimmed tree is cached under a
+    key hashed from ``requirements.txt``, the target runtime and architecture,
+    and the build tools, and is reused by every later synth.
+
+    ``shared_dirs`` are copied into the asset before ``source_dir``, which
+    may override their files; a service that only adds an entry point to the
+    shared runtime keeps it in a directory of its own and uses the shared
+    ``requirements.txt`` when it has none.
+
+    ``try_bundle`` returns ``False`` to fall back to Docker when pip cannot find
+    a compatible wheel for every requirement, or when ``CDK_DOCKER_BUNDLING``
+    is set.
+    """
+
+    def __init__(
+        self,
+        source_dir: str,
+        *,
+        runtime: lambda_.Runtime,
+        architecture: lambda_.Architecture,
+        shared_dirs: Sequence[str] = (),
+        entry_module: str = 'handler',
+        import_budget_ms: Optional[int] = None,
+        cache_dir: Optional[str] = None
+    ):
+        self.source_dir = source_dir
+        self.shared_dirs = tuple(shared_dirs)
+        self.entry_module = entry_module
+        self.python_version = runtime.name.replace('python', '')
+        self.machine = 'aarch64' if architecture.name == lambda_.Architecture.ARM_64.name else 'x86_64'
+        self.import_budget_ms = import_budget_ms
+        self.cache_dir = cache_dir or os.environ.get('CDK_BUNDLING_CACHE', DEFAULT_CACHE_DIR)
+
+    @property
+    def source_dirs(self):
+        # in copy order, later directories override earlier ones
+        return self.shared_dirs + (self.source_dir,)
+
+    @property
+    def requirements_path(self) -> str:
+        for source_dir in reversed(self.source_dirs):
+            path = os.path.join(source_dir, 'requirements.txt')
+            if os.path.exists(path):
+                return path
+        return os.path.join(self.source_dir, 'requirements.txt')
+
+    @property
+    def platforms(self):
+        return [f'{tag}_{self.machine}' for tag in MANYLINUX_TAGS]
+
+    def cache_key(self) -> str:
+        digest = hashlib.sha256()
+        with open(self.requirements_path, 'rb') as f:
+            digest.update(f.read())
+        digest.update(f'python{self.python_version}-{self.machine}'.encode())
+        digest.update(b'compiled' if self.runtime_python() else b'sources')
+        # a change to the slimming rules must not reuse trees slimmed the old way
+        with open(os.path.join(build_tools_dir, 'slim_asset.py'), 'rb') as f:
+            digest.update(f.read())
+        return digest.hexdigest()[:32]
+
+    def runtime_python(self) -> Optional[str]:
+        """Return a local interpreter matching the Lambda runtime, if any."""
+        if sys.version_info[:2] == tuple(int(p) for p in self.python_version.split('.')):
+            return sys.executable
+        return shutil.which(f'python{self.python_version}')
+
+    def try_bundle(self, output_dir: str, options) -> bool:
+        if os.environ.get('CDK_DOCKER_BUNDLING'):
+            return False
+
+        dependencies = self._cached_dependencies()
+        if dependencies is None:
+            return False
+
+        shutil.copytree(dependencies, output_dir, dirs_exist_ok=True)
+        for source_dir in self.source_dirs:
+            shutil.copytree(
+                source_dir,
+                output_dir,
+                dirs_exist_ok=True,
+                ignore=shutil.ignore_patterns('__pycache__', '*.pyc'),
+            )
+
+        python = self.runtime_python()
+        if python is None:
+            print(
+                f'CachedPythonBundling: no local python{self.python_version}, '
+                'shipping the handler sources without bytecode'
+            )
+            return True
+
+        # the cached dependencies are precompiled already, only the sources are new
+        self._run(
+            python, '-m', 'compileall', '-q', '-l',
+            '--invalidation-mode', 'unchecked-hash',
+            output_dir,
+        )
+        if self.import_budget_ms is not None and self._host_matches_target():
+            self._run(
+                python,
+                os.path.join(build_tools_dir, 'import_report.py'),
+                output_dir,
+                '--module',
+                self.entry_module,
+                '--budget-ms',
+                str(self.import_budget_ms),
+            )
+        return True
+
+    def _cached_dependencies(self) -> Optional[str]:
+        target = os.path.join(self.cache_dir, self.cache_key())
+        if os.path.isdir(target):
+            return target
+
+        os.makedirs(self.cache_dir, exist_ok=True)
+        staging = tempfile.mkdtemp(prefix='staging-', dir=self.cache_dir)
+        command = [
+            sys.executable, '-m', 'pip', 'install',
+            '--quiet',
+            '--no-compile',
+            '--target', staging,
+            '--implementation', 'cp',
+            '--python-version', self.python_version,
+            '--only-binary=:all:',
+            '-r', self.requirements_path,
+        ]
+        for platform in self.platforms:
+            command += ['--platform', platform]
+
+        completed = subprocess.run(command, capture_output=True, text=True)
+        if completed.returncode != 0:
+            print(
+                'CachedPythonBundling: no compatible wheel set, falling back to Docker\n'
+                + completed.stderr
+            )
+            shutil.rmtree(staging, ignore_errors=True)
+            return None
+
+        python = self.runtime_python()
+        slim_command = [python or sys.executable, os.path.join(build_tools_dir, 'slim_asset.py'), staging]
+        if python is None:
+            slim_command.append('--no-compile')
+        self._run(*slim_command)
+
+        try:
+            os.rename(staging, target)
+        except OSError:
+            # a concurrent synth populated the same key first
+            shutil.rmtree(staging, ignore_errors=True)
+        return target
+
+    def _host_matches_target(self) -> bool:
+        return sys.platform == 'linux' and os.uname().machine == self.machine
+
+    @staticmethod
+    def _run(*command: str) -> None:
+        subprocess.run(command, check=True)
+
+
+def source_hash(*source_dirs: str) -> str:
+    '''Digest of the runtime sources of every directory, in order.'''
+    digest = hashlib.sha256()
+    for source_dir in source_dirs:
+        for root, dirs, files in os.walk(source_dir):
+            dirs[:] = sorted(d for d in dirs if d != '__pycache__')
+            for name in sorted(files):
+                if name.endswith('.pyc'):
+                    continue
+                path = os.path.join(root, name)
+                digest.update(os.path.relpath(path, source_dir).encode())
+                with open(path, 'rb') as f:
+                    digest.update(f.read())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+def runtime_code(
+    source_dir: str = runtime_dir,
+    *,
+    runtime: lambda_.Runtime,
+    architecture: lambda_.Architecture,
+    shared_dirs: Sequence[str] = (),
+    entry_module: str = 'handler',
+    import_budget_ms: int = 1000
+) -> lambda_.Code:
+    '''
+    The API runtime asset: the flat runtime modules plus their slimmed dependencies.
+    Every function built from the runtime (API, importer, exporter, ...) runs
+    its own entry point from it; call this once per stack.
+
+    Another service builds its asset from its own runtime directory with
+    shared_dirs=[runtime_dir], so it imports the shared modules (adapter, auth,
+    repository, ...) without its code living in this service.
+
+    The cold-import budget is measured on entry_module, the module Lambda
+    loads first: pass the service's own when it is not handler.
+    '''
+    shared_dirs = tuple(shared_dirs)
+    shared_volumes = [
+        DockerVolume(host_path=shared_dir, container_path=f'/shared/{index}')
+        for index, shared_dir in enumerate(shared_dirs)
+    ]
+    return lambda_.Code.from_asset(
+        source_dir,
+        exclude=['__pycache__', '*.pyc'],
+        # the source hash only covers source_dir; the shared modules must change it too
+        asset_hash_type=AssetHashType.CUSTOM if shared_dirs else None,
+        asset_hash=source_hash(*shared_dirs, source_dir) if shared_dirs else None,
+        bundling=BundlingOptions(
+            # Try a cached local pip install first, Docker only when that fails
+            local=CachedPythonBundling(
+                source_dir,
+                runtime=runtime,
+                architecture=architecture,
+                shared_dirs=shared_dirs,
+                entry_module=entry_module,
+                import_budget_ms=import_budget_ms
+            ),
+            image=runtime.bundling_image,
+            volumes=[
+                DockerVolume(
+                    host_path=build_tools_dir,
+                    container_path='/build-tools'
+                )
+            ] + shared_volumes,
+            command=[
+                "bash", "-c",
+                # First copy all python files to output, the shared modules first
+                "".join(f"cp -r {volume.container_path}/. /asset-output && " for volume in shared_volumes) +
+                "cp -r . /asset-output && " +
+                # Create a temp directory for package installation
+                "mkdir -p /tmp/packages && " +
+                # Install packages to temp directory
+                "pip install --no-compile --target=/tmp/packages -r /asset-output/requirements.txt && " +
+                # Copy packages to asset output using cp instead of tar
+                "cp -r /tmp/packages/* /asset-output/ && " +
+                # Strip tests, stubs and stale bytecode, then precompile for the runtime
+                "python /build-tools/slim_asset.py /asset-output && " +
+                # Report the top import costs and fail the build when over budget
+                f"python /build-tools/import_report.py /asset-output --module {entry_module} --budget-ms {import_budget_ms}"
+            ]
+        )
+    )
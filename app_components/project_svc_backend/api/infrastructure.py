@@ -1,19 +1,27 @@
 import pathlib
 
 import json
+from typing import Mapping, Optional, Sequence
 from aws_cdk import (
     CfnOutput,
     Duration,
+    Size,
     Stack,
-    BundlingOptions,
     aws_lambda as lambda_,
     aws_iam as iam,
     aws_apigateway as apigw,
+    aws_apigatewayv2 as apigwv2,
+    aws_apigatewayv2_authorizers as apigwv2_authorizers,
+    aws_apigatewayv2_integrations as apigwv2_integrations,
+    aws_applicationautoscaling as appscaling,
     aws_cognito as cognito)
 from constructs import Construct
 from cdk_nag import NagSuppressions, NagPackSuppression
 import os.path
 
+from app_components.project_svc_backend.api.bundling import runtime_code
+from app_components.project_svc_backend.api.routes import Route, json_schema, load_app, routes
+
 dirname = os.path.dirname(__file__)
 
 class ProjectAPI(Construct):
@@ -24,10 +32,40 @@ class ProjectAPI(Construct):
         *,
         dynamodb_table_name: str,
         region_name: str,
-        account_id: str
+        account_id: str,
+        import_budget_ms: int = 1000,
+        cache_ttl_seconds: int = 30,
+        cache_max_entries: int = 1024,
+        compression_min_bytes: int = 1024,
+        compress_in_gateway: bool = False,
+        cache_cluster_size: Optional[str] = None,
+        profile_cache_ttl: Duration = Duration.minutes(5),
+        profile_list_cache_ttl: Duration = Duration.minutes(1),
+        snap_start: bool = False,
+        provisioned_concurrency: Optional[int] = None,
+        max_provisioned_concurrency: Optional[int] = None,
+        provisioned_concurrency_utilization_target: float = 0.7,
+        provisioned_concurrency_schedules: Optional[Mapping[str, appscaling.ScalingSchedule]] = None,
+        emit_metrics: bool = True,
+        server_timing: bool = True,
+        metrics_namespace: str = 'ProjectAPI',
+        api_type: str = 'rest',
+        user_pool_id: Optional[str] = None,
+        jwt_audience: Optional[Sequence[str]] = None,
+        goals_api_url: Optional[str] = None,
+        dashboard_deadline: Duration = Duration.seconds(1)
     ):
         super().__init__(scope, id_)
 
+        if snap_start and provisioned_concurrency:
+            raise ValueError('SnapStart and provisioned concurrency cannot be used on the same function version')
+        if api_type not in ('rest', 'http'):
+            raise ValueError(f"api_type must be 'rest' or 'http', not {api_type!r}")
+        if api_type == 'http' and (cache_cluster_size is not None or compress_in_gateway):
+            raise ValueError('stage caching and gateway compression are only available with the REST API')
+        if jwt_audience and not user_pool_id:
+            raise ValueError('jwt_audience needs the user_pool_id that issues the tokens')
+
         log_level = "INFO"
         
         api_svc_lambda_role = iam.Role(
@@ -68,40 +106,57 @@ class ProjectAPI(Construct):
             ]
         )
         
+        runtime_dir = os.path.join(dirname, './runtime')
+        runtime = self.runtime = lambda_.Runtime.PYTHON_3_13
+        architecture = self.architecture = lambda_.Architecture.X86_64
+
+        # Flask app plus the other runtime entry points (importer, ...), shared by their functions
+        self.runtime_code = runtime_code(
+            runtime_dir,
+            runtime=runtime,
+            architecture=architecture,
+            import_budget_ms=import_budget_ms
+        )
+
         self.api_svc_lambda = lambda_.Function(
             self,
             'api-svc-lambda-flask',
             description='flask compute to handle CRUD events related to generating prompts for feature extraction',
             function_name='api-svc-lambda-flask',
-            runtime=lambda_.Runtime.PYTHON_3_13,
-            code=lambda_.Code.from_asset(
-                os.path.join(dirname, './runtime'),
-                bundling=BundlingOptions(
-                    image=lambda_.Runtime.PYTHON_3_13.bundling_image,
-                    command=[
-                        "bash", "-c",
-                        # First copy all python files to output
-                        "cp -r . /asset-output && " +
-                        # Create a temp directory for package installation
-                        "mkdir -p /tmp/packages && " +
-                        # Install packages to temp directory
-                        "pip install --target=/tmp/packages -r requirements.txt && " +
-                        # Copy packages to asset output using cp instead of tar
-                        "cp -r /tmp/packages/* /asset-output/ && " +
-                        # Clean up pycache files if they exist
-                        "find /asset-output -name '__pycache__' -type d -exec rm -rf {} + 2>/dev/null || true && " +
-                        "find /asset-output -name '*.pyc' -type f -delete || true"
-                    ]
-                )    
-            ),
+            runtime=runtime,
+            architecture=architecture,
+            code=self.runtime_code,
             role=api_svc_lambda_role,
             handler='handler.main',
             timeout=Duration.seconds(30),
+            snap_start=lambda_.SnapStartConf.ON_PUBLISHED_VERSIONS if snap_start else None,
             environment={
-                'LOG_LEVEL': log_level
+                'LOG_LEVEL': log_level,
+                # pay for imports during init when init is snapshotted or pre-provisioned
+                'LAZY_IMPORTS': 'false' if snap_start or provisioned_concurrency else 'true',
+                'TABLE_NAME': dynamodb_table_name,
+                'CACHE_TTL_SECONDS': str(cache_ttl_seconds),
+                'CACHE_MAX_ENTRIES': str(cache_max_entries),
+                # a negative threshold leaves compression to API Gateway
+                'COMPRESSION_MIN_BYTES': str(-1 if compress_in_gateway else compression_min_bytes),
+                # EMF records on stdout and a Server-Timing response header, per request
+                'METRICS_ENABLED': str(emit_metrics).lower(),
+                'METRICS_NAMESPACE': metrics_namespace,
+                'SERVER_TIMING': str(server_timing).lower(),
+                # GET /profiles/{profile_id}/dashboard answers with what it has by then
+                'DASHBOARD_DEADLINE_MS': str(int(dashboard_deadline.to_milliseconds()))
             }
         )
 
+        if goals_api_url:
+            self.api_svc_lambda.add_environment('GOALS_API_URL', goals_api_url)
+
+        if user_pool_id:
+            # /profiles routes verify Cognito tokens in the function (auth.required); without a pool they answer 401
+            self.api_svc_lambda.add_environment('COGNITO_USER_POOL_ID', user_pool_id)
+            self.api_svc_lambda.add_environment('COGNITO_REGION', region_name)
+            self.api_svc_lambda.add_environment('COGNITO_APP_CLIENT_IDS', ','.join(jwt_audience or []))
+
         NagSuppressions.add_resource_suppressions(
             self.api_svc_lambda,
             apply_to_children=True,
@@ -113,68 +168,118 @@ class ProjectAPI(Construct):
             ]
         )
 
+        # Opt-in stage cache: only the GET methods listed here are cached, each with its own TTL and
+        # keyed on all of the route's request parameters, the caller's Authorization header included
+        stage_cache_enabled = cache_cluster_size is not None
+        cached_methods = {
+            '/profiles/{profile_id}/GET': profile_cache_ttl,
+            '/profiles/GET': profile_list_cache_ttl,
+        } if stage_cache_enabled else {}
+
+        # Publish a version on every code/config change and serve it through the live alias
+        self.api_svc_alias = lambda_.Alias(
+            self,
+            'ApiSvcLiveAlias',
+            alias_name='live',
+            version=self.api_svc_lambda.current_version,
+            provisioned_concurrent_executions=provisioned_concurrency
+        )
+
+        if provisioned_concurrency:
+            scaling = self.api_svc_alias.add_auto_scaling(
+                min_capacity=provisioned_concurrency,
+                max_capacity=max_provisioned_concurrency or provisioned_concurrency
+            )
+            if max_provisioned_concurrency:
+                scaling.scale_on_utilization(utilization_target=provisioned_concurrency_utilization_target)
+            for name, schedule in (provisioned_concurrency_schedules or {}).items():
+                scaling.scale_on_schedule(
+                    name,
+                    schedule=schedule.schedule,
+                    min_capacity=schedule.min_capacity,
+                    max_capacity=schedule.max_capacity,
+                    start_time=schedule.start_time,
+                    end_time=schedule.end_time,
+                    time_zone=schedule.time_zone
+                )
+
+        if api_type == 'http':
+            self.app_layer_api = None
+            self._create_http_api(region_name, user_pool_id, jwt_audience)
+            return
+
         #create REST API
         self.app_layer_api = apigw.RestApi(
             self,
             'sample-app-layer-api',
             description='API serving as the entrypoint for services running in Lambda or optionally containers',
+            # pass base64 bodies (compressed or binary) through in both directions
+            binary_media_types=['*/*'],
+            min_compression_size=Size.bytes(compression_min_bytes) if compress_in_gateway else None,
             deploy_options=apigw.StageOptions(
                 stage_name='api',
-                tracing_enabled=True
-            )
-        )
-
-        #add method to root resource
-        root_method = self.app_layer_api.root.add_method(
-            'GET',
-            apigw.LambdaIntegration(
-                self.api_svc_lambda
+                tracing_enabled=True,
+                cache_cluster_enabled=stage_cache_enabled,
+                cache_cluster_size=cache_cluster_size,
+                method_options={
+                    path: apigw.MethodDeploymentOptions(
+                        caching_enabled=True,
+                        cache_ttl=ttl,
+                        cache_data_encrypted=True
+                    )
+                    for path, ttl in cached_methods.items()
+                }
             )
         )
 
-        #add profiles resource to root resource
-        profiles_resource = self.app_layer_api.root.add_resource('profiles')
-
-        #add profile_id resource to profiles_resource
-        profile_id_resource = profiles_resource.add_resource('{profile_id}')
+        self.api_url = self.app_layer_api.url
 
-        #GET /profiles
-        get_profiles = profiles_resource.add_method(
-            'GET',
-            apigw.LambdaIntegration(
-                self.api_svc_lambda
-            )
+        #request validation generated from the schemas the Flask routes declare (runtime/schemas.py)
+        self.routes = {(route.method, route.path): route for route in routes(load_app())}
+        self._models = {}
+        self._body_validator = self.app_layer_api.add_request_validator(
+            'BodyAndParametersValidator',
+            validate_request_body=True,
+            validate_request_parameters=True
+        )
+        self._parameters_validator = self.app_layer_api.add_request_validator(
+            'ParametersValidator',
+            validate_request_parameters=True
         )
+        #the handler skips its own body checks behind this API
+        self.api_svc_lambda.add_environment('VALIDATED_AT_GATEWAY', 'true')
+        #origin for CloudFront: the stage name stays in the request path (/api/...)
+        self.api_domain_name = f'{self.app_layer_api.rest_api_id}.execute-api.{region_name}.{Stack.of(self).url_suffix}'
 
-        #GET /profiles/{profile_id}
-        get_profile_id = profile_id_resource.add_method(
-            'GET',
-            apigw.LambdaIntegration(
-                self.api_svc_lambda
+        #one resource and method per Flask route and method (runtime handler.app.url_map), so
+        #a path the app does not serve is answered by API Gateway without invoking the function
+        integration = self._proxy_integration()
+        self.methods = {}
+        for route in self.routes.values():
+            cache_keys = list(route.request_parameters()) if f'{route.path}/{route.method}' in cached_methods else []
+            self.methods[(route.method, route.path)] = self.app_layer_api.root.resource_for_path(route.path).add_method(
+                route.method,
+                #cached methods need their own integration for the cache keys
+                self._proxy_integration(cache_keys) if cache_keys else integration,
+                **self._validation(route.method, route.path)
             )
-        )
+        unrouted = set(cached_methods) - {f'{path}/{method}' for method, path in self.routes}
+        if unrouted:
+            raise ValueError(f"cached methods without a Flask route: {', '.join(sorted(unrouted))}")
 
-        NagSuppressions.add_resource_suppressions(
-            self.app_layer_api,
-            apply_to_children=True,
-            suppressions=[
-                NagPackSuppression(
-                    id='AwsSolutions-APIG2',
-                    reason='Request Validation not set up'
-                )
-            ]
+        #one permission for the whole API instead of one (plus a test one) per method
+        self.api_svc_alias.add_permission(
+            'RestApiInvoke',
+            principal=iam.ServicePrincipal('apigateway.amazonaws.com'),
+            source_arn=self.app_layer_api.arn_for_execute_api()
         )
 
-        NagSuppressions.add_resource_suppressions(
-            self.app_layer_api,
-            apply_to_children=True,
-            suppressions=[
-                NagPackSuppression(
-                    id='AwsSolutions-APIG2',
-                    reason='Request Validation not set up'
-                )
-            ]
-        )
+        if stage_cache_enabled:
+            # The function flushes the stage cache after writes (runtime/gateway_cache.py); the stage
+            # name is given as is, a reference to the stage would make it depend on the function
+            self.api_svc_lambda.add_environment('API_CACHE_REST_API_ID', self.app_layer_api.rest_api_id)
+            self.api_svc_lambda.add_environment('API_CACHE_STAGE_NAME', 'api')
+            self.grant_cache_flush(api_svc_lambda_role)
 
         NagSuppressions.add_resource_suppressions(
             self.app_layer_api.deployment_stage,
@@ -195,47 +300,172 @@ class ProjectAPI(Construct):
             ]
         )
 
-        NagSuppressions.add_resource_suppressions(
-            construct=root_method,
-            apply_to_children=True,
-            suppressions=[
-                {
-                    "id": "AwsSolutions-APIG4",
-                    "reason": "Authorization is not required for this public endpoint"
-                },
-                {
-                    "id": "AwsSolutions-COG4",
-                    "reason": "Cognito user pool authorizer is not required for this public endpoint"
-                }
+        for route in self.routes.values():
+            NagSuppressions.add_resource_suppressions(
+                construct=self.methods[(route.method, route.path)],
+                apply_to_children=True,
+                suppressions=[
+                    {
+                        "id": "AwsSolutions-APIG4",
+                        "reason": "Cognito tokens are verified by the function, which rejects every request when user_pool_id or jwt_audience is not set"
+                        if route.authenticated else "Authorization is not required for this public endpoint"
+                    },
+                    {
+                        "id": "AwsSolutions-COG4",
+                        "reason": "Cognito tokens are verified by the function rather than a gateway authorizer"
+                        if route.authenticated else "Cognito user pool authorizer is not required for this public endpoint"
+                    }
+                ]
+            )
+
+    def _proxy_integration(self, cache_key_parameters: Sequence[str] = ()) -> apigw.Integration:
+        '''
+        Lambda proxy integration with the live alias. Unlike LambdaIntegration it adds no
+        per-method invoke permissions; the RestApiInvoke permission covers every method.
+        '''
+        return apigw.Integration(
+            type=apigw.IntegrationType.AWS_PROXY,
+            integration_http_method='POST',
+            uri=':'.join([
+                'arn',
+                Stack.of(self).partition,
+                'apigateway',
+                Stack.of(self).region,
+                f'lambda:path/2015-03-31/functions/{self.api_svc_alias.function_arn}/invocations'
+            ]),
+            options=apigw.IntegrationOptions(
+                cache_key_parameters=list(cache_key_parameters) or None
+            )
+        )
+
+    def _model(self, schema) -> apigw.IModel:
+        '''
+        One API Gateway model per schema title, shared by every method that uses it.
+        '''
+        title = schema['title']
+        if title not in self._models:
+            self._models[title] = self.app_layer_api.add_model(
+                f'{title}Model',
+                model_name=title,
+                content_type='application/json',
+                schema=json_schema(schema)
+            )
+        return self._models[title]
+
+    def _validation(self, http_method: str, path: str) -> dict:
+        '''
+        add_method options validating the request as the Flask route declares it:
+        the body against its model, required path and query parameters.
+        '''
+        route: Route = self.routes[(http_method, path)]
+        options = {
+            'request_validator': self._body_validator if route.body else self._parameters_validator,
+            'request_parameters': route.request_parameters(),
+            'method_responses': [
+                apigw.MethodResponse(
+                    status_code=str(status),
+                    response_models={'application/json': self._model(schema)}
+                )
+                for status, schema in route.responses.items()
             ]
+        }
+        if route.body:
+            options['request_models'] = {'application/json': self._model(route.body)}
+        return options
+
+    def _create_http_api(self, region_name: str, user_pool_id: Optional[str], jwt_audience: Optional[Sequence[str]]) -> None:
+        '''
+        HTTP API (payload format 2.0) in front of the live alias: one $default route
+        proxies every path to Flask, optionally behind a Cognito JWT authorizer.
+        '''
+        integration = apigwv2_integrations.HttpLambdaIntegration(
+            'ApiSvcIntegration',
+            self.api_svc_alias,
+            payload_format_version=apigwv2.PayloadFormatVersion.VERSION_2_0
+        )
+
+        authorizer = None
+        if jwt_audience:
+            authorizer = apigwv2_authorizers.HttpJwtAuthorizer(
+                'CognitoJwtAuthorizer',
+                f'https://cognito-idp.{region_name}.amazonaws.com/{user_pool_id}',
+                jwt_audience=list(jwt_audience)
+            )
+
+        self.http_api = apigwv2.HttpApi(
+            self,
+            'sample-app-layer-http-api',
+            description='HTTP API serving as the entrypoint for services running in Lambda',
+            create_default_stage=False,
+            default_integration=integration,
+            default_authorizer=authorizer
+        )
+
+        #the root stays public, as on the REST API
+        self.http_api.add_routes(
+            path='/',
+            methods=[apigwv2.HttpMethod.GET],
+            integration=integration,
+            authorizer=apigwv2.HttpNoneAuthorizer()
+        )
+
+        #same /api base path as the REST API stage; the adapter strips it from rawPath
+        stage = self.http_api.add_stage(
+            'ApiStage',
+            stage_name='api',
+            auto_deploy=True
         )
+        self.api_url = stage.url
+        self.api_domain_name = f'{self.http_api.api_id}.execute-api.{region_name}.{Stack.of(self).url_suffix}'
 
         NagSuppressions.add_resource_suppressions(
-            construct=get_profiles,
+            stage,
             apply_to_children=True,
             suppressions=[
-                {
-                    "id": "AwsSolutions-APIG4",
-                    "reason": "Authorization is not required for this public endpoint"
-                },
-                {
-                    "id": "AwsSolutions-COG4",
-                    "reason": "Cognito user pool authorizer is not required for this public endpoint"
-                }
+                NagPackSuppression(
+                    id="AwsSolutions-APIG1",
+                    reason="Access logging is not required for this development API"
+                )
             ]
         )
 
         NagSuppressions.add_resource_suppressions(
-            construct=get_profile_id,
+            self.http_api,
             apply_to_children=True,
             suppressions=[
                 {
                     "id": "AwsSolutions-APIG4",
-                    "reason": "Authorization is not required for this public endpoint"
-                },
-                {
-                    "id": "AwsSolutions-COG4",
-                    "reason": "Cognito user pool authorizer is not required for this public endpoint"
+                    "reason": "Routes use the Cognito JWT authorizer when jwt_audience is set and verify tokens in the function otherwise; GET / is public"
                 }
             ]
         )
+
+    def grant_cache_flush(self, grantee: iam.IGrantable) -> iam.Grant:
+        '''
+        Allow grantee to flush the whole stage cache (apigateway FlushStageCache).
+        '''
+        return iam.Grant.add_to_principal(
+            grantee=grantee,
+            actions=['apigateway:DELETE'],
+            resource_arns=[
+                Stack.of(self).format_arn(
+                    service='apigateway',
+                    account='',
+                    resource='/restapis',
+                    resource_name=f'{self.app_layer_api.rest_api_id}/stages/api/cache/data'
+                )
+            ]
+        )
+
+    def grant_cache_invalidation(self, grantee: iam.IGrantable) -> iam.Grant:
+        '''
+        Allow grantee to invalidate stage cache entries by sending signed requests with Cache-Control: max-age=0.
+        '''
+        return iam.Grant.add_to_principal(
+            grantee=grantee,
+            actions=['execute-api:InvalidateCache'],
+            resource_arns=[
+                self.app_layer_api.arn_for_execute_api('GET', '/profiles', 'api'),
+                self.app_layer_api.arn_for_execute_api('GET', '/profiles/*', 'api')
+            ]
+        )
@@ -0,0 +1,138 @@
+'''
+Synth-time view of the Flask app in the runtime: its routes and the schemas
+they declare with schemas.route (see runtime/schemas.py).
+'''
+
+import importlib
+import os
+import re
+import sys
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Mapping, Optional
+
+from aws_cdk import aws_apigateway as apigw
+
+dirname = os.path.dirname(__file__)
+RUNTIME_DIR = os.path.join(dirname, 'runtime')
+
+# methods Flask adds to every rule on its own
+IMPLICIT_METHODS = {'HEAD', 'OPTIONS'}
+
+_SCHEMA_KEYWORDS = {
+    'title': 'title',
+    'description': 'description',
+    'required': 'required',
+    'enum': 'enum',
+    'minLength': 'min_length',
+    'maxLength': 'max_length',
+    'pattern': 'pattern',
+    'minItems': 'min_items',
+    'maxItems': 'max_items',
+    'minimum': 'minimum',
+    'maximum': 'maximum',
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    method: str
+    # API Gateway form: /profiles/{profile_id}
+    path: str
+    path_parameters: List[str] = field(default_factory=list)
+    body: Optional[Dict[str, Any]] = None
+    query: Mapping[str, bool] = field(default_factory=dict)
+    responses: Mapping[int, Dict[str, Any]] = field(default_factory=dict)
+    # decorated with auth.required
+    authenticated: bool = False
+
+    def request_parameters(self) -> Dict[str, bool]:
+        '''
+        API Gateway method request parameters: every path parameter is required,
+        query parameters as declared. Authenticated routes also declare the
+        Authorization header, so a stage cache can key on it: an entry filled
+        for one caller must not be served to another.
+        '''
+        parameters = {f'method.request.path.{name}': True for name in self.path_parameters}
+        parameters.update({f'method.request.querystring.{name}': required for name, required in self.query.items()})
+        if self.authenticated:
+            # optional here, the function answers a missing token with 401
+            parameters['method.request.header.Authorization'] = False
+        return parameters
+
+
+def load_app(runtime_dir: str = RUNTIME_DIR):
+    '''
+    Import the runtime's handler module the way Lambda does (flat, by top-level
+    name) and return its Flask app.
+
+    The runtime modules have generic names (auth, cache, metrics, ...), so
+    runtime_dir is on sys.path only for the import, and the modules it loaded
+    from there are taken out of sys.modules again; the app keeps references
+    to what it uses. Runtime modules imported before (by the runtime tests)
+    are reused and left alone. The runtime's own requirements must be
+    installed, see requirements.txt.
+    '''
+    loaded = set(sys.modules)
+    sys.path.insert(0, runtime_dir)
+    try:
+        return importlib.import_module('handler').app
+    finally:
+        sys.path.remove(runtime_dir)
+        prefix = os.path.join(os.path.abspath(runtime_dir), '')
+        for name in set(sys.modules) - loaded:
+            path = getattr(sys.modules[name], '__file__', None) or ''
+            if os.path.abspath(path).startswith(prefix):
+                del sys.modules[name]
+
+
+def gateway_path(rule: str) -> str:
+    '''
+    /profiles/<profile_id> -> /profiles/{profile_id}
+    '''
+    return re.sub(r'<(?:[^<>:]+:)?([^<>]+)>', r'{\1}', rule)
+
+
+def routes(app) -> List[Route]:
+    '''
+    One Route per (rule, method) of app, in url_map order.
+    '''
+    found = []
+    for rule in app.url_map.iter_rules():
+        if rule.endpoint == 'static':
+            continue
+        view = app.view_functions[rule.endpoint]
+        declared = getattr(view, 'schemas', None)
+        for method in sorted(rule.methods - IMPLICIT_METHODS):
+            found.append(Route(
+                method=method,
+                path=gateway_path(rule.rule),
+                path_parameters=sorted(rule.arguments),
+                body=declared.body if declared else None,
+                query=declared.query if declared else {},
+                responses=declared.responses if declared else {},
+                authenticated=getattr(view, 'requires_auth', False),
+            ))
+    return found
+
+
+def json_schema(schema: Mapping[str, Any], *, root: bool = True) -> apigw.JsonSchema:
+    '''
+    The apigw.JsonSchema for a draft 4 schema dict, nested schemas included.
+    '''
+    kwargs: Dict[str, Any] = {'schema': apigw.JsonSchemaVersion.DRAFT4} if root else {}
+    kwargs.update({
+        name: schema[keyword]
+        for keyword, name in _SCHEMA_KEYWORDS.items()
+        if keyword in schema
+    })
+    if 'type' in schema:
+        types = schema['type'] if isinstance(schema['type'], list) else [schema['type']]
+        converted = [apigw.JsonSchemaType[name.upper()] for name in types]
+        kwargs['type'] = converted if len(converted) > 1 else converted[0]
+    if 'properties' in schema:
+        kwargs['properties'] = {name: json_schema(value, root=False) for name, value in schema['properties'].items()}
+    if 'items' in schema:
+        kwargs['items'] = json_schema(schema['items'], root=False)
+    if 'additionalProperties' in schema:
+        kwargs['additional_properties'] = schema['additionalProperties']
+    return apigw.JsonSchema(**kwargs)
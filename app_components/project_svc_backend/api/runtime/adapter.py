@@ -0,0 +1,315 @@
+"""Translate API Gateway proxy events into WSGI calls and back.
+
+The adapter builds the WSGI environ straight from the proxy event and calls
+``app.wsgi_app`` directly, so there is no test client, no request builder and
+no re-parsing of headers or query strings on the hot path.
+
+Both payload formats are understood and told apart per event: REST API
+proxy events (1.0: ``path``, ``httpMethod``, ``multiValue*`` fields) and
+HTTP API events (2.0: ``rawPath``, ``rawQueryString``, ``cookies``,
+``requestContext.http``). The response is built in the format of the event.
+"""
+
+import base64
+import io
+import sys
+from urllib.parse import quote, urlencode
+
+import compression
+import metrics
+
+TEXT_MIME_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'application/x-www-form-urlencoded',
+    'image/svg+xml',
+)
+
+# Headers WSGI expects without the HTTP_ prefix
+_CONTENT_HEADERS = frozenset(('CONTENT_TYPE', 'CONTENT_LENGTH'))
+
+
+def _wsgi_str(value):
+    """Return ``value`` as a WSGI "native string" (latin-1 decoded bytes)."""
+    return value.encode('utf-8').decode('latin-1')
+
+
+def _is_text(content_type):
+    if not content_type:
+        return True
+    mime = content_type.split(';', 1)[0].strip().lower()
+    return (
+        mime.startswith('text/')
+        or mime in TEXT_MIME_TYPES
+        or mime.endswith('+json')
+        or mime.endswith('+xml')
+    )
+
+
+def _query_string(event):
+    multi = event.get('multiValueQueryStringParameters')
+    if multi:
+        return urlencode(multi, doseq=True, quote_via=quote)
+    single = event.get('queryStringParameters')
+    if single:
+        return urlencode(single, quote_via=quote)
+    return ''
+
+
+def _headers(event):
+    """Yield ``(name, value)`` pairs, preferring multi-value headers."""
+    multi = event.get('multiValueHeaders')
+    if multi:
+        for name, values in multi.items():
+            if values is None:
+                continue
+            separator = '; ' if name.lower() == 'cookie' else ', '
+            yield name, separator.join(values)
+        return
+    single = event.get('headers')
+    if single:
+        yield from single.items()
+
+
+def request_body(event):
+    """Return the raw request body bytes, decoding base64 payloads."""
+    body = event.get('body')
+    if not body:
+        return b''
+    if event.get('isBase64Encoded'):
+        return base64.b64decode(body)
+    return body.encode('utf-8')
+
+
+def is_v2(event):
+    """True for HTTP API payload format 2.0 events."""
+    return event.get('version') == '2.0' or 'rawPath' in event
+
+
+def _v2_path(event, request_context):
+    # a named stage is part of rawPath; the $default stage is not
+    path = event.get('rawPath') or '/'
+    stage = request_context.get('stage')
+    if stage and stage != '$default':
+        prefix = f'/{stage}'
+        if path == prefix or path.startswith(prefix + '/'):
+            path = path[len(prefix):] or '/'
+    return path
+
+
+def _v2_headers(event):
+    """Yield ``(name, value)`` pairs; 2.0 carries cookies outside the headers."""
+    headers = event.get('headers') or {}
+    yield from headers.items()
+    cookies = event.get('cookies')
+    if cookies:
+        yield 'cookie', '; '.join(cookies)
+
+
+def build_environ(event, context=None):
+    """Build a PEP 3333 environ from an API Gateway 1.0 or 2.0 proxy event."""
+    body = request_body(event)
+    request_context = event.get('requestContext') or {}
+    if is_v2(event):
+        http = request_context.get('http') or {}
+        method = http.get('method')
+        path = _v2_path(event, request_context)
+        query_string = event.get('rawQueryString') or ''
+        protocol = http.get('protocol')
+        source_ip = http.get('sourceIp')
+        headers = _v2_headers(event)
+    else:
+        method = event.get('httpMethod')
+        path = event.get('path') or '/'
+        query_string = _query_string(event)
+        protocol = request_context.get('protocol')
+        source_ip = (request_context.get('identity') or {}).get('sourceIp')
+        headers = _headers(event)
+
+    environ = {
+        'REQUEST_METHOD': method or 'GET',
+        'SCRIPT_NAME': '',
+        'PATH_INFO': _wsgi_str(path),
+        'QUERY_STRING': query_string,
+        'SERVER_NAME': 'lambda',
+        'SERVER_PORT': '443',
+        'SERVER_PROTOCOL': protocol or 'HTTP/1.1',
+        'REMOTE_ADDR': source_ip or '127.0.0.1',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': 'https',
+        # BytesIO shares the initial buffer until it is written to
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': False,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+        'aws.event': event,
+        'aws.context': context,
+    }
+
+    for name, value in headers:
+        key = name.upper().replace('-', '_')
+        if key in _CONTENT_HEADERS:
+            # the body length is authoritative once base64 has been decoded
+            if key == 'CONTENT_TYPE':
+                environ[key] = _wsgi_str(value)
+            continue
+        environ['HTTP_' + key] = _wsgi_str(value)
+
+    host = environ.get('HTTP_HOST')
+    if host:
+        environ['SERVER_NAME'] = host.split(':', 1)[0]
+    if 'HTTP_X_FORWARDED_PORT' in environ:
+        environ['SERVER_PORT'] = environ['HTTP_X_FORWARDED_PORT']
+    if 'HTTP_X_FORWARDED_PROTO' in environ:
+        environ['wsgi.url_scheme'] = environ['HTTP_X_FORWARDED_PROTO']
+
+    return environ
+
+
+def build_response(status, headers, body, accept_encoding=None):
+    """Build the proxy integration response for a finished WSGI call.
+
+    Compressible bodies of at least ``compression.MIN_BYTES`` are encoded
+    with the best codec the client accepts.
+    """
+    return _proxy_response(*_negotiate(status, headers, body, accept_encoding))
+
+
+def _negotiate(status, headers, body, accept_encoding):
+    # status code, headers and the body bytes as sent, compressed or not
+    multi_value_headers = {}
+    content_type = None
+    content_encoding = None
+    for name, value in headers:
+        multi_value_headers.setdefault(name, []).append(value)
+        lowered = name.lower()
+        if lowered == 'content-type':
+            content_type = value
+        elif lowered == 'content-encoding':
+            content_encoding = value
+
+    status_code = int(status.split(' ', 1)[0])
+    if (
+        content_encoding is None
+        and compression.enabled()
+        and status_code not in (204, 304)
+        and compression.is_compressible(content_type)
+    ):
+        # the representation depends on Accept-Encoding even when left as is
+        vary = multi_value_headers.setdefault('Vary', [])
+        if not any('accept-encoding' in v.lower() for v in vary):
+            vary.append('Accept-Encoding')
+        encoding = compression.negotiate(accept_encoding)
+        if encoding is not None and len(body) >= compression.MIN_BYTES:
+            body = compression.compress(body, encoding)
+            content_encoding = encoding
+            multi_value_headers['Content-Encoding'] = [encoding]
+            _replace_header(multi_value_headers, 'Content-Length', str(len(body)))
+            # the compressed bytes are a different representation
+            etag = multi_value_headers.get('ETag')
+            if etag and etag[0].endswith('"'):
+                multi_value_headers['ETag'] = [f'{etag[0][:-1]}-{encoding}"']
+
+    return status_code, multi_value_headers, body, content_encoding is None and _is_text(content_type)
+
+
+def _proxy_response(status_code, multi_value_headers, body, is_text):
+    if is_text:
+        try:
+            encoded_body = body.decode('utf-8')
+            is_base64 = False
+        except UnicodeDecodeError:
+            # e.g. raw bytes returned without a mimetype; send them as they are
+            is_text = False
+    if not is_text:
+        encoded_body = base64.b64encode(body).decode('ascii')
+        is_base64 = True
+
+    return {
+        'statusCode': status_code,
+        'multiValueHeaders': multi_value_headers,
+        'body': encoded_body,
+        'isBase64Encoded': is_base64,
+    }
+
+
+def to_v2_response(response):
+    """Convert a 1.0 proxy response into the 2.0 shape.
+
+    2.0 responses have no multi-value headers: ``Set-Cookie`` values move to
+    ``cookies`` and repeated headers are comma-joined.
+    """
+    headers = {}
+    cookies = []
+    for name, values in response['multiValueHeaders'].items():
+        if name.lower() == 'set-cookie':
+            cookies.extend(values)
+        else:
+            headers[name] = ', '.join(values)
+    converted = {
+        'statusCode': response['statusCode'],
+        'headers': headers,
+        'body': response['body'],
+        'isBase64Encoded': response['isBase64Encoded'],
+    }
+    if cookies:
+        converted['cookies'] = cookies
+    return converted
+
+
+def _replace_header(multi_value_headers, name, value):
+    for existing in list(multi_value_headers):
+        if existing.lower() == name.lower():
+            del multi_value_headers[existing]
+    multi_value_headers[name] = [value]
+
+
+def handle(app, event, context=None, *, instrument=True):
+    """Dispatch a proxy event to a WSGI ``app`` and return the proxy response.
+
+    Unless ``instrument`` is false (e.g. for warm-up requests), the request is
+    timed and reported through ``metrics``.
+    """
+    timer = metrics.RequestTimer() if instrument and metrics.enabled() else None
+    environ = build_environ(event, context)
+    if timer is not None:
+        environ['aws.timer'] = timer
+        timer.lap('adapter')
+    captured = []
+
+    def start_response(status, response_headers, exc_info=None):
+        if exc_info and captured:
+            raise exc_info[1].with_traceback(exc_info[2])
+        captured[:] = [status, response_headers]
+        return _write_unsupported
+
+    wsgi_app = getattr(app, 'wsgi_app', app)
+    result = wsgi_app(environ, start_response)
+    try:
+        body = b''.join(result)
+    finally:
+        close = getattr(result, 'close', None)
+        if close is not None:
+            close()
+
+    status, response_headers = captured
+    status_code, multi_value_headers, body, is_text = _negotiate(
+        status, response_headers, body, environ.get('HTTP_ACCEPT_ENCODING')
+    )
+    response = _proxy_response(status_code, multi_value_headers, body, is_text)
+    if timer is not None:
+        timer.lap('serialization')
+        if metrics.SERVER_TIMING:
+            response['multiValueHeaders']['Server-Timing'] = [timer.server_timing()]
+        # the bytes sent, before any base64 or text decoding for the proxy response
+        metrics.record(timer, environ['REQUEST_METHOD'], status_code, len(body), context)
+    if is_v2(event):
+        return to_v2_response(response)
+    return response
+
+
+def _write_unsupported(data):
+    raise NotImplementedError('the legacy WSGI write() callable is not supported')
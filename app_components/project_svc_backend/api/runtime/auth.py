@@ -0,0 +1,241 @@
+"""In-process verification of Cognito ID and access tokens.
+
+Tokens from the SharedServices user pool are checked inside the function,
+so no Lambda authorizer call is needed:
+
+* the pool's JWKS is fetched once per container and kept; a token signed
+  with an unknown ``kid`` (key rotation) triggers one refetch, at most every
+  ``JWKS_MIN_REFRESH_SECONDS``, failed fetches included. While no key set
+  could be fetched at all, ``required`` answers 503; with one on hand, a
+  token whose key is not in it gets 401;
+* verified claims are memoized in a bounded ``TTLCache`` keyed by the
+  SHA-256 of the token until the token expires, so a client repeating its
+  token skips the RSA signature check.
+
+Behind the HTTP API's JWT authorizer, API Gateway has already verified the
+token and its claims are taken from the event as they are.
+
+``own_profile`` limits a route to the caller's own profile.
+
+``required`` fails closed: without ``COGNITO_USER_POOL_ID`` there is
+nothing to verify a token against, so every request it guards is answered
+with 401 unless an HTTP API authorizer verified the token already. Without
+``COGNITO_APP_CLIENT_IDS`` no app client of the pool is trusted, and every
+token is rejected the same way.
+"""
+
+import functools
+import hashlib
+import logging
+import os
+import threading
+import time
+
+from flask import abort, g, request
+
+import cache
+import clients
+from lazy import lazy_import
+
+jwt = lazy_import('jwt')
+
+logger = logging.getLogger(__name__)
+
+USER_POOL_ID = os.environ.get('COGNITO_USER_POOL_ID', '')
+REGION = os.environ.get('COGNITO_REGION') or os.environ.get('AWS_REGION', 'us-east-1')
+# app client ids accepted as the ID token audience / access token client_id
+APP_CLIENT_IDS = tuple(filter(None, os.environ.get('COGNITO_APP_CLIENT_IDS', '').split(',')))
+JWKS_MIN_REFRESH_SECONDS = 60.0
+JWKS_TIMEOUT_SECONDS = 3.0
+LEEWAY_SECONDS = 5
+TOKEN_CACHE_ENTRIES = int(os.environ.get('AUTH_TOKEN_CACHE_ENTRIES', 1024))
+ALGORITHMS = ('RS256',)
+
+
+class AuthError(Exception):
+    """The request's token is missing, malformed or not acceptable."""
+
+
+def issuer_for(user_pool_id, region=REGION):
+    return f'https://cognito-idp.{region}.amazonaws.com/{user_pool_id}'
+
+
+def _fetch_json(url):
+    response = clients.http.get(url, timeout=JWKS_TIMEOUT_SECONDS)
+    response.raise_for_status()
+    return response.json()
+
+
+class KeysUnavailableError(Exception):
+    """The issuer's signing keys could not be fetched, so no token can be checked."""
+
+
+class JWKSCache:
+    """The signing keys of one issuer, by ``kid``."""
+
+    def __init__(self, url, *, fetch=_fetch_json, clock=time.monotonic):
+        self.url = url
+        self.fetch = fetch
+        self.clock = clock
+        self._keys = {}
+        self._fetched_at = None
+        self._lock = threading.Lock()
+
+    def refresh(self):
+        try:
+            jwks = self.fetch(self.url)
+        except Exception as e:
+            # counts as a fetch, so an unreachable endpoint is not asked on every request
+            self._fetched_at = self.clock()
+            raise KeysUnavailableError(f'could not fetch signing keys: {e}') from e
+        self._keys = {k['kid']: jwt.PyJWK(k) for k in jwks.get('keys', []) if 'kid' in k}
+        self._fetched_at = self.clock()
+
+    def get(self, kid):
+        key = self._keys.get(kid)
+        if key is not None:
+            return key
+        with self._lock:
+            key = self._keys.get(kid)
+            recently = (
+                self._fetched_at is not None
+                and self.clock() - self._fetched_at < JWKS_MIN_REFRESH_SECONDS
+            )
+            if key is None and not recently:
+                try:
+                    self.refresh()
+                except KeysUnavailableError:
+                    if not self._keys:
+                        raise
+                    logger.warning('keeping the cached signing keys', exc_info=True)
+                key = self._keys.get(kid)
+            elif key is None and not self._keys:
+                raise KeysUnavailableError('signing keys are unavailable')
+        if key is None:
+            raise AuthError(f'unknown signing key {kid!r}')
+        return key
+
+
+class TokenVerifier:
+    """Verify Cognito tokens for one user pool and its app clients."""
+
+    def __init__(self, issuer, audiences, *, jwks=None, token_cache=None, clock=time.time):
+        self.issuer = issuer
+        self.audiences = frozenset(audiences)
+        self.jwks = jwks or JWKSCache(f'{issuer}/.well-known/jwks.json')
+        self.clock = clock
+        # entries get a per-token TTL, the default is never used
+        self.token_cache = token_cache or cache.TTLCache(max_entries=TOKEN_CACHE_ENTRIES, ttl=300)
+
+    def verify(self, token):
+        """Return the claims of ``token``, raising ``AuthError`` if it is not valid."""
+        if not self.audiences:
+            raise AuthError('no app client ids are configured')
+        cache_key = hashlib.sha256(token.encode()).digest()
+        claims = self.token_cache.get(cache_key)
+        if claims is not cache.MISSING:
+            if claims['exp'] > self.clock():
+                return claims
+            self.token_cache.invalidate(cache_key)
+
+        claims = self._decode(token)
+        ttl = claims['exp'] - self.clock()
+        if ttl > 0:
+            self.token_cache.set(cache_key, claims, ttl=ttl)
+        return claims
+
+    def _decode(self, token):
+        try:
+            header = jwt.get_unverified_header(token)
+        except jwt.InvalidTokenError as e:
+            raise AuthError(f'malformed token: {e}') from None
+        if header.get('alg') not in ALGORITHMS:
+            raise AuthError(f"unsupported algorithm {header.get('alg')!r}")
+        key = self.jwks.get(header.get('kid'))
+        try:
+            # the audience lives in different claims for ID and access tokens
+            claims = jwt.decode(
+                token,
+                key.key,
+                algorithms=list(ALGORITHMS),
+                issuer=self.issuer,
+                leeway=LEEWAY_SECONDS,
+                options={'verify_aud': False, 'require': ['exp', 'iss', 'token_use']},
+            )
+        except jwt.InvalidTokenError as e:
+            raise AuthError(str(e)) from None
+
+        token_use = claims['token_use']
+        if token_use == 'id':
+            audience = claims.get('aud')
+        elif token_use == 'access':
+            audience = claims.get('client_id')
+        else:
+            raise AuthError(f'unexpected token_use {token_use!r}')
+        if audience not in self.audiences:
+            raise AuthError('token was issued to another client')
+        return claims
+
+
+verifier = TokenVerifier(issuer_for(USER_POOL_ID), APP_CLIENT_IDS) if USER_POOL_ID else None
+
+
+def bearer_token(authorization):
+    scheme, _, token = (authorization or '').partition(' ')
+    if scheme.lower() != 'bearer' or not token.strip():
+        raise AuthError('missing bearer token')
+    return token.strip()
+
+
+def gateway_claims(event):
+    """Claims verified by an HTTP API JWT authorizer, if the event has them."""
+    authorizer = ((event or {}).get('requestContext') or {}).get('authorizer') or {}
+    return (authorizer.get('jwt') or {}).get('claims')
+
+
+def current_claims():
+    """Verify the current request's token and return its claims."""
+    claims = gateway_claims(request.environ.get('aws.event'))
+    if claims:
+        return claims
+    if verifier is None:
+        raise AuthError('token verification is not configured')
+    return verifier.verify(bearer_token(request.headers.get('Authorization')))
+
+
+def required(view):
+    """Route decorator: 401 unless the request carries a valid token.
+
+    The claims are available to the view as ``flask.g.claims``.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, **kwargs):
+        try:
+            g.claims = current_claims()
+        except AuthError as e:
+            abort(401, description=str(e))
+        except KeysUnavailableError as e:
+            abort(503, description=str(e))
+        return view(*args, **kwargs)
+
+    # read at synth time (api/routes.py)
+    wrapper.requires_auth = True
+    return wrapper
+
+
+def own_profile(view):
+    """Route decorator, under ``required``: 404 unless ``profile_id`` is the caller's.
+
+    A caller's profile is the one whose id is their ``sub``. The partitions
+    of other profiles (projects, goals) are not found, as other callers'
+    export jobs are not.
+    """
+
+    @functools.wraps(view)
+    def wrapper(*args, profile_id, **kwargs):
+        if profile_id != g.claims.get('sub'):
+            abort(404, description=f'profile {profile_id} not found')
+        return view(*args, profile_id=profile_id, **kwargs)
+
+    return wrapper
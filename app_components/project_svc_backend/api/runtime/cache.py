@@ -0,0 +1,115 @@
+"""Warm-container read-through cache.
+
+A Lambda container serves many requests in a row, and the React app asks for
+the same few users and profiles over and over. ``TTLCache`` keeps recent
+reads in module-global memory so repeated lookups within a container skip
+DynamoDB. Entries expire after a fixed TTL however often they are hit, so a
+container never serves data older than that. Write paths invalidate entries
+straight away.
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+MISSING = object()
+
+# cached in place of an item that does not exist (negative caching)
+NOT_FOUND = object()
+
+
+class TTLCache:
+    """Size-bounded LRU mapping with a per-entry time to live."""
+
+    def __init__(self, max_entries=1024, ttl=30.0, negative_ttl=5.0, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.clock = clock
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+
+    @property
+    def enabled(self):
+        return self.max_entries > 0 and self.ttl > 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        """Return the cached value for ``key``, or ``MISSING``."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return MISSING
+            expires, value = entry
+            if expires <= self.clock():
+                del self._entries[key]
+                self.expirations += 1
+                self.misses += 1
+                return MISSING
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def set(self, key, value, ttl=None):
+        if not self.enabled:
+            return
+        if ttl is None:
+            ttl = self.negative_ttl if value is NOT_FOUND else self.ttl
+        if ttl <= 0:
+            return
+        with self._lock:
+            self._entries[key] = (self.clock() + ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def invalidate(self, key):
+        with self._lock:
+            if self._entries.pop(key, None) is not None:
+                self.invalidations += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def get_or_load(self, key, load):
+        """Read through the cache, calling ``load()`` on a miss.
+
+        ``load`` returns ``None`` for a missing item; that result is cached
+        for ``negative_ttl`` and returned as ``None``.
+        """
+        value = self.get(key)
+        if value is MISSING:
+            value = load()
+            self.set(key, NOT_FOUND if value is None else value)
+            return value
+        return None if value is NOT_FOUND else value
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.evictions,
+            'expirations': self.expirations,
+            'invalidations': self.invalidations,
+        }
+
+
+def from_environment():
+    """Build a cache configured by the ``CACHE_*`` environment variables."""
+    return TTLCache(
+        max_entries=int(os.environ.get('CACHE_MAX_ENTRIES', 1024)),
+        ttl=float(os.environ.get('CACHE_TTL_SECONDS', 30)),
+        negative_ttl=float(os.environ.get('CACHE_NEGATIVE_TTL_SECONDS', 5)),
+    )
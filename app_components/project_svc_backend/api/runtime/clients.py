@@ -0,0 +1,302 @@
+"""Long-lived outbound clients, shared by every request a container serves.
+
+Creating a boto3 client or a ``requests`` call per use costs a fresh
+connection and TLS handshake each time. This module keeps them for the life
+of the container instead:
+
+* boto3 clients and resources are created once per (service, endpoint, pool
+  size) and share a botocore ``Config`` with a connection pool as wide as the
+  thread pool that uses them, TCP keepalive, adaptive retries and tight
+  connect/read timeouts;
+* ``http`` wraps one pooled ``requests.Session`` with per-host connection
+  limits, retries of idempotent calls on connection errors and 502/503/504,
+  a default timeout, and a per-host circuit breaker that fails fast with
+  ``CircuitOpenError`` after repeated failures;
+* ``take_connection_counts`` reports how many requests reused a pooled
+  connection and how many opened a new one since it was last called.
+
+Nothing is imported or created until first use.
+"""
+
+import os
+import threading
+import time
+import weakref
+from urllib.parse import urlsplit
+
+from lazy import lazy_import
+
+boto3 = lazy_import('boto3')
+botocore_config = lazy_import('botocore.config')
+requests = lazy_import('requests')
+urllib3_retry = lazy_import('urllib3.util.retry')
+
+MAX_POOL_CONNECTIONS = int(os.environ.get('AWS_MAX_POOL_CONNECTIONS', 10))
+AWS_CONNECT_TIMEOUT = float(os.environ.get('AWS_CONNECT_TIMEOUT', 2))
+AWS_READ_TIMEOUT = float(os.environ.get('AWS_READ_TIMEOUT', 5))
+AWS_MAX_ATTEMPTS = int(os.environ.get('AWS_MAX_ATTEMPTS', 3))
+
+HTTP_POOL_HOSTS = int(os.environ.get('HTTP_POOL_HOSTS', 10))
+HTTP_POOL_PER_HOST = int(os.environ.get('HTTP_POOL_PER_HOST', 10))
+HTTP_CONNECT_TIMEOUT = float(os.environ.get('HTTP_CONNECT_TIMEOUT', 2))
+HTTP_READ_TIMEOUT = float(os.environ.get('HTTP_READ_TIMEOUT', 5))
+HTTP_RETRIES = int(os.environ.get('HTTP_RETRIES', 2))
+RETRY_STATUSES = (502, 503, 504)
+BREAKER_FAILURES = int(os.environ.get('HTTP_BREAKER_FAILURES', 5))
+BREAKER_RESET_SECONDS = float(os.environ.get('HTTP_BREAKER_RESET_SECONDS', 30))
+
+_lock = threading.Lock()
+_session = None
+_clients = {}
+
+
+# AWS
+
+def aws_config(pool_size=None, **overrides):
+    """The botocore ``Config`` for a client used by ``pool_size`` threads."""
+    return botocore_config.Config(**{
+        'max_pool_connections': max(pool_size or 0, MAX_POOL_CONNECTIONS),
+        'connect_timeout': AWS_CONNECT_TIMEOUT,
+        'read_timeout': AWS_READ_TIMEOUT,
+        'tcp_keepalive': True,
+        'retries': {'mode': 'adaptive', 'max_attempts': AWS_MAX_ATTEMPTS},
+        **overrides,
+    })
+
+
+def session():
+    """The container's boto3 session."""
+    global _session
+    if _session is None:
+        with _lock:
+            if _session is None:
+                _session = boto3.session.Session()
+    return _session
+
+
+def _shared(kind, service, endpoint_url, pool_size, overrides):
+    # repr, as some options are dicts (retries)
+    cache_key = (kind, service, endpoint_url, pool_size, tuple(sorted((k, repr(v)) for k, v in overrides.items())))
+    found = _clients.get(cache_key)
+    if found is None:
+        aws_session = session()
+        # creating clients from one session is not thread-safe
+        with _lock:
+            found = _clients.get(cache_key)
+            if found is None:
+                factory = aws_session.client if kind == 'client' else aws_session.resource
+                found = _clients[cache_key] = factory(
+                    service, endpoint_url=endpoint_url, config=aws_config(pool_size, **overrides)
+                )
+    return found
+
+
+def client(service, *, endpoint_url=None, pool_size=None, **overrides):
+    """A shared boto3 client; ``overrides`` are extra ``Config`` options."""
+    return _shared('client', service, endpoint_url, pool_size, overrides)
+
+
+def resource(service, *, endpoint_url=None, pool_size=None, **overrides):
+    """A shared boto3 resource. Use it from one thread, its ``meta.client`` from many."""
+    return _shared('resource', service, endpoint_url, pool_size, overrides)
+
+
+# HTTP
+
+class CircuitOpenError(Exception):
+    """Calls to a host are short-circuited after repeated failures."""
+
+
+class CircuitBreaker:
+    """Closed, then open for ``reset_timeout`` after ``failure_threshold``
+    failures in a row, then half-open: one trial call closes or re-opens it.
+    """
+
+    def __init__(self, failure_threshold=BREAKER_FAILURES, reset_timeout=BREAKER_RESET_SECONDS,
+                 clock=time.monotonic):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.clock = clock
+        self.failures = 0
+        self.opened_at = None
+        self._trial = False
+        self._lock = threading.Lock()
+
+    @property
+    def state(self):
+        if self.opened_at is None:
+            return 'closed'
+        if self.clock() - self.opened_at >= self.reset_timeout:
+            return 'half-open'
+        return 'open'
+
+    def allow(self):
+        with self._lock:
+            state = self.state
+            if state == 'closed':
+                return True
+            if state == 'half-open' and not self._trial:
+                self._trial = True
+                return True
+            return False
+
+    def success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self.failures += 1
+            if self._trial or self.failures >= self.failure_threshold:
+                self.opened_at = self.clock()
+            self._trial = False
+
+    def abandon(self):
+        """The allowed call failed without telling anything about the host."""
+        with self._lock:
+            # another caller makes the trial instead
+            self._trial = False
+
+
+class HttpClient:
+    """A pooled ``requests.Session`` with timeouts, retries and circuit breaking."""
+
+    def __init__(self, *, pool_hosts=HTTP_POOL_HOSTS, pool_per_host=HTTP_POOL_PER_HOST,
+                 timeout=(HTTP_CONNECT_TIMEOUT, HTTP_READ_TIMEOUT), retries=HTTP_RETRIES,
+                 breaker_factory=CircuitBreaker):
+        self.pool_hosts = pool_hosts
+        self.pool_per_host = pool_per_host
+        self.timeout = timeout
+        self.retries = retries
+        self.breaker_factory = breaker_factory
+        self.breakers = {}
+        self._session = None
+        self._lock = threading.Lock()
+
+    @property
+    def session(self):
+        if self._session is None:
+            with self._lock:
+                if self._session is None:
+                    self._session = self._create_session()
+        return self._session
+
+    def _create_session(self):
+        retry = urllib3_retry.Retry(
+            total=self.retries,
+            connect=self.retries,
+            read=self.retries,
+            status=self.retries,
+            status_forcelist=RETRY_STATUSES,
+            backoff_factor=0.1,
+            # a response with a retryable status is returned once retries run out
+            raise_on_status=False,
+        )
+        adapter = requests.adapters.HTTPAdapter(
+            pool_connections=self.pool_hosts,
+            pool_maxsize=self.pool_per_host,
+            max_retries=retry,
+        )
+        http_session = requests.Session()
+        http_session.mount('https://', adapter)
+        http_session.mount('http://', adapter)
+        return http_session
+
+    def breaker(self, host):
+        found = self.breakers.get(host)
+        if found is None:
+            with self._lock:
+                found = self.breakers.setdefault(host, self.breaker_factory())
+        return found
+
+    def request(self, method, url, **kwargs):
+        host = urlsplit(url).netloc
+        breaker = self.breaker(host)
+        if not breaker.allow():
+            raise CircuitOpenError(f'circuit open for {host}')
+        kwargs.setdefault('timeout', self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            breaker.failure()
+            raise
+        except BaseException:
+            # e.g. ValueError for a timeout that has run out; the breaker must not stay half-open
+            breaker.abandon()
+            raise
+        if response.status_code >= 500:
+            breaker.failure()
+        else:
+            breaker.success()
+        return response
+
+    def get(self, url, **kwargs):
+        return self.request('GET', url, **kwargs)
+
+    def post(self, url, **kwargs):
+        return self.request('POST', url, **kwargs)
+
+    def pools(self):
+        if self._session is None:
+            return []
+        return [pool for adapter in self._session.adapters.values() for pool in _manager_pools(adapter.poolmanager)]
+
+
+http = HttpClient()
+
+
+# connection reuse
+
+# last (requests, connections) seen per urllib3 pool
+_seen = weakref.WeakKeyDictionary()
+
+
+def _manager_pools(manager):
+    pools = getattr(manager, 'pools', None)
+    if pools is None:
+        return []
+    with pools.lock:
+        return list(pools._container.values())
+
+
+def _aws_pools():
+    for shared in list(_clients.values()):
+        botocore_client = getattr(shared, 'meta', None)
+        botocore_client = getattr(botocore_client, 'client', shared)
+        # botocore's URLLib3Session keeps its PoolManager private
+        manager = getattr(getattr(getattr(botocore_client, '_endpoint', None), 'http_session', None), '_manager', None)
+        yield from _manager_pools(manager)
+
+
+def take_connection_counts():
+    """Return ``(new, reused)`` connections used since the previous call."""
+    new = reused = 0
+    for pool in [*_aws_pools(), *http.pools()]:
+        requests_done, connections = pool.num_requests, pool.num_connections
+        last_requests, last_connections = _seen.get(pool, (0, 0))
+        _seen[pool] = (requests_done, connections)
+        opened = connections - last_connections
+        new += opened
+        reused += max(requests_done - last_requests - opened, 0)
+    return new, reused
+
+
+def drop_connections():
+    """Close every pooled connection, e.g. after a SnapStart restore."""
+    managers = [adapter.poolmanager for adapter in http.session.adapters.values()] if http._session else []
+    for shared in list(_clients.values()):
+        botocore_client = getattr(getattr(shared, 'meta', None), 'client', shared)
+        managers.append(getattr(getattr(getattr(botocore_client, '_endpoint', None), 'http_session', None), '_manager', None))
+    for manager in filter(None, managers):
+        manager.clear()
+
+
+def reset():
+    """Forget every shared client, e.g. between tests."""
+    global _session, http
+    with _lock:
+        _session = None
+        _clients.clear()
+    http = HttpClient()
@@ -0,0 +1,85 @@
+"""``Accept-Encoding`` negotiation and response compression.
+
+Large JSON list responses compress 5-10x, and API Gateway and the client's
+network are billed by the byte, so the adapter compresses bodies above
+``COMPRESSION_MIN_BYTES`` with brotli (when the ``brotli`` wheel is
+installed) or gzip. A negative threshold turns compression off.
+
+The levels default to the low end of each codec, which keeps most of the size
+win for a fraction of the CPU of the maximum levels; run
+``benchmarks/compression_bench.py`` to see the trade-off on a real payload.
+"""
+
+import gzip
+import os
+
+try:
+    import brotli
+except ImportError:  # gzip only
+    brotli = None
+
+MIN_BYTES = int(os.environ.get('COMPRESSION_MIN_BYTES', 1024))
+GZIP_LEVEL = int(os.environ.get('COMPRESSION_GZIP_LEVEL', 5))
+BROTLI_QUALITY = int(os.environ.get('COMPRESSION_BROTLI_QUALITY', 4))
+
+# server preference when the client weights encodings equally
+SUPPORTED = ('br', 'gzip') if brotli is not None else ('gzip',)
+
+COMPRESSIBLE_MIME_TYPES = (
+    'application/json',
+    'application/javascript',
+    'application/xml',
+    'image/svg+xml',
+)
+
+
+def enabled():
+    return MIN_BYTES >= 0
+
+
+def is_compressible(content_type):
+    if not content_type:
+        return False
+    mime = content_type.split(';', 1)[0].strip().lower()
+    return (
+        mime.startswith('text/')
+        or mime in COMPRESSIBLE_MIME_TYPES
+        or mime.endswith('+json')
+        or mime.endswith('+xml')
+    )
+
+
+def negotiate(accept_encoding):
+    """Pick the best supported encoding from an ``Accept-Encoding`` value."""
+    if not accept_encoding:
+        return None
+    weights = {}
+    for part in accept_encoding.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        q = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                q = float(params[2:])
+            except ValueError:
+                q = 0.0
+        weights[coding] = q
+
+    best, best_q = None, 0.0
+    for coding in SUPPORTED:
+        q = weights.get(coding, weights.get('*', 0.0))
+        if q > best_q:
+            best, best_q = coding, q
+    return best
+
+
+def compress(body, encoding, *, gzip_level=None, brotli_quality=None):
+    if encoding == 'br':
+        return brotli.compress(
+            body,
+            mode=brotli.MODE_TEXT,
+            quality=BROTLI_QUALITY if brotli_quality is None else brotli_quality,
+        )
+    # mtime=0 makes identical bodies compress to identical bytes
+    return gzip.compress(body, compresslevel=GZIP_LEVEL if gzip_level is None else gzip_level, mtime=0)
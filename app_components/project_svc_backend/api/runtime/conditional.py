@@ -0,0 +1,113 @@
+"""Strong ETags and conditional GET handling.
+
+Table-backed responses derive their ETag from the ``id``/``version`` of the
+items they contain, so a matching ``If-None-Match`` is answered with 304
+before anything is serialized. Other GET responses get a content hash ETag
+once the body exists.
+
+The adapter appends ``-gzip``/``-br`` to the ETag of a compressed response,
+since the compressed bytes are a different representation. Validators sent
+back by clients are compared with that suffix removed.
+"""
+
+import datetime
+import hashlib
+
+from flask import current_app, jsonify, request
+
+ENCODING_SUFFIXES = ('-gzip', '-br')
+CACHE_CONTROL = 'no-cache'
+
+
+def _digest(parts):
+    h = hashlib.blake2b(digest_size=16)
+    for part in parts:
+        h.update(part)
+        h.update(b'\0')
+    return h.hexdigest()
+
+
+def content_etag(body):
+    """Return a strong ETag (without quotes) for raw response bytes."""
+    return hashlib.blake2b(body, digest_size=16).hexdigest()
+
+
+def items_etag(items, *extra):
+    """Return a strong ETag (without quotes) from item ids and versions."""
+    parts = [f"{item.get('id')}:{item.get('version')}".encode() for item in items]
+    parts += [str(value).encode() for value in extra]
+    return _digest(parts)
+
+
+def last_modified(items):
+    """Return the newest ``updated_at`` of ``items`` as a datetime, if any."""
+    stamps = [item['updated_at'] for item in items if item.get('updated_at')]
+    if not stamps:
+        return None
+    return datetime.datetime.fromisoformat(max(stamps)).replace(microsecond=0)
+
+
+def _strip_suffix(tag):
+    for suffix in ENCODING_SUFFIXES:
+        if tag.endswith(suffix):
+            return tag[:-len(suffix)]
+    return tag
+
+
+def is_not_modified(etag, modified=None):
+    """Evaluate ``If-None-Match``/``If-Modified-Since`` for the current request."""
+    if request.method not in ('GET', 'HEAD'):
+        return False
+    if_none_match = request.if_none_match
+    if if_none_match:
+        if if_none_match.star_tag:
+            return True
+        return any(_strip_suffix(tag) == etag for tag in if_none_match.as_set(include_weak=True))
+    since = request.if_modified_since
+    if since is not None and modified is not None:
+        return modified <= since
+    return False
+
+
+def not_modified(etag, modified=None):
+    response = current_app.response_class(status=304)
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def respond(payload, items, *extra):
+    """Return ``payload`` as JSON, or 304 when the client's copy is current.
+
+    ``items`` are the table items the payload was built from; their ids and
+    versions, plus any ``extra`` values such as a paging cursor, decide the
+    ETag.
+    """
+    etag = items_etag(items, *extra)
+    modified = last_modified(items)
+    if is_not_modified(etag, modified):
+        return not_modified(etag, modified)
+    response = jsonify(payload)
+    response.set_etag(etag)
+    if modified is not None:
+        response.last_modified = modified
+    response.headers['Cache-Control'] = CACHE_CONTROL
+    return response
+
+
+def add_content_etag(response):
+    """``after_request`` hook: hash-based ETag for GET responses without one."""
+    if (
+        request.method not in ('GET', 'HEAD')
+        or response.status_code != 200
+        or response.direct_passthrough
+        or 'ETag' in response.headers
+    ):
+        return response
+    etag = content_etag(response.get_data())
+    if is_not_modified(etag):
+        return not_modified(etag)
+    response.set_etag(etag)
+    return response
@@ -0,0 +1,272 @@
+"""Asynchronous export of one entity type to S3 as gzip-compressed NDJSON.
+
+``POST /exports`` records a job in the table (``EXPORT#<job_id>``/``JOB``)
+and invokes the export function asynchronously, so the API answers at once
+whatever the table size. The export function (``exporter.main``):
+
+* runs a parallel ``Scan`` of the ``gsi1`` index, one thread per
+  ``Segment``, filtered to the entity's list key;
+* feeds the pages through a bounded queue to a single writer that gzips one
+  JSON object per line and sends it to S3 as a multipart upload, in parts
+  of ``PART_BYTES``, so memory use doesn't grow with the export's size;
+* updates the job with its status, item count and object key.
+
+``GET /exports/<job_id>`` returns the job, plus a short-lived presigned
+download URL once it has completed. Both routes need a token, and a job is
+only shown to the caller who started it (``requested_by``, the token's
+``sub``).
+"""
+
+import datetime
+import json
+import logging
+import os
+import queue
+import threading
+import uuid
+import zlib
+
+import clients
+import fastjson
+import repository
+from lazy import lazy_import
+from repository import Repository
+
+conditions = lazy_import('boto3.dynamodb.conditions')
+
+logger = logging.getLogger(__name__)
+
+EXPORTABLE = tuple(repository.ENTITIES)
+BUCKET = os.environ.get('EXPORT_BUCKET', '')
+FUNCTION_NAME = os.environ.get('EXPORT_FUNCTION_NAME', '')
+TOTAL_SEGMENTS = int(os.environ.get('EXPORT_SEGMENTS', 8))
+# S3 parts must be at least 5 MiB, except the last one
+PART_BYTES = 8 * 1024 * 1024
+SCAN_PAGE_LIMIT = 1000
+URL_EXPIRES_SECONDS = 900
+JOB_TTL = datetime.timedelta(days=7)
+GZIP_LEVEL = 6
+
+
+def _now():
+    return datetime.datetime.now(datetime.timezone.utc)
+
+
+# jobs
+
+def job_key(job_id):
+    return {'pk': f'EXPORT#{job_id}', 'sk': 'JOB'}
+
+
+def create_job(repo, entity, requested_by=None):
+    now = _now()
+    job = {
+        'job_id': uuid.uuid4().hex,
+        'entity': entity,
+        'status': 'queued',
+        'created_at': now.isoformat(),
+    }
+    if requested_by is not None:
+        job['requested_by'] = requested_by
+    repo.table.put_item(Item={
+        **job_key(job['job_id']),
+        **job,
+        repository.TTL_ATTRIBUTE: int((now + JOB_TTL).timestamp()),
+    })
+    return job
+
+
+def get_job(repo, job_id):
+    response = repo.table.get_item(Key=job_key(job_id), ConsistentRead=True)
+    return repository.public(response.get('Item'))
+
+
+def update_job(repo, job_id, **fields):
+    names = {f'#f{i}': name for i, name in enumerate(fields)}
+    values = {f':f{i}': value for i, value in enumerate(fields.values())}
+    repo.table.update_item(
+        Key=job_key(job_id),
+        UpdateExpression='SET ' + ', '.join(f'#f{i} = :f{i}' for i in range(len(fields))),
+        ExpressionAttributeNames=names,
+        ExpressionAttributeValues=values,
+    )
+
+
+def start(repo, entity, *, requested_by=None, lambda_client=None):
+    """Record an export job and hand it to the export function."""
+    if not FUNCTION_NAME:
+        raise RuntimeError('EXPORT_FUNCTION_NAME is not set')
+    job = create_job(repo, entity, requested_by)
+    (lambda_client or clients.client('lambda')).invoke(
+        FunctionName=FUNCTION_NAME,
+        InvocationType='Event',
+        Payload=json.dumps({'job_id': job['job_id'], 'entity': entity}).encode(),
+    )
+    return job
+
+
+def download_url(job, *, s3=None, expires_in=URL_EXPIRES_SECONDS):
+    return (s3 or clients.client('s3')).generate_presigned_url(
+        'get_object',
+        Params={'Bucket': job['bucket'], 'Key': job['key']},
+        ExpiresIn=expires_in,
+    )
+
+
+# the export itself
+
+class MultipartGzipWriter:
+    """Gzip a byte stream into an S3 multipart upload, one part per ``PART_BYTES``."""
+
+    def __init__(self, s3, bucket, key, *, part_bytes=None):
+        self.s3 = s3
+        self.bucket = bucket
+        self.key = key
+        self.part_bytes = part_bytes or PART_BYTES
+        self.upload_id = s3.create_multipart_upload(
+            Bucket=bucket,
+            Key=key,
+            ContentType='application/x-ndjson',
+            ContentEncoding='gzip',
+        )['UploadId']
+        # wbits 31: gzip container
+        self._compressor = zlib.compressobj(GZIP_LEVEL, zlib.DEFLATED, 31)
+        self._buffer = bytearray()
+        self.parts = []
+        self.bytes_written = 0
+
+    def write(self, data):
+        self._buffer += self._compressor.compress(data)
+        if len(self._buffer) >= self.part_bytes:
+            self._upload_part()
+
+    def _upload_part(self):
+        number = len(self.parts) + 1
+        response = self.s3.upload_part(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            PartNumber=number,
+            Body=bytes(self._buffer),
+        )
+        self.parts.append({'ETag': response['ETag'], 'PartNumber': number})
+        self.bytes_written += len(self._buffer)
+        self._buffer.clear()
+
+    def close(self):
+        self._buffer += self._compressor.flush()
+        self._upload_part()
+        self.s3.complete_multipart_upload(
+            Bucket=self.bucket,
+            Key=self.key,
+            UploadId=self.upload_id,
+            MultipartUpload={'Parts': self.parts},
+        )
+
+    def abort(self):
+        self.s3.abort_multipart_upload(Bucket=self.bucket, Key=self.key, UploadId=self.upload_id)
+
+
+_DONE = object()
+
+
+def scan_segment(repo, entity, segment, total_segments, pages):
+    """Put every page of one scan segment on ``pages``, then ``_DONE``."""
+    _, list_key = repository.ENTITIES[entity]
+    params = {
+        'TableName': repo.table_name,
+        'IndexName': repository.GSI1,
+        'FilterExpression': conditions.Attr('gsi1pk').eq(list_key),
+        'Segment': segment,
+        'TotalSegments': total_segments,
+        'Limit': SCAN_PAGE_LIMIT,
+    }
+    try:
+        while True:
+            # the resource's client: thread-safe, still (de)serializes values
+            response = repo.client.scan(**params)
+            if response.get('Items'):
+                pages.put(response['Items'])
+            if 'LastEvaluatedKey' not in response:
+                break
+            params['ExclusiveStartKey'] = response['LastEvaluatedKey']
+    except Exception as e:
+        pages.put(e)
+    finally:
+        pages.put(_DONE)
+
+
+def run_export(repo, job_id, entity, *, bucket=None, s3=None, segments=TOTAL_SEGMENTS):
+    """Scan ``entity`` in ``segments`` parallel segments into one S3 object."""
+    bucket = bucket or BUCKET
+    s3 = s3 or clients.client('s3')
+    key = f'exports/{entity}/{job_id}.ndjson.gz'
+    update_job(repo, job_id, status='running', started_at=_now().isoformat(), bucket=bucket, key=key)
+
+    pages = queue.Queue(maxsize=2 * segments)
+    threads = [
+        threading.Thread(
+            target=scan_segment,
+            args=(repo, entity, segment, segments, pages),
+            name=f'export-scan-{segment}',
+            daemon=True,
+        )
+        for segment in range(segments)
+    ]
+    writer = MultipartGzipWriter(s3, bucket, key)
+    items = 0
+    try:
+        for thread in threads:
+            thread.start()
+        running = segments
+        while running:
+            page = pages.get()
+            if page is _DONE:
+                running -= 1
+                continue
+            if isinstance(page, Exception):
+                raise page
+            writer.write(b''.join(
+                fastjson.dumps(repository.public(item)) + b'\n'
+                for item in page
+            ))
+            items += len(page)
+        writer.close()
+    except Exception as e:
+        logger.exception('export %s failed', job_id)
+        writer.abort()
+        update_job(repo, job_id, status='failed', error=str(e), completed_at=_now().isoformat())
+        # let the scan threads finish rather than block on a full queue
+        while any(thread.is_alive() for thread in threads):
+            try:
+                pages.get(timeout=0.1)
+            except queue.Empty:
+                pass
+        raise
+
+    update_job(
+        repo,
+        job_id,
+        status='completed',
+        items=items,
+        bytes=writer.bytes_written,
+        completed_at=_now().isoformat(),
+    )
+    return get_job(repo, job_id)
+
+
+# AWS Lambda handler
+def main(event, context):
+    """Run the export described by ``{"job_id": ..., "entity": ...}``.
+
+    Only a queued job runs: an event delivered twice does not export again.
+    """
+    logging.getLogger().setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+    repo = Repository(pool_size=TOTAL_SEGMENTS)
+    job = get_job(repo, event['job_id'])
+    if job is None or job['status'] != 'queued':
+        logger.warning('export %s is not queued, skipping it', event['job_id'])
+        return job
+    job = run_export(repo, event['job_id'], event['entity'])
+    logger.info('export %s: %s items, %s bytes', job['job_id'], job['items'], job['bytes'])
+    return job
@@ -0,0 +1,125 @@
+"""Run independent reads concurrently under one deadline.
+
+An aggregate route calls ``gather`` with one callable per section. The
+sections run on a shared thread pool and ``gather`` returns when all of them
+are done or the deadline passes, whichever comes first. A section that is
+still running then is reported as ``timeout``; one that raised is reported
+as ``error``. Either way the other sections are returned as they are, so the
+caller can answer with what it has.
+
+Python threads cannot be stopped, so timed-out work is bounded instead:
+
+* a section that has not started by the deadline never starts;
+* one that is running keeps its worker until its own timeouts end it, so
+  each section gets the ``Deadline`` to size those timeouts to the time
+  that is left;
+* while ``MAX_OVERRUNNING`` workers are still busy with sections that
+  missed an earlier deadline, ``gather`` reports every section as an error
+  at once instead of queueing behind them.
+"""
+
+import concurrent.futures
+import os
+import threading
+import time
+
+OK = 'ok'
+TIMEOUT = 'timeout'
+ERROR = 'error'
+
+FANOUT_WORKERS = int(os.environ.get('FANOUT_WORKERS', 8))
+# workers that may be left running sections past their deadline
+MAX_OVERRUNNING = max(FANOUT_WORKERS // 2, 1)
+# time kept back from the function's own timeout for building the response
+CONTEXT_MARGIN_SECONDS = 0.2
+
+_executor = None
+_lock = threading.Lock()
+# futures of sections still running after their gather returned
+_overrunning = set()
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(
+            max_workers=FANOUT_WORKERS, thread_name_prefix='fanout'
+        )
+    return _executor
+
+
+class Deadline:
+    """A point in time, ``seconds`` from now."""
+
+    def __init__(self, seconds, clock=time.monotonic):
+        self.clock = clock
+        self.expires_at = clock() + seconds
+
+    @classmethod
+    def within(cls, seconds, context=None, clock=time.monotonic):
+        """``seconds`` from now, or earlier if the invocation ends before that."""
+        remaining_ms = getattr(context, 'get_remaining_time_in_millis', None)
+        if remaining_ms is not None:
+            seconds = min(seconds, remaining_ms() / 1000 - CONTEXT_MARGIN_SECONDS)
+        return cls(max(seconds, 0), clock)
+
+    def remaining(self):
+        return max(self.expires_at - self.clock(), 0)
+
+
+def overrunning():
+    """How many workers are busy with sections that missed their deadline."""
+    with _lock:
+        return len(_overrunning)
+
+
+def _abandon(future):
+    with _lock:
+        _overrunning.add(future)
+    # runs at once if the section has finished in the meantime
+    future.add_done_callback(_finished)
+
+
+def _finished(future):
+    with _lock:
+        _overrunning.discard(future)
+
+
+def _run(source, deadline):
+    if deadline.remaining() <= 0:
+        # queued past the deadline: the caller has stopped waiting for it
+        return TIMEOUT, None, None, 0.0
+    started = time.perf_counter()
+    try:
+        return OK, source(deadline), None, time.perf_counter() - started
+    except Exception as e:
+        return ERROR, None, str(e) or type(e).__name__, time.perf_counter() - started
+
+
+def gather(sources, deadline):
+    """Call each of ``sources`` (``{name: callable(deadline)}``) concurrently.
+
+    Returns ``{name: {'status', 'data', 'ms'[, 'error']}}`` in the order of
+    ``sources``; ``data`` is ``None`` unless the status is ``ok``.
+    """
+    if overrunning() >= MAX_OVERRUNNING:
+        return {name: {'status': ERROR, 'data': None, 'error': 'fan-out workers are busy'} for name in sources}
+
+    futures = {name: executor().submit(_run, source, deadline) for name, source in sources.items()}
+    concurrent.futures.wait(futures.values(), timeout=deadline.remaining())
+
+    sections = {}
+    for name, future in futures.items():
+        if not future.done():
+            if not future.cancel():
+                _abandon(future)
+            sections[name] = {'status': TIMEOUT, 'data': None}
+            continue
+        status, data, error, seconds = future.result()
+        if status == TIMEOUT:
+            sections[name] = {'status': TIMEOUT, 'data': None}
+            continue
+        sections[name] = {'status': status, 'data': data, 'ms': round(seconds * 1000, 3)}
+        if error is not None:
+            sections[name]['error'] = error
+    return sections
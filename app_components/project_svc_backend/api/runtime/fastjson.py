@@ -0,0 +1,104 @@
+"""JSON encoding for the runtime: orjson when installed, the stdlib otherwise.
+
+Items read from DynamoDB hold ``Decimal`` numbers, ``set`` values and
+``Binary`` blobs, none of which the json module can encode. Rather than copy
+every item into plain types first, ``dumps`` hands them to ``default`` as
+the encoder meets them:
+
+* ``Decimal``: ``int`` when integral (and within 64 bits), ``float`` otherwise;
+* ``set``/``frozenset``: a sorted list;
+* ``bytes`` and boto3 ``Binary``: base64 text;
+* ``date``/``datetime``: ISO 8601 (orjson does these natively).
+
+``FastJSONProvider`` serves Flask's ``jsonify`` with it and builds the
+response straight from the encoded bytes, with no ``str`` round trip.
+``benchmarks/json_bench.py`` compares it with Flask's default provider.
+"""
+
+import base64
+import datetime
+import decimal
+import json
+
+from flask.json.provider import DefaultJSONProvider
+
+try:
+    import orjson
+except ImportError:  # stdlib only
+    orjson = None
+
+_INT64_LIMIT = 2 ** 63
+
+
+def default(value):
+    """Encode the types DynamoDB returns that JSON has no native form for."""
+    if isinstance(value, decimal.Decimal):
+        if value == value.to_integral_value() and abs(value) < _INT64_LIMIT:
+            return int(value)
+        return float(value)
+    if isinstance(value, (set, frozenset)):
+        try:
+            return sorted(value)
+        except TypeError:
+            return list(value)
+    if isinstance(value, (bytes, bytearray, memoryview)) or hasattr(value, '__bytes__'):
+        return base64.b64encode(bytes(value)).decode('ascii')
+    if isinstance(value, (datetime.date, datetime.time)):
+        return value.isoformat()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
+
+
+def dumps(obj, *, sort_keys=False, indent=False):
+    """Encode ``obj`` as compact UTF-8 JSON bytes."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS
+        if sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if indent:
+            option |= orjson.OPT_INDENT_2
+        return orjson.dumps(obj, default=default, option=option)
+    return json.dumps(
+        obj,
+        default=default,
+        sort_keys=sort_keys,
+        indent=2 if indent else None,
+        separators=None if indent else (',', ':'),
+        ensure_ascii=False,
+    ).encode('utf-8')
+
+
+def loads(data):
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(DefaultJSONProvider):
+    """Flask JSON provider backed by ``dumps``/``loads``.
+
+    Honours ``sort_keys`` (on by default, as in Flask, which keeps bodies and
+    their ETags stable) and ``compact``; ``ensure_ascii`` is ignored, bodies
+    are always UTF-8.
+    """
+
+    def _indent(self):
+        return self.compact is False or (self.compact is None and self._app.debug)
+
+    def dumps_bytes(self, obj, **kwargs):
+        return dumps(obj, sort_keys=kwargs.get('sort_keys', self.sort_keys), indent=self._indent())
+
+    def dumps(self, obj, **kwargs):
+        return self.dumps_bytes(obj, **kwargs).decode('utf-8')
+
+    def loads(self, s, **kwargs):
+        return loads(s)
+
+    def response(self, *args, **kwargs):
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(self.dumps_bytes(obj) + b'\n', mimetype=self.mimetype)
+
+
+def install(app):
+    """Serve ``app``'s JSON with ``FastJSONProvider``."""
+    app.json = FastJSONProvider(app)
+    return app
@@ -0,0 +1,84 @@
+"""Flush the API Gateway stage cache after writes.
+
+A write can be visible through many stage cache entries: the item's own
+and every ``limit``/``cursor`` page of the list it is in, once per caller,
+since the cache keys authenticated routes on the ``Authorization`` header
+too (see ``api/routes.py``). They cannot be
+refreshed one request at a time, so a write to an entity shown by a
+stage-cached route flushes the whole stage cache with the API Gateway
+``FlushStageCache`` call, which the function's role is allowed to make.
+
+The flush runs on a background thread, off the request path, and writes
+that arrive while one is pending share it. Lambda may freeze the
+environment before it finishes; it then completes on the next invocation.
+Either way the entries' TTL bounds how long a stale entry is served.
+
+``API_CACHE_REST_API_ID`` is only set when the stage cache is enabled;
+without it every call here is a no-op.
+"""
+
+import concurrent.futures
+import logging
+import os
+import threading
+
+import clients
+from lazy import lazy_import
+
+botocore_exceptions = lazy_import('botocore.exceptions')
+
+logger = logging.getLogger(__name__)
+
+REST_API_ID = os.environ.get('API_CACHE_REST_API_ID', '')
+STAGE_NAME = os.environ.get('API_CACHE_STAGE_NAME', 'api')
+
+# entities whose items are served by stage-cached routes
+CACHED_ENTITIES = frozenset(('profile',))
+
+_lock = threading.Lock()
+_pending = None
+_executor = None
+
+
+def executor():
+    global _executor
+    if _executor is None:
+        _executor = concurrent.futures.ThreadPoolExecutor(max_workers=1, thread_name_prefix='stage-cache')
+    return _executor
+
+
+def flush():
+    """Drop every entry of the stage cache. Returns whether it worked."""
+    if not REST_API_ID:
+        return False
+    try:
+        clients.client('apigateway').flush_stage_cache(restApiId=REST_API_ID, stageName=STAGE_NAME)
+    except (botocore_exceptions.BotoCoreError, botocore_exceptions.ClientError):
+        logger.warning('stage cache flush failed', exc_info=True)
+        return False
+    return True
+
+
+def _flush_pending():
+    global _pending
+    # a write from here on needs a flush of its own
+    with _lock:
+        _pending = None
+    return flush()
+
+
+def schedule_flush():
+    """Flush the stage cache in the background; returns the pending flush."""
+    global _pending
+    if not REST_API_ID:
+        return None
+    with _lock:
+        if _pending is None:
+            _pending = executor().submit(_flush_pending)
+        return _pending
+
+
+def on_write(entity, entity_id):
+    """Repository write listener: flush the stage cache if it may hold the item."""
+    if entity in CACHED_ENTITIES:
+        schedule_flush()
@@ -1,17 +1,106 @@
 #!/usr/bin/env python3
 
-import boto3
-import requests
-import json
+import importlib
 import logging
 import os
-import hmac
-import datetime
-from urllib.parse import urlparse
+import random
 
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, abort, g
+from werkzeug.exceptions import HTTPException
+
+import adapter
+import auth
+import cache
+import clients
+import conditional
+import exporter
+import fanout
+import fastjson
+import gateway_cache
+import metrics
+import schemas
+import warmup
+from repository import InvalidCursorError, Repository
+
+logger = logging.getLogger(__name__)
 
 app = Flask(__name__)
+app.after_request(conditional.add_content_etag)
+fastjson.install(app)
+metrics.install(app)
+
+# module-global so the shared boto3 resource (see clients) is reused across warm invocations
+repository = Repository()
+
+# item reads by (entity, id), kept for the life of the container
+item_cache = cache.from_environment()
+
+
+def invalidate_item(entity, entity_id):
+    item_cache.invalidate((entity, entity_id))
+
+
+repository.write_listeners.append(invalidate_item)
+repository.write_listeners.append(gateway_cache.on_write)
+
+
+def read_item(entity, entity_id):
+    # Cache-Control: max-age=0 / no-cache asks for a fresh read
+    if request.cache_control.no_cache or request.cache_control.max_age == 0:
+        item_cache.invalidate((entity, entity_id))
+    return item_cache.get_or_load(
+        (entity, entity_id),
+        lambda: repository.get(entity, entity_id),
+    )
+
+
+def read_items(entity, entity_ids):
+    """Batch ``read_item``: cached items first, one fan-out for the rest."""
+    unique = list(dict.fromkeys(entity_ids))
+    items = {}
+    if not (request.cache_control.no_cache or request.cache_control.max_age == 0):
+        for entity_id in unique:
+            value = item_cache.get((entity, entity_id))
+            if value is not cache.MISSING:
+                items[entity_id] = None if value is cache.NOT_FOUND else value
+    pending = [entity_id for entity_id in unique if entity_id not in items]
+    if pending:
+        for entity_id, item in zip(pending, repository.get_many(entity, pending)):
+            item_cache.set((entity, entity_id), cache.NOT_FOUND if item is None else item)
+            items[entity_id] = item
+    return [items[entity_id] for entity_id in entity_ids]
+
+MAX_PAGE_SIZE = 100
+# the goals service's stage URL, read by the dashboard
+GOALS_API_URL = os.environ.get('GOALS_API_URL', '').rstrip('/')
+DASHBOARD_DEADLINE_SECONDS = float(os.environ.get('DASHBOARD_DEADLINE_MS', 1000)) / 1000
+
+
+def page_args():
+    try:
+        limit = int(request.args.get('limit', 50))
+    except ValueError:
+        abort(400, description='limit must be an integer')
+    return {
+        'limit': max(1, min(limit, MAX_PAGE_SIZE)),
+        'cursor': request.args.get('cursor'),
+    }
+
+
+EXPORT_REQUEST = {
+    'title': 'ExportRequest',
+    'type': 'object',
+    'required': ['entity'],
+    'properties': {'entity': {'type': 'string', 'enum': list(exporter.EXPORTABLE)}},
+}
+
+
+def batch_get(entity, collection):
+    # results line up with the requested ids; misses are null and listed once
+    ids = schemas.json_body()['ids']
+    items = read_items(entity, ids)
+    missing = list(dict.fromkeys(i for i, item in zip(ids, items) if item is None))
+    return jsonify({collection: items, "missing": missing})
 
 
 @app.route('/')
@@ -19,54 +108,200 @@ def index():
     return jsonify(status=200, message='Hello Flask!')
 
 @app.route('/users', methods=['GET'])
+@schemas.route(query=schemas.PAGE_QUERY, responses={200: schemas.page('users')})
 def get_users():
-    return jsonify({"users": ["123", "456"]})
+    users, next_cursor = repository.list('user', **page_args())
+    return conditional.respond({"users": users, "next_cursor": next_cursor}, users, next_cursor)
 
 @app.route('/users/<user_id>', methods=['GET'])
+@schemas.route(responses={200: schemas.ITEM})
 def get_user(user_id):
-    return jsonify({"user_id": user_id, "name": f"User {user_id}"})
+    user = read_item('user', user_id)
+    if user is None:
+        abort(404, description=f'user {user_id} not found')
+    return conditional.respond(user, [user])
+
+@app.route('/users/<user_id>', methods=['PUT'])
+@schemas.route(body=schemas.ITEM_BODY, responses={200: schemas.ITEM})
+def put_user(user_id):
+    return jsonify(repository.put('user', user_id, schemas.json_body()))
+
+@app.route('/users:batchGet', methods=['POST'])
+@schemas.route(body=schemas.BATCH_GET, responses={200: schemas.batch_result('users')})
+def batch_get_users():
+    return batch_get('user', 'users')
+
+@app.route('/profiles', methods=['GET'])
+@auth.required
+@schemas.route(query=schemas.PAGE_QUERY, responses={200: schemas.page('profiles')})
+def get_profiles():
+    profiles, next_cursor = repository.list('profile', **page_args())
+    return conditional.respond({"profiles": profiles, "next_cursor": next_cursor}, profiles, next_cursor)
+
+@app.route('/profiles/<profile_id>', methods=['GET'])
+@auth.required
+@schemas.route(responses={200: schemas.ITEM})
+def get_profile(profile_id):
+    profile = read_item('profile', profile_id)
+    if profile is None:
+        abort(404, description=f'profile {profile_id} not found')
+    return conditional.respond(profile, [profile])
+
+@app.route('/profiles/<profile_id>', methods=['PUT'])
+@auth.required
+@schemas.route(body=schemas.ITEM_BODY, responses={200: schemas.ITEM})
+def put_profile(profile_id):
+    return jsonify(repository.put('profile', profile_id, schemas.json_body()))
+
+@app.route('/profiles:batchGet', methods=['POST'])
+@auth.required
+@schemas.route(body=schemas.BATCH_GET, responses={200: schemas.batch_result('profiles')})
+def batch_get_profiles():
+    return batch_get('profile', 'profiles')
+
+@app.route('/profiles/<profile_id>/projects', methods=['GET'])
+@auth.required
+@auth.own_profile
+@schemas.route(query=schemas.PAGE_QUERY, responses={200: schemas.page('projects')})
+def get_projects(profile_id):
+    projects, next_cursor = repository.list_projects(profile_id, **page_args())
+    return conditional.respond({"projects": projects, "next_cursor": next_cursor}, projects, next_cursor)
+
+@app.route('/profiles/<profile_id>/projects/<project_id>', methods=['PUT'])
+@auth.required
+@auth.own_profile
+@schemas.route(body=schemas.ITEM_BODY, responses={200: schemas.ITEM})
+def put_project(profile_id, project_id):
+    return jsonify(repository.put_project(profile_id, project_id, schemas.json_body()))
+
+
+def fetch_goals(profile_id, authorization, deadline):
+    if not GOALS_API_URL:
+        raise RuntimeError('GOALS_API_URL is not set')
+    # the caller's token is forwarded; the goals service verifies it too
+    response = clients.http.get(
+        f'{GOALS_API_URL}/profiles/{profile_id}/goals',
+        headers={'Authorization': authorization} if authorization else {},
+        timeout=(min(clients.HTTP_CONNECT_TIMEOUT, deadline.remaining()), deadline.remaining()),
+    )
+    response.raise_for_status()
+    return response.json()['goals']
+
+
+@app.route('/profiles/<profile_id>/dashboard', methods=['GET'])
+@auth.required
+@auth.own_profile
+def dashboard(profile_id):
+    """A profile with its goals and project summaries, read concurrently.
+
+    Each section reports its own status; sections that fail or miss the
+    deadline come back as null, and the response is then not cached.
+    """
+    # sections run on other threads, outside the request context
+    fresh = request.cache_control.no_cache or request.cache_control.max_age == 0
+    # a section that misses the deadline gives its worker back soon after
+    reads = repository.bounded(DASHBOARD_DEADLINE_SECONDS)
+    authorization = request.headers.get('Authorization')
+    deadline = fanout.Deadline.within(DASHBOARD_DEADLINE_SECONDS, request.environ.get('aws.context'))
+
+    def profile(deadline):
+        if fresh:
+            item_cache.invalidate(('profile', profile_id))
+        return item_cache.get_or_load(('profile', profile_id), lambda: reads.get('profile', profile_id))
+
+    sections = fanout.gather({
+        'profile': profile,
+        'goals': lambda deadline: fetch_goals(profile_id, authorization, deadline),
+        'projects': lambda deadline: reads.list_projects(profile_id, limit=MAX_PAGE_SIZE)[0],
+    }, deadline)
+
+    if sections['profile']['status'] == fanout.OK and sections['profile']['data'] is None:
+        abort(404, description=f'profile {profile_id} not found')
+    body = {name: section.pop('data') for name, section in sections.items()}
+    body['sections'] = sections
+    body['complete'] = all(section['status'] == fanout.OK for section in sections.values())
+    response = jsonify(body)
+    if not body['complete']:
+        response.headers['Cache-Control'] = 'no-store'
+    return response
+
+@app.route('/exports', methods=['POST'])
+@auth.required
+@schemas.route(body=EXPORT_REQUEST)
+def start_export():
+    entity = schemas.json_body()['entity']
+    return jsonify(exporter.start(repository, entity, requested_by=g.claims.get('sub'))), 202
+
+@app.route('/exports/<job_id>', methods=['GET'])
+@auth.required
+def get_export(job_id):
+    job = exporter.get_job(repository, job_id)
+    # another caller's job is not found either
+    if job is None or job.get('requested_by') != g.claims.get('sub'):
+        abort(404, description=f'export {job_id} not found')
+    if job['status'] == 'completed':
+        job['download_url'] = exporter.download_url(job)
+    response = jsonify(job)
+    # the download URL is short-lived and signed per request
+    response.headers['Cache-Control'] = 'no-store'
+    return response
 
 # Error handlers
 @app.errorhandler(404)
 def resource_not_found(e):
     return jsonify(error=str(e)), 404
 
+@app.errorhandler(InvalidCursorError)
+def invalid_cursor(e):
+    return jsonify(error=str(e)), 400
+
+@app.errorhandler(HTTPException)
+def handle_http_exception(e):
+    return jsonify(error=e.description), e.code
+
 @app.errorhandler(Exception)
 def handle_exception(e):
     return jsonify(error=str(e)), 500
 
+# Init-phase warm-up (SnapStart / provisioned concurrency)
+WARM_MODULES = ('boto3', 'boto3.dynamodb.conditions', 'botocore.auth', 'requests', 'jwt')
+WARMUP_EVENT = {'httpMethod': 'GET', 'path': '/', 'headers': {'Accept-Encoding': 'gzip, br'}}
+
+@warmup.before_snapshot
+def prewarm():
+    for name in WARM_MODULES:
+        importlib.import_module(name)
+    # creates the boto3 session, loads the service model and builds the client
+    repository.client
+    clients.http.session
+    if auth.verifier is not None:
+        # best effort: requests fetch the keys themselves and answer 503 while they cannot
+        try:
+            auth.verifier.jwks.refresh()
+        except (auth.KeysUnavailableError, clients.CircuitOpenError):
+            logger.warning('signing keys not prefetched', exc_info=True)
+    # builds the URL map matcher and runs one request through every layer
+    adapter.handle(app, WARMUP_EVENT, instrument=False)
+    item_cache.clear()
+
+@warmup.after_restore
+def reseed():
+    # restored environments share the snapshot's PRNG state
+    random.seed()
+    item_cache.clear()
+    # connections opened before the snapshot are not valid in a restored environment
+    clients.drop_connections()
+
+warmup.install()
+
 # AWS Lambda handler
 def main(event, context):
-    # API Gateway HTTP API integration
-    path = event.get("path", "")
-    http_method = event.get("httpMethod", "")
-    headers = event.get("headers", {})
-    query_params = event.get("queryStringParameters", {}) or {}
-    path_params = event.get("pathParameters", {}) or {}
-    body = event.get("body", "")
-    
-    # Create a Flask request context
-    with app.test_request_context(
-        path=path,
-        method=http_method,
-        headers=headers,
-        query_string=query_params,
-        data=body,
-    ):
-        # Add path parameters to the request
-        request.path_params = path_params
-        
-        try:
-            # Process the request and get the response
-            response = app.full_dispatch_request()
-            return {
-                "statusCode": response.status_code,
-                "body": response.get_data(as_text=True),
-                "headers": dict(response.headers),
-            }
-        except Exception as e:
-            return {
-                "statusCode": 500,
-                "body": str(e),
-                "headers": {"Content-Type": "application/json"},
-            }
\ No newline at end of file
+    # API Gateway REST API (1.0) or HTTP API (2.0) proxy integration
+    try:
+        return adapter.handle(app, event, context)
+    except Exception as e:
+        return {
+            "statusCode": 500,
+            "body": str(e),
+            "headers": {"Content-Type": "application/json"},
+        }
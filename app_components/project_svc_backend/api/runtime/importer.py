@@ -0,0 +1,512 @@
+#!/usr/bin/env python3
+"""Bulk import of JSONL/CSV objects into the Projects table.
+
+The source is streamed in 1 MiB chunks and split into lines, so memory use
+doesn't depend on the object's size. Each line is one record:
+
+* JSONL: ``{"entity": "profile", "id": "p1", "name": "Ada", ...}``
+* CSV: a header row, then one record per row; quoted fields must not span
+  lines.
+
+``entity`` can be left out of the records when the whole object holds one
+entity type and it is passed to the job instead. Invalid records are counted
+and sampled, not fatal; so are items DynamoDB rejects (e.g. over 400 KB),
+whose batch is then written one item at a time.
+
+Valid records are grouped into 25-item batches and written by a pool of
+``BatchWriteItem`` workers. The queue in front of the pool is bounded, so
+reading stalls when the table throttles (backpressure). Batches land in no
+particular order: a repeated id wins in file order only within one batch.
+
+Progress is checkpointed in the table (``IMPORT#<job_id>``/``CHECKPOINT``)
+as the byte offset everything before which has been written. A run that is
+close to its deadline stops at a batch boundary, saves the checkpoint, and
+the Lambda re-invokes itself to continue from that offset with an S3
+``Range`` request. Re-running a finished job is a no-op.
+
+Run locally against the same code, e.g. with DynamoDB Local::
+
+    python importer.py s3://bucket/profiles.jsonl --entity profile
+    python importer.py ./users.csv --table Projects --endpoint-url http://localhost:8000
+"""
+
+import argparse
+import csv
+import datetime
+import decimal
+import hashlib
+import json
+import logging
+import os
+import queue
+import sys
+import threading
+import time
+
+import clients
+import repository
+from lazy import lazy_import
+from repository import Repository
+
+botocore_exceptions = lazy_import('botocore.exceptions')
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ('jsonl', 'csv')
+CHUNK_BYTES = 1024 * 1024
+WORKERS = int(os.environ.get('IMPORT_WORKERS', 8))
+CHECKPOINT_SECONDS = float(os.environ.get('IMPORT_CHECKPOINT_SECONDS', 10))
+# stop reading this long before the Lambda timeout, to drain the queue and checkpoint
+SAFETY_MARGIN_MS = int(os.environ.get('IMPORT_SAFETY_MARGIN_MS', 60000))
+CHECKPOINT_TTL = datetime.timedelta(days=7)
+MAX_ERRORS_KEPT = 20
+
+
+class RecordError(ValueError):
+    """A record that cannot be imported."""
+
+
+# sources
+
+class S3Source:
+    """An S3 object, read from a byte offset with a ``Range`` request."""
+
+    def __init__(self, bucket, key, *, client=None):
+        self.bucket = bucket
+        self.key = key
+        self.client = client or clients.client('s3')
+        self._head = None
+
+    @property
+    def name(self):
+        return f's3://{self.bucket}/{self.key}'
+
+    def _stat(self):
+        if self._head is None:
+            self._head = self.client.head_object(Bucket=self.bucket, Key=self.key)
+        return self._head
+
+    @property
+    def etag(self):
+        return self._stat()['ETag']
+
+    @property
+    def size(self):
+        return self._stat()['ContentLength']
+
+    def chunks(self, offset=0):
+        if offset >= self.size:
+            return
+        params = {'Bucket': self.bucket, 'Key': self.key, 'IfMatch': self.etag}
+        if offset:
+            params['Range'] = f'bytes={offset}-'
+        body = self.client.get_object(**params)['Body']
+        try:
+            yield from body.iter_chunks(CHUNK_BYTES)
+        finally:
+            body.close()
+
+
+class FileSource:
+    """A local file, for the CLI."""
+
+    def __init__(self, path):
+        self.path = path
+
+    @property
+    def name(self):
+        return os.path.abspath(self.path)
+
+    @property
+    def etag(self):
+        stat = os.stat(self.path)
+        return f'{stat.st_size}-{stat.st_mtime_ns}'
+
+    def chunks(self, offset=0):
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            while True:
+                chunk = f.read(CHUNK_BYTES)
+                if not chunk:
+                    return
+                yield chunk
+
+
+def source_for(uri):
+    if uri.startswith('s3://'):
+        bucket, _, key = uri[len('s3://'):].partition('/')
+        return S3Source(bucket, key)
+    return FileSource(uri)
+
+
+def read_lines(chunks, offset=0):
+    """Yield ``(line, end_offset)``; ``end_offset`` is the byte after the line."""
+    pending = b''
+    for chunk in chunks:
+        lines = (pending + chunk).split(b'\n')
+        pending = lines.pop()
+        for line in lines:
+            offset += len(line) + 1
+            yield line, offset
+    if pending:
+        yield pending, offset + len(pending)
+
+
+# records
+
+def _reject_constant(name):
+    raise RecordError(f'{name} is not a number DynamoDB can store')
+
+
+def parse_jsonl(text, columns=None):
+    # floats become Decimal, which is what DynamoDB accepts; NaN and Infinity have no Decimal it takes
+    record = json.loads(text, parse_float=decimal.Decimal, parse_constant=_reject_constant)
+    if not isinstance(record, dict):
+        raise RecordError('record must be a JSON object')
+    return record
+
+
+def parse_csv(text, columns):
+    values = next(csv.reader([text]))
+    if len(values) != len(columns):
+        raise RecordError(f'expected {len(columns)} fields, got {len(values)}')
+    # empty cells mean "no attribute"
+    return {name: value for name, value in zip(columns, values) if value != ''}
+
+
+PARSERS = {'jsonl': parse_jsonl, 'csv': parse_csv}
+
+
+def to_item(record, *, entity=None, version, updated_at):
+    """Validate a record and turn it into a stored item."""
+    entity = record.pop('entity', None) or entity
+    if entity not in repository.ENTITIES:
+        raise RecordError(f'unknown entity {entity!r}')
+    entity_id = record.get('id')
+    if isinstance(entity_id, (int, decimal.Decimal)) and not isinstance(entity_id, bool):
+        entity_id = str(entity_id)
+    if not isinstance(entity_id, str) or not entity_id:
+        raise RecordError('id must be a non-empty string')
+    expires_at = record.get(repository.TTL_ATTRIBUTE)
+    try:
+        expires_at = int(expires_at) if expires_at is not None else None
+    except (TypeError, ValueError):
+        raise RecordError(f'{repository.TTL_ATTRIBUTE} must be an epoch timestamp') from None
+    return repository.storage_item(
+        entity, entity_id, record, version=version, updated_at=updated_at, expires_at=expires_at
+    )
+
+
+def detect_format(name):
+    return 'csv' if name.lower().endswith('.csv') else 'jsonl'
+
+
+# writing
+
+def is_rejected_item(error):
+    """True for a write refused because of an item, not because of the table."""
+    if isinstance(error, botocore_exceptions.ClientError):
+        return error.response.get('Error', {}).get('Code') == 'ValidationException'
+    # raised by boto3's serializer, e.g. for an empty set
+    return isinstance(error, (TypeError, ValueError))
+
+
+class BatchWriter:
+    """``BatchWriteItem`` worker pool behind a bounded queue.
+
+    ``submit`` blocks while ``2 * workers`` batches are waiting, which slows
+    the reader down to the rate the table accepts. Batches are lists of
+    ``(line, item)``; a batch the table rejects is retried one item at a
+    time, and the items it still rejects end up in ``rejected`` as
+    ``(line, error)``. Any other failure stops the writer.
+    """
+
+    def __init__(self, repo, workers=WORKERS):
+        self.repo = repo
+        self.queue = queue.Queue(maxsize=2 * workers)
+        self.written = 0
+        self.rejected = []
+        self.error = None
+        self._lock = threading.Lock()
+        self._threads = [
+            threading.Thread(target=self._work, name=f'import-writer-{i}', daemon=True)
+            for i in range(workers)
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def _work(self):
+        while True:
+            batch = self.queue.get()
+            try:
+                if batch is None:
+                    return
+                if self.error is None:
+                    self._write(batch)
+            except Exception as e:
+                self.error = e
+            finally:
+                self.queue.task_done()
+
+    def _write(self, batch):
+        try:
+            self.repo.batch_write([item for _, item in batch])
+        except Exception as e:
+            if not is_rejected_item(e):
+                raise
+        else:
+            with self._lock:
+                self.written += len(batch)
+            return
+        # find the items it was about
+        for line, item in batch:
+            try:
+                self.repo.batch_write([item])
+            except Exception as e:
+                if not is_rejected_item(e):
+                    raise
+                with self._lock:
+                    self.rejected.append((line, str(e)))
+            else:
+                with self._lock:
+                    self.written += 1
+
+    def take_rejected(self):
+        """Return and forget the items rejected so far."""
+        with self._lock:
+            rejected, self.rejected = self.rejected, []
+        return sorted(rejected)
+
+    def _raise_for_error(self):
+        if self.error is not None:
+            raise self.error
+
+    def submit(self, batch):
+        self._raise_for_error()
+        self.queue.put(batch)
+
+    def flush(self):
+        """Wait until every submitted batch has been written."""
+        self.queue.join()
+        self._raise_for_error()
+
+    def close(self):
+        for _ in self._threads:
+            self.queue.put(None)
+        for thread in self._threads:
+            thread.join()
+
+
+# checkpoints
+
+CHECKPOINT_COUNTERS = ('version', 'offset', 'lines', 'written', 'invalid')
+
+
+def checkpoint_key(job_id):
+    return {'pk': f'IMPORT#{job_id}', 'sk': 'CHECKPOINT'}
+
+
+def load_checkpoint(repo, job_id):
+    item = repo.table.get_item(Key=checkpoint_key(job_id), ConsistentRead=True).get('Item')
+    state = repository.public(item)
+    if state is not None:
+        # DynamoDB numbers come back as Decimal; the run does arithmetic on these
+        state.update({name: int(state[name]) for name in CHECKPOINT_COUNTERS if name in state})
+    return state
+
+
+def save_checkpoint(repo, state):
+    expires_at = datetime.datetime.now(datetime.timezone.utc) + CHECKPOINT_TTL
+    repo.table.put_item(Item={
+        **checkpoint_key(state['job_id']),
+        **state,
+        repository.TTL_ATTRIBUTE: int(expires_at.timestamp()),
+    })
+
+
+def default_job_id(source):
+    return hashlib.sha256(f'{source.name}@{source.etag}'.encode()).hexdigest()[:16]
+
+
+def new_state(job_id, source, fmt, entity):
+    now = datetime.datetime.now(datetime.timezone.utc)
+    return {
+        'job_id': job_id,
+        'source': source.name,
+        'etag': source.etag,
+        'format': fmt,
+        'entity': entity,
+        'columns': None,
+        # every item of a job shares one version, newer than any write counter
+        'version': int(now.timestamp() * 1000),
+        'started_at': now.isoformat(),
+        'status': 'running',
+        'offset': 0,
+        'lines': 0,
+        'written': 0,
+        'invalid': 0,
+        'errors': [],
+    }
+
+
+def run_import(source, repo, *, fmt=None, entity=None, job_id=None, workers=WORKERS,
+               should_stop=None, clock=time.monotonic):
+    """Import ``source`` into ``repo``'s table, resuming from its checkpoint.
+
+    ``should_stop()`` is polled at batch boundaries; when it returns true the
+    run checkpoints and returns with status ``running``. Returns the job
+    state plus this run's throughput.
+    """
+    job_id = job_id or default_job_id(source)
+    state = load_checkpoint(repo, job_id)
+    if state is None:
+        state = new_state(job_id, source, fmt or detect_format(source.name), entity)
+    elif state['status'] == 'completed':
+        return state
+    elif state['etag'] != source.etag:
+        raise ValueError(f'{source.name} changed since import {job_id} started')
+
+    parse = PARSERS[state['format']]
+    updated_at = datetime.datetime.now(datetime.timezone.utc).isoformat()
+    writer = BatchWriter(repo, workers)
+    started = last_checkpoint = clock()
+    written_before = state['written']
+    batch = {}
+    consumed = state['offset']
+    finished = False
+
+    def reject(line, error):
+        state['invalid'] += 1
+        if len(state['errors']) < MAX_ERRORS_KEPT:
+            state['errors'].append({'line': line, 'error': error})
+
+    def commit():
+        # only called with nothing buffered, so every line before `consumed` is written
+        writer.flush()
+        for line, error in writer.take_rejected():
+            reject(line, error)
+        state['offset'] = consumed
+        state['written'] = written_before + writer.written
+        save_checkpoint(repo, state)
+
+    try:
+        for line, end in read_lines(source.chunks(state['offset']), state['offset']):
+            if consumed == 0:
+                line = line.removeprefix(b'\xef\xbb\xbf')
+            text = line.decode('utf-8', errors='replace').rstrip('\r')
+            if text.strip():
+                state['lines'] += 1
+                if state['format'] == 'csv' and state['columns'] is None:
+                    state['columns'] = next(csv.reader([text]))
+                else:
+                    try:
+                        item = to_item(
+                            parse(text, state['columns']),
+                            entity=state['entity'],
+                            version=state['version'],
+                            updated_at=updated_at,
+                        )
+                    except (RecordError, ValueError) as e:
+                        reject(state['lines'], str(e))
+                    else:
+                        # BatchWriteItem rejects two requests for the same key
+                        batch[(item['pk'], item['sk'])] = (state['lines'], item)
+            consumed = end
+
+            if len(batch) == repository.BATCH_WRITE_LIMIT:
+                writer.submit(list(batch.values()))
+                batch = {}
+                if should_stop is not None and should_stop():
+                    break
+                if clock() - last_checkpoint >= CHECKPOINT_SECONDS:
+                    commit()
+                    last_checkpoint = clock()
+        else:
+            finished = True
+
+        if batch:
+            writer.submit(list(batch.values()))
+        if finished:
+            state['status'] = 'completed'
+            state['completed_at'] = datetime.datetime.now(datetime.timezone.utc).isoformat()
+        commit()
+    finally:
+        writer.close()
+
+    elapsed = clock() - started
+    written = state['written'] - written_before
+    result = dict(state)
+    result['run'] = {
+        'written': written,
+        'elapsed_seconds': round(elapsed, 3),
+        'items_per_second': round(written / elapsed, 1) if elapsed > 0 else None,
+    }
+    return result
+
+
+# AWS Lambda handler
+def main(event, context):
+    """Import ``{"bucket": ..., "key": ..., "format"?, "entity"?, "job_id"?}``.
+
+    When the run stops short of the end of the object, the function invokes
+    itself asynchronously with the same event to carry on.
+    """
+    logging.getLogger().setLevel(os.environ.get('LOG_LEVEL', 'INFO'))
+    source = S3Source(event['bucket'], event['key'])
+    repo = Repository(pool_size=WORKERS)
+    job_id = event.get('job_id') or default_job_id(source)
+    offset_before = (load_checkpoint(repo, job_id) or {}).get('offset', 0)
+
+    result = run_import(
+        source,
+        repo,
+        fmt=event.get('format'),
+        entity=event.get('entity'),
+        job_id=job_id,
+        should_stop=lambda: context.get_remaining_time_in_millis() < SAFETY_MARGIN_MS,
+    )
+    logger.info(
+        'import %s: %s, offset %s, %s written, %s invalid, %s items/s this run',
+        job_id, result['status'], result['offset'], result['written'], result['invalid'],
+        result.get('run', {}).get('items_per_second'),
+    )
+
+    if result['status'] != 'completed':
+        if result['offset'] <= offset_before:
+            raise RuntimeError(f'import {job_id} made no progress from offset {offset_before}')
+        clients.client('lambda').invoke(
+            FunctionName=context.invoked_function_arn,
+            InvocationType='Event',
+            Payload=json.dumps({**event, 'job_id': job_id}).encode(),
+        )
+    return result
+
+
+def cli(argv=None):
+    parser = argparse.ArgumentParser(description='Import a JSONL/CSV file or S3 object into the Projects table.')
+    parser.add_argument('source', help='s3://bucket/key or a local path')
+    parser.add_argument('--table', default=None, help='table name (default: $TABLE_NAME or Projects)')
+    parser.add_argument('--endpoint-url', default=None, help='DynamoDB endpoint, e.g. DynamoDB Local')
+    parser.add_argument('--format', choices=FORMATS, default=None, help='default: from the file extension')
+    parser.add_argument('--entity', choices=sorted(repository.ENTITIES), default=None,
+                        help='entity for records without an "entity" field')
+    parser.add_argument('--job-id', default=None, help='resume or name a job (default: derived from the source)')
+    parser.add_argument('--workers', type=int, default=WORKERS)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    result = run_import(
+        source_for(args.source),
+        Repository(args.table, endpoint_url=args.endpoint_url, pool_size=args.workers),
+        fmt=args.format,
+        entity=args.entity,
+        job_id=args.job_id,
+        workers=args.workers,
+    )
+    json.dump(result, sys.stdout, indent=2, default=str)
+    print()
+    return 0 if result['status'] == 'completed' else 1
+
+
+if __name__ == '__main__':
+    sys.exit(cli())
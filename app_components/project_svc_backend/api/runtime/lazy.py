@@ -0,0 +1,56 @@
+"""Deferred imports for heavy SDKs.
+
+``boto3`` and ``requests`` together add hundreds of milliseconds to a cold
+start, while most routes never touch them. ``lazy_import`` returns a module
+proxy that performs the real import on first attribute access, so only the
+route that needs an SDK pays for loading it.
+
+Set ``LAZY_IMPORTS=false`` to import eagerly instead, e.g. when the init
+phase is snapshotted and the import cost should be paid before the snapshot.
+"""
+
+import importlib
+import os
+import sys
+import types
+
+LAZY_IMPORTS = os.environ.get('LAZY_IMPORTS', 'true').lower() not in ('0', 'false', 'no')
+
+
+class LazyModule(types.ModuleType):
+    """Module proxy that imports ``name`` the first time it is used."""
+
+    def __init__(self, name):
+        super().__init__(name)
+        self.__dict__['_lazy_module'] = None
+
+    def _load(self):
+        module = self.__dict__['_lazy_module']
+        if module is None:
+            module = importlib.import_module(self.__name__)
+            self.__dict__['_lazy_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __dir__(self):
+        return dir(self._load())
+
+    def __repr__(self):
+        state = 'loaded' if self.__dict__['_lazy_module'] is not None else 'not loaded'
+        return f'<lazy module {self.__name__!r} ({state})>'
+
+
+def lazy_import(name):
+    """Return ``name`` as a module, deferring the import when lazy mode is on."""
+    if name in sys.modules or not LAZY_IMPORTS:
+        return importlib.import_module(name)
+    return LazyModule(name)
+
+
+def is_loaded(module):
+    """Tell whether ``module`` (real or lazy) has actually been imported."""
+    if isinstance(module, LazyModule):
+        return module.__dict__['_lazy_module'] is not None
+    return True
@@ -0,0 +1,162 @@
+"""Per-request timings as CloudWatch EMF records and a ``Server-Timing`` header.
+
+Each request gets a ``RequestTimer`` that splits its wall time into phases:
+
+* ``adapter`` - building the WSGI environ from the proxy event;
+* ``routing`` - Flask request context set-up and URL matching;
+* ``handler`` - the view function, less JSON encoding;
+* ``serialization`` - JSON encoding, ``after_request`` hooks, compression
+  and base64 encoding of the response body.
+
+The record also counts the outbound connections the request opened and
+reused (see ``clients``).
+
+With ``METRICS_ENABLED`` on, one Embedded Metric Format record per request is
+written to stdout. CloudWatch Logs turns it into metrics, so nothing on the
+hot path calls an AWS API. With ``SERVER_TIMING`` on, the phases are also
+returned to the client in a ``Server-Timing`` header.
+"""
+
+import json
+import os
+import sys
+import time
+
+from flask import has_request_context, request
+
+import clients
+
+METRICS_ENABLED = os.environ.get('METRICS_ENABLED', 'true').lower() not in ('0', 'false', 'no')
+SERVER_TIMING = os.environ.get('SERVER_TIMING', 'true').lower() not in ('0', 'false', 'no')
+NAMESPACE = os.environ.get('METRICS_NAMESPACE', 'ProjectAPI')
+SERVICE = os.environ.get('AWS_LAMBDA_FUNCTION_NAME', 'api-svc')
+INIT_TYPE = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE', 'on-demand')
+
+PHASES = ('adapter', 'routing', 'handler', 'serialization')
+UNMATCHED_ROUTE = 'UNMATCHED'
+
+# EMF records go to stdout unless pointed elsewhere, e.g. by benchmarks
+stream = None
+
+_cold_start = True
+
+
+def enabled():
+    return METRICS_ENABLED or SERVER_TIMING
+
+
+class RequestTimer:
+    """Stopwatch that charges the time since the previous lap to a phase."""
+
+    __slots__ = ('started', 'last', 'phases', 'route')
+
+    def __init__(self, clock=time.perf_counter):
+        self.started = self.last = clock()
+        self.phases = dict.fromkeys(PHASES, 0.0)
+        self.route = UNMATCHED_ROUTE
+
+    def lap(self, phase, now=None):
+        now = time.perf_counter() if now is None else now
+        self.phases[phase] += now - self.last
+        self.last = now
+
+    @property
+    def total(self):
+        return self.last - self.started
+
+    def server_timing(self):
+        """Return the ``Server-Timing`` header value, durations in milliseconds."""
+        parts = [f'{phase};dur={seconds * 1000:.2f}' for phase, seconds in self.phases.items()]
+        parts.append(f'total;dur={self.total * 1000:.2f}')
+        return ', '.join(parts)
+
+
+def current_timer(environ):
+    return environ.get('aws.timer')
+
+
+def record(timer, method, status_code, response_bytes, context=None):
+    """Write one EMF record for a finished request."""
+    global _cold_start
+    cold_start, _cold_start = _cold_start, False
+    if not METRICS_ENABLED:
+        return None
+    # a container serves one request at a time, so these are this request's
+    new_connections, reused_connections = clients.take_connection_counts()
+
+    entry = {
+        '_aws': {
+            'Timestamp': int(time.time() * 1000),
+            'CloudWatchMetrics': [{
+                'Namespace': NAMESPACE,
+                'Dimensions': [['Service', 'Route'], ['Service']],
+                'Metrics': [
+                    {'Name': 'Latency', 'Unit': 'Milliseconds'},
+                    {'Name': 'ResponseSize', 'Unit': 'Bytes'},
+                    {'Name': 'ColdStart', 'Unit': 'Count'},
+                    {'Name': 'ServerError', 'Unit': 'Count'},
+                    {'Name': 'ClientError', 'Unit': 'Count'},
+                    {'Name': 'NewConnections', 'Unit': 'Count'},
+                    {'Name': 'ReusedConnections', 'Unit': 'Count'},
+                ],
+            }],
+        },
+        'Service': SERVICE,
+        'Route': f'{method} {timer.route}',
+        'Latency': round(timer.total * 1000, 3),
+        'ResponseSize': response_bytes,
+        'ColdStart': int(cold_start),
+        'ServerError': int(status_code >= 500),
+        'ClientError': int(400 <= status_code < 500),
+        'NewConnections': new_connections,
+        'ReusedConnections': reused_connections,
+        'StatusCode': status_code,
+        'InitType': INIT_TYPE,
+    }
+    entry.update({f'{phase}Ms': round(seconds * 1000, 3) for phase, seconds in timer.phases.items()})
+    request_id = getattr(context, 'aws_request_id', None)
+    if request_id:
+        entry['RequestId'] = request_id
+
+    (stream or sys.stdout).write(json.dumps(entry, separators=(',', ':')) + '\n')
+    return entry
+
+
+def install(app):
+    """Register the Flask hooks that mark the routing and handler phases."""
+
+    @app.before_request
+    def _routed():
+        timer = current_timer(request.environ)
+        if timer is not None:
+            if request.url_rule is not None:
+                timer.route = request.url_rule.rule
+            timer.lap('routing')
+
+    @app.after_request
+    def _handled(response):
+        # after_request hooks run last-registered first, so this one sees the
+        # response as the view (or error handler) returned it
+        timer = current_timer(request.environ)
+        if timer is not None:
+            timer.lap('handler')
+        return response
+
+    provider = app.json
+
+    class TimedJSONProvider(type(provider)):
+        # response() is where jsonify encodes the body, whichever provider is installed
+        def response(self, *args, **kwargs):
+            timer = current_timer(request.environ) if has_request_context() else None
+            if timer is None:
+                return super().response(*args, **kwargs)
+            timer.lap('handler')
+            try:
+                return super().response(*args, **kwargs)
+            finally:
+                timer.lap('serialization')
+
+    timed = TimedJSONProvider(app)
+    timed.__dict__.update(provider.__dict__)
+    app.json = timed
+    return app
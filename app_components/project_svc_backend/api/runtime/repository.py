@@ -0,0 +1,417 @@
+"""Data access for the single-table Projects design.
+
+Every entity lives in one table keyed by ``pk``/``sk``; list access patterns
+go through the ``gsi1`` index so nothing ever needs a ``Scan``:
+
+=========  ====================  ===================  ============  =====================
+entity     pk                    sk                   gsi1pk        gsi1sk
+=========  ====================  ===================  ============  =====================
+user       ``USER#<id>``         ``META``             ``USERS``     ``USER#<id>``
+profile    ``PROFILE#<id>``      ``META``             ``PROFILES``  ``PROFILE#<id>``
+project    ``PROFILE#<owner>``   ``PROJECT#<id>``
+=========  ====================  ===================  ============  =====================
+
+Projects live in their profile's partition, so one ``Query`` lists a
+profile's projects.
+
+Items carry a ``version`` counter bumped on every write and an ``updated_at``
+timestamp. ``expires_at`` is the table's TTL attribute.
+"""
+
+import base64
+import binascii
+import concurrent.futures
+import datetime
+import decimal
+import json
+import os
+import random
+import time
+
+import clients
+from lazy import lazy_import
+
+conditions = lazy_import('boto3.dynamodb.conditions')
+
+META = 'META'
+GSI1 = 'gsi1'
+TTL_ATTRIBUTE = 'expires_at'
+TABLE_KEY_ATTRIBUTES = ('pk', 'sk')
+KEY_ATTRIBUTES = TABLE_KEY_ATTRIBUTES + ('gsi1pk', 'gsi1sk')
+# maintained by the repository, never taken from callers
+MANAGED_ATTRIBUTES = KEY_ATTRIBUTES + ('id', 'version', 'updated_at')
+
+BATCH_GET_LIMIT = 100
+BATCH_WRITE_LIMIT = 25
+# concurrent BatchGetItem calls per batch_get
+BATCH_GET_WORKERS = int(os.environ.get('BATCH_GET_WORKERS', 4))
+MAX_ATTEMPTS = 8
+BACKOFF_BASE = 0.05
+BACKOFF_CAP = 2.0
+
+ENTITIES = {
+    'user': ('USER#', 'USERS'),
+    'profile': ('PROFILE#', 'PROFILES'),
+}
+PROJECT_PREFIX = 'PROJECT#'
+# what a project list returns unless the full items are asked for
+PROJECT_SUMMARY_ATTRIBUTES = ('id', 'name', 'status', 'updated_at')
+
+
+class InvalidCursorError(ValueError):
+    """Raised for a ``cursor`` this module did not produce."""
+
+
+class UnprocessedItemsError(Exception):
+    """Raised when a batch call still has unprocessed items after every retry."""
+
+    def __init__(self, operation, unprocessed):
+        super().__init__(f'{operation} left unprocessed items after {MAX_ATTEMPTS} attempts')
+        self.unprocessed = unprocessed
+
+
+def key(entity, entity_id):
+    prefix, _ = ENTITIES[entity]
+    return {'pk': f'{prefix}{entity_id}', 'sk': META}
+
+
+def storage_item(entity, entity_id, attributes, *, version, updated_at, expires_at=None):
+    """Build the full stored item, keys included, for a ``PutItem``-style write."""
+    _, list_key = ENTITIES[entity]
+    item_key = key(entity, entity_id)
+    item = {k: v for k, v in attributes.items() if k not in MANAGED_ATTRIBUTES}
+    item.update(item_key)
+    item.update({
+        'id': entity_id,
+        'gsi1pk': list_key,
+        'gsi1sk': item_key['pk'],
+        'version': version,
+        'updated_at': updated_at,
+    })
+    if expires_at is not None:
+        item[TTL_ATTRIBUTE] = int(expires_at)
+    return item
+
+
+def project_key(profile_id, project_id):
+    prefix, _ = ENTITIES['profile']
+    return {'pk': f'{prefix}{profile_id}', 'sk': f'{PROJECT_PREFIX}{project_id}'}
+
+
+def parse_key(item_key):
+    """Return ``(entity, entity_id)`` for an entity's key, else ``None``."""
+    if item_key.get('sk') != META:
+        return None
+    for entity, (prefix, _) in ENTITIES.items():
+        if item_key['pk'].startswith(prefix):
+            return entity, item_key['pk'][len(prefix):]
+    return None
+
+
+def public(item):
+    """Strip the storage keys from an item before it leaves the service.
+
+    Values stay as DynamoDB returned them (``Decimal``, ``set``, ...); see
+    ``fastjson`` for how they are encoded.
+    """
+    if item is None:
+        return None
+    return {k: v for k, v in item.items() if k not in KEY_ATTRIBUTES}
+
+
+def encode_cursor(last_evaluated_key):
+    if not last_evaluated_key:
+        return None
+    raw = json.dumps(last_evaluated_key, separators=(',', ':')).encode()
+    return base64.urlsafe_b64encode(raw).decode('ascii')
+
+
+def decode_cursor(cursor, attributes=KEY_ATTRIBUTES, **expected):
+    """The ``ExclusiveStartKey`` encoded in ``cursor``.
+
+    It must hold exactly the string key ``attributes`` of the query that
+    produced it, with the values given in ``expected`` (its partition).
+    """
+    if not cursor:
+        return None
+    try:
+        start_key = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+    except (binascii.Error, ValueError, TypeError):
+        raise InvalidCursorError('invalid cursor') from None
+    if (
+        not isinstance(start_key, dict)
+        or set(start_key) != set(attributes)
+        or not all(isinstance(value, str) for value in start_key.values())
+        or any(start_key[name] != value for name, value in expected.items())
+    ):
+        raise InvalidCursorError('invalid cursor')
+    return start_key
+
+
+def storage_value(value):
+    """``value`` with its floats as ``Decimal``, the only numbers boto3 writes."""
+    if isinstance(value, float):
+        # str() keeps the float's shortest repr, not its binary expansion
+        return decimal.Decimal(str(value))
+    if isinstance(value, dict):
+        return {k: storage_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [storage_value(v) for v in value]
+    return value
+
+
+def backoff(attempt):
+    """Sleep with full jitter before retry number ``attempt``."""
+    time.sleep(random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt)))
+
+
+def chunks(items, size):
+    for start in range(0, len(items), size):
+        yield items[start:start + size]
+
+
+class Repository:
+    """Table access for the Flask routes.
+
+    The boto3 resource is created on first use, so importing the handler stays
+    cheap. Point ``DYNAMODB_ENDPOINT_URL`` at DynamoDB Local to run against it.
+    Every method calls the resource's client, not its ``Table``, so one
+    repository can be used from several threads at once.
+
+    Every write calls each of ``write_listeners`` with ``(entity, entity_id)``
+    so caches can drop what they hold for that item.
+    """
+
+    def __init__(self, table_name=None, *, endpoint_url=None, pool_size=None, **client_options):
+        self.table_name = table_name or os.environ.get('TABLE_NAME', 'Projects')
+        self.endpoint_url = endpoint_url or os.environ.get('DYNAMODB_ENDPOINT_URL')
+        # as many pooled connections as threads calling the client at once
+        self.pool_size = pool_size or BATCH_GET_WORKERS
+        # extra botocore Config options, see bounded()
+        self.client_options = client_options
+        self.write_listeners = []
+        self._dynamodb = None
+        self._table = None
+        self._executor = None
+
+    def _notify(self, item_key):
+        parsed = parse_key(item_key)
+        if parsed is not None:
+            for listener in self.write_listeners:
+                listener(*parsed)
+
+    @property
+    def dynamodb(self):
+        if self._dynamodb is None:
+            self._dynamodb = clients.resource(
+                'dynamodb', endpoint_url=self.endpoint_url, pool_size=self.pool_size, **self.client_options
+            )
+        return self._dynamodb
+
+    @property
+    def client(self):
+        # the resource's own client: same (de)serialization, but safe to share between threads
+        return self.dynamodb.meta.client
+
+    @property
+    def executor(self):
+        if self._executor is None:
+            self._executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=BATCH_GET_WORKERS, thread_name_prefix='batch-get'
+            )
+        return self._executor
+
+    @property
+    def table(self):
+        # single-threaded callers only (scripts, the export and import jobs)
+        if self._table is None:
+            self._table = self.dynamodb.Table(self.table_name)
+        return self._table
+
+    def bounded(self, seconds):
+        """The same table, through a client that gives up after about ``seconds``.
+
+        One attempt with connect and read timeouts of ``seconds``, for reads
+        made under a deadline that should not outlive it by much.
+        """
+        return type(self)(
+            self.table_name,
+            endpoint_url=self.endpoint_url,
+            pool_size=self.pool_size,
+            connect_timeout=seconds,
+            read_timeout=seconds,
+            retries={'mode': 'standard', 'total_max_attempts': 1},
+        )
+
+    # single items
+
+    def get(self, entity, entity_id):
+        response = self.client.get_item(TableName=self.table_name, Key=key(entity, entity_id))
+        return public(response.get('Item'))
+
+    def put(self, entity, entity_id, attributes, *, expires_at=None):
+        """Create or update an item, bumping its version. Returns the new item."""
+        _, list_key = ENTITIES[entity]
+        item_key = key(entity, entity_id)
+        values = {k: v for k, v in attributes.items() if k not in MANAGED_ATTRIBUTES}
+        values.update({
+            'id': entity_id,
+            'gsi1pk': list_key,
+            'gsi1sk': item_key['pk'],
+        })
+        if expires_at is not None:
+            values[TTL_ATTRIBUTE] = int(expires_at)
+        return self._update(item_key, values)
+
+    def _update(self, item_key, values):
+        values = {**values, 'updated_at': datetime.datetime.now(datetime.timezone.utc).isoformat()}
+        names = {f'#a{i}': name for i, name in enumerate(values)}
+        expression = 'SET ' + ', '.join(f'#a{i} = :a{i}' for i in range(len(values)))
+        expression += ' ADD #version :one'
+        names['#version'] = 'version'
+        expression_values = {f':a{i}': storage_value(value) for i, value in enumerate(values.values())}
+        expression_values[':one'] = 1
+
+        response = self.client.update_item(
+            TableName=self.table_name,
+            Key=item_key,
+            UpdateExpression=expression,
+            ExpressionAttributeNames=names,
+            ExpressionAttributeValues=expression_values,
+            ReturnValues='ALL_NEW',
+        )
+        self._notify(item_key)
+        return public(response['Attributes'])
+
+    def delete(self, entity, entity_id):
+        item_key = key(entity, entity_id)
+        self.client.delete_item(TableName=self.table_name, Key=item_key)
+        self._notify(item_key)
+
+    # list access patterns
+
+    def list(self, entity, *, limit=50, cursor=None):
+        """Page through one entity type with a ``Query`` on ``gsi1``.
+
+        Returns ``(items, next_cursor)``; ``next_cursor`` is ``None`` on the
+        last page.
+        """
+        _, list_key = ENTITIES[entity]
+        params = {
+            'TableName': self.table_name,
+            'IndexName': GSI1,
+            'KeyConditionExpression': conditions.Key('gsi1pk').eq(list_key),
+            'Limit': limit,
+        }
+        start_key = decode_cursor(cursor, gsi1pk=list_key)
+        if start_key:
+            params['ExclusiveStartKey'] = start_key
+        response = self.client.query(**params)
+        items = [public(item) for item in response.get('Items', [])]
+        return items, encode_cursor(response.get('LastEvaluatedKey'))
+
+    # projects
+
+    def put_project(self, profile_id, project_id, attributes):
+        """Create or update one of a profile's projects. Returns the new item."""
+        values = {k: v for k, v in attributes.items() if k not in MANAGED_ATTRIBUTES + ('profile_id',)}
+        values.update({'id': project_id, 'profile_id': profile_id})
+        return self._update(project_key(profile_id, project_id), values)
+
+    def list_projects(self, profile_id, *, limit=50, cursor=None, summary=True):
+        """Page through a profile's projects with a ``Query`` on its partition.
+
+        With ``summary`` only ``PROJECT_SUMMARY_ATTRIBUTES`` are read.
+        """
+        prefix, _ = ENTITIES['profile']
+        return self._query_partition(
+            f'{prefix}{profile_id}',
+            PROJECT_PREFIX,
+            limit=limit,
+            cursor=cursor,
+            attributes=PROJECT_SUMMARY_ATTRIBUTES if summary else None,
+        )
+
+    def _query_partition(self, pk, sk_prefix, *, limit=50, cursor=None, attributes=None):
+        """Page through the items of one partition whose sort key starts with ``sk_prefix``."""
+        params = {
+            'TableName': self.table_name,
+            'KeyConditionExpression': conditions.Key('pk').eq(pk) & conditions.Key('sk').begins_with(sk_prefix),
+            'Limit': limit,
+        }
+        if attributes:
+            # names like name and status are reserved words
+            names = {f'#p{i}': name for i, name in enumerate(attributes)}
+            params['ProjectionExpression'] = ', '.join(names)
+            params['ExpressionAttributeNames'] = names
+        start_key = decode_cursor(cursor, TABLE_KEY_ATTRIBUTES, pk=pk)
+        if start_key:
+            params['ExclusiveStartKey'] = start_key
+        response = self.client.query(**params)
+        items = [public(item) for item in response.get('Items', [])]
+        return items, encode_cursor(response.get('LastEvaluatedKey'))
+
+    # batches
+
+    def batch_get(self, keys):
+        """Fetch many items by key, 100 keys per ``BatchGetItem`` call.
+
+        Duplicate keys are dropped (DynamoDB rejects them) and the chunks are
+        fetched concurrently on a bounded thread pool, each retrying its
+        unprocessed keys with jittered exponential backoff. Items come back in
+        no particular order, with the storage keys still present so callers
+        can match them to the requested keys.
+        """
+        unique = list({(k['pk'], k['sk']): k for k in keys}.values())
+        batches = list(chunks(unique, BATCH_GET_LIMIT))
+        if len(batches) > 1 and BATCH_GET_WORKERS > 1:
+            results = list(self.executor.map(self._batch_get_chunk, batches))
+        else:
+            results = [self._batch_get_chunk(batch) for batch in batches]
+        return [item for result in results for item in result]
+
+    def _batch_get_chunk(self, chunk):
+        request = {self.table_name: {'Keys': chunk}}
+        found = []
+        for attempt in range(MAX_ATTEMPTS):
+            response = self.client.batch_get_item(RequestItems=request)
+            found.extend(response.get('Responses', {}).get(self.table_name, []))
+            request = response.get('UnprocessedKeys') or {}
+            if not request:
+                return found
+            backoff(attempt)
+        raise UnprocessedItemsError('BatchGetItem', request)
+
+    def get_many(self, entity, entity_ids):
+        """Return the public item for each of ``entity_ids``, in order.
+
+        Ids that do not exist map to ``None``; repeated ids are fetched once.
+        """
+        found = {}
+        for item in self.batch_get([key(entity, entity_id) for entity_id in entity_ids]):
+            found[item['pk']] = public(item)
+        prefix, _ = ENTITIES[entity]
+        return [found.get(f'{prefix}{entity_id}') for entity_id in entity_ids]
+
+    def batch_write(self, items=(), delete_keys=()):
+        """Put and delete items, 25 requests per ``BatchWriteItem`` call.
+
+        Unprocessed requests are retried with jittered exponential backoff.
+        Items are written as given: no version bump and no timestamps.
+        """
+        requests = [{'PutRequest': {'Item': item}} for item in items]
+        requests += [{'DeleteRequest': {'Key': k}} for k in delete_keys]
+        for chunk in chunks(requests, BATCH_WRITE_LIMIT):
+            request = {self.table_name: chunk}
+            for attempt in range(MAX_ATTEMPTS):
+                response = self.client.batch_write_item(RequestItems=request)
+                request = response.get('UnprocessedItems') or {}
+                if not request:
+                    break
+                backoff(attempt)
+            else:
+                raise UnprocessedItemsError('BatchWriteItem', request)
+        for item in items:
+            self._notify(item)
+        for item_key in delete_keys:
+            self._notify(item_key)
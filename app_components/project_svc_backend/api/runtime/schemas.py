@@ -0,0 +1,185 @@
+"""Request and response schemas of the API routes, declared next to them.
+
+A route declares what it accepts and returns with ``route``::
+
+    @app.route('/users:batchGet', methods=['POST'])
+    @schemas.route(body=BATCH_GET, responses={200: batch_result('users')})
+    def batch_get_users(): ...
+
+The REST API reads these at synth time (``api/routes.py``) and turns them
+into API Gateway models and request validators, so a malformed request is
+rejected before it costs an invocation. ``ProjectAPI`` then sets
+``VALIDATED_AT_GATEWAY`` and the decorator leaves the view alone; anywhere
+else (HTTP API, direct invocation, tests) it checks the body in process
+against the same schema and answers 400 itself.
+
+Schemas are JSON Schema draft 4, restricted to what API Gateway models
+support; ``validate`` implements the subset used here. Each one needs a
+``title``, which becomes its model name.
+"""
+
+import functools
+import os
+
+from flask import abort, request
+
+VALIDATED_AT_GATEWAY = os.environ.get('VALIDATED_AT_GATEWAY', 'false').lower() in ('1', 'true', 'yes')
+
+MAX_BATCH_IDS = 500
+
+_TYPES = {
+    'object': dict,
+    'array': list,
+    'string': str,
+    'integer': int,
+    'number': (int, float),
+    'boolean': bool,
+    'null': type(None),
+}
+
+
+def _is_type(instance, name):
+    # bool is an int subclass, but not a JSON integer or number
+    if isinstance(instance, bool) and name != 'boolean':
+        return False
+    return isinstance(instance, _TYPES[name])
+
+
+class RouteSchemas:
+    """What a view declared: body schema, query parameters and responses."""
+
+    __slots__ = ('body', 'query', 'responses')
+
+    def __init__(self, body=None, query=None, responses=None):
+        self.body = body
+        # name -> required
+        self.query = dict(query or {})
+        # status code -> schema
+        self.responses = dict(responses or {})
+
+
+def validate(instance, schema, where='body'):
+    """Return the ways ``instance`` breaks ``schema``, as messages."""
+    expected = schema.get('type')
+    if expected is not None:
+        names = expected if isinstance(expected, list) else [expected]
+        if not any(_is_type(instance, name) for name in names):
+            return [f"{where} must be of type {' or '.join(names)}"]
+    if 'enum' in schema and instance not in schema['enum']:
+        return [f"{where} must be one of {', '.join(map(str, schema['enum']))}"]
+
+    errors = []
+    if isinstance(instance, str):
+        if len(instance) < schema.get('minLength', 0):
+            errors.append(f"{where} must be at least {schema['minLength']} characters")
+        if 'maxLength' in schema and len(instance) > schema['maxLength']:
+            errors.append(f"{where} must be at most {schema['maxLength']} characters")
+    elif isinstance(instance, list):
+        if len(instance) < schema.get('minItems', 0):
+            errors.append(f"{where} must have at least {schema['minItems']} items")
+        if 'maxItems' in schema and len(instance) > schema['maxItems']:
+            errors.append(f"{where} must have at most {schema['maxItems']} items")
+        if 'items' in schema:
+            for i, item in enumerate(instance):
+                errors.extend(validate(item, schema['items'], f'{where}[{i}]'))
+    elif isinstance(instance, dict):
+        properties = schema.get('properties', {})
+        for name in schema.get('required', ()):
+            if name not in instance:
+                errors.append(f'{where}.{name} is required')
+        for name, value in instance.items():
+            if name in properties:
+                errors.extend(validate(value, properties[name], f'{where}.{name}'))
+            elif schema.get('additionalProperties') is False:
+                errors.append(f'{where}.{name} is not allowed')
+    return errors
+
+
+def route(*, body=None, query=None, responses=None):
+    """Declare a view's schemas, and check its body unless the gateway did."""
+
+    def decorate(view):
+        view.schemas = RouteSchemas(body, query, responses)
+        if body is None or VALIDATED_AT_GATEWAY:
+            return view
+
+        @functools.wraps(view)
+        def wrapper(*args, **kwargs):
+            errors = validate(request.get_json(silent=True), body)
+            if errors:
+                abort(400, description='; '.join(errors))
+            return view(*args, **kwargs)
+
+        return wrapper
+
+    return decorate
+
+
+def json_body():
+    """The request's JSON object body, or a 400."""
+    # checked against the route's body schema at the gateway, or by route;
+    # the gateway only validates application/json bodies, hence this last check
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        abort(400, description='request body must be a JSON object')
+    return body
+
+
+# shared schemas
+
+PAGE_QUERY = {'limit': False, 'cursor': False}
+
+ITEM_BODY = {
+    'title': 'ItemBody',
+    'type': 'object',
+}
+
+ITEM = {
+    'title': 'Item',
+    'type': 'object',
+    'required': ['id', 'version'],
+    'properties': {
+        'id': {'type': 'string'},
+        'version': {'type': 'integer'},
+        'updated_at': {'type': 'string'},
+    },
+}
+
+BATCH_GET = {
+    'title': 'BatchGetRequest',
+    'type': 'object',
+    'required': ['ids'],
+    'properties': {
+        'ids': {
+            'type': 'array',
+            'maxItems': MAX_BATCH_IDS,
+            'items': {'type': 'string', 'minLength': 1},
+        },
+    },
+}
+
+
+def page(collection):
+    """One page of a list route: ``{collection: [...], next_cursor}``."""
+    return {
+        'title': f'{collection.title()}Page',
+        'type': 'object',
+        'required': [collection, 'next_cursor'],
+        'properties': {
+            collection: {'type': 'array', 'items': ITEM},
+            'next_cursor': {'type': ['string', 'null']},
+        },
+    }
+
+
+def batch_result(collection):
+    """A batch get: items in request order (null when missing), and the misses."""
+    return {
+        'title': f'{collection.title()}BatchResult',
+        'type': 'object',
+        'required': [collection, 'missing'],
+        'properties': {
+            collection: {'type': 'array', 'items': {'type': ['object', 'null']}},
+            'missing': {'type': 'array', 'items': {'type': 'string'}},
+        },
+    }
@@ -0,0 +1,54 @@
+"""Init-phase warm-up for SnapStart and provisioned concurrency.
+
+Work registered with ``before_snapshot`` runs once during the init phase,
+where nobody waits for it:
+
+* under SnapStart (``AWS_LAMBDA_INITIALIZATION_TYPE=snap-start``) it runs
+  before the snapshot is taken, so every restored environment starts with it
+  done; ``after_restore`` hooks then run in each restored environment to
+  re-seed state that must not be shared between them;
+* under provisioned concurrency it runs straight away during init;
+* on demand it is skipped, since a cold request would have to wait for it.
+"""
+
+import os
+
+try:
+    # only present in the Lambda Python runtime when SnapStart is enabled
+    from snapshot_restore_py import register_after_restore, register_before_snapshot
+except ImportError:
+    register_after_restore = register_before_snapshot = None
+
+INIT_TYPE = os.environ.get('AWS_LAMBDA_INITIALIZATION_TYPE', 'on-demand')
+
+_before_snapshot = []
+_after_restore = []
+
+
+def before_snapshot(func):
+    _before_snapshot.append(func)
+    return func
+
+
+def after_restore(func):
+    _after_restore.append(func)
+    return func
+
+
+def run_before_snapshot():
+    for func in _before_snapshot:
+        func()
+
+
+def run_after_restore():
+    for func in _after_restore:
+        func()
+
+
+def install():
+    """Schedule the registered hooks for the current initialization type."""
+    if INIT_TYPE == 'snap-start' and register_before_snapshot is not None:
+        register_before_snapshot(run_before_snapshot)
+        register_after_restore(run_after_restore)
+    elif INIT_TYPE == 'provisioned-concurrency':
+        run_before_snapshot()
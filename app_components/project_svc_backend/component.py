@@ -1,14 +1,18 @@
-from typing import Any
+from typing import Any, Optional, Sequence
 
 from aws_cdk import (
+    Fn,
     Stack,
-    CfnOutput
+    CfnOutput,
+    aws_dynamodb as dynamodb
 )
 
 from constructs import Construct
 
 from app_components.project_svc_backend.api.infrastructure import ProjectAPI
 from app_components.project_svc_backend.database.infrastructure import ProjectDatabase
+from app_components.project_svc_backend.exporter.infrastructure import ProjectExporter
+from app_components.project_svc_backend.importer.infrastructure import ProjectImporter
 
 
 class ProjectBackend(Stack):
@@ -18,6 +22,16 @@ class ProjectBackend(Stack):
         id_: str,
         *,
         dynamodb_table_name: str,
+        billing_mode: dynamodb.BillingMode = dynamodb.BillingMode.PAY_PER_REQUEST,
+        api_cache_cluster_size: Optional[str] = None,
+        snap_start: bool = False,
+        provisioned_concurrency: Optional[int] = None,
+        max_provisioned_concurrency: Optional[int] = None,
+        emit_metrics: bool = True,
+        server_timing: bool = True,
+        api_type: str = 'rest',
+        jwt_audience: Optional[Sequence[str]] = None,
+        goals_api_url: Optional[str] = None,
         **kwargs: Any,
     ):
         super().__init__(scope, id_, **kwargs)
@@ -25,23 +39,58 @@ class ProjectBackend(Stack):
         database = ProjectDatabase(
             self,
             "Database",
+            table_name=dynamodb_table_name,
+            billing_mode=billing_mode,
         )
         api = ProjectAPI(
             self,
             "API",
-            dynamodb_table_name=dynamodb_table_name,#database.dynamodb_table.table_name
+            dynamodb_table_name=database.dynamodb_table.table_name,
             region_name=Stack.of(self).region,
             account_id=Stack.of(self).account,
+            cache_cluster_size=api_cache_cluster_size,
+            snap_start=snap_start,
+            provisioned_concurrency=provisioned_concurrency,
+            max_provisioned_concurrency=max_provisioned_concurrency,
+            emit_metrics=emit_metrics,
+            server_timing=server_timing,
+            api_type=api_type,
+            # issued by the SharedServices user pool; always set, auth.required rejects every request without it
+            user_pool_id=Fn.import_value("CognitoUserPoolId"),
+            jwt_audience=jwt_audience,
+            goals_api_url=goals_api_url,
         )
         #Monitoring(self, "Monitoring", database=database, api=api)
 
-        #database.dynamodb_table.grant_read_write_data(api.lambda_function)
+        database.dynamodb_table.grant_read_write_data(api.api_svc_lambda)
+
+        importer = ProjectImporter(
+            self,
+            "Importer",
+            table=database.dynamodb_table,
+            code=api.runtime_code,
+            runtime=api.runtime,
+            architecture=api.architecture,
+        )
+
+        exporter = ProjectExporter(
+            self,
+            "Exporter",
+            table=database.dynamodb_table,
+            code=api.runtime_code,
+            runtime=api.runtime,
+            architecture=api.architecture,
+        )
+        exporter.grant_start(api.api_svc_lambda)
+
+        # lets the frontend distribution route /api/* to this API (same origin, no CORS)
+        self.api_domain_name = api.api_domain_name
 
         self.api_endpoint = CfnOutput(
             self,
             "APIEndpoint",
-            # API doesn't disable create_default_stage, hence URL will be defined
-            value=api.app_layer_api.url,  # type: ignore
+            # both API types deploy the 'api' stage, hence URL will be defined
+            value=api.api_url,  # type: ignore
         )
 
         self.project_backend_lambda = CfnOutput(
@@ -50,4 +99,22 @@ class ProjectBackend(Stack):
             value=api.api_svc_lambda.function_name
         )
 
+        self.import_bucket = CfnOutput(
+            self,
+            "ImportBucket",
+            value=importer.import_bucket.bucket_name
+        )
+
+        self.import_lambda = CfnOutput(
+            self,
+            "ImportLambda",
+            value=importer.import_lambda.function_name
+        )
+
+        self.export_bucket = CfnOutput(
+            self,
+            "ExportBucket",
+            value=exporter.export_bucket.bucket_name
+        )
+
 
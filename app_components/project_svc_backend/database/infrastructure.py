@@ -1,27 +1,70 @@
-import pathlib
+from typing import Optional
 
-import json
 from aws_cdk import (
-    CfnOutput,
-    Duration,
-    Stack,
-    BundlingOptions,
-    aws_lambda as lambda_,
-    aws_iam as iam,
-    aws_apigateway as apigw,
-    aws_cognito as cognito)
+    RemovalPolicy,
+    aws_dynamodb as dynamodb)
 from constructs import Construct
-from cdk_nag import NagSuppressions, NagPackSuppression
-import os.path
 
 class ProjectDatabase(Construct):
+    '''
+    Single-table design for the project service.
+
+    Items are keyed by pk/sk; the gsi1 index serves the list access patterns
+    (all users, all profiles, ...) so the runtime never has to Scan. See
+    api/runtime/repository.py for the key layout.
+    '''
+
     def __init__(
         self,
         scope: Construct,
-        id_: str
+        id_: str,
+        *,
+        table_name: Optional[str] = None,
+        billing_mode: dynamodb.BillingMode = dynamodb.BillingMode.PAY_PER_REQUEST,
+        min_capacity: int = 1,
+        max_capacity: int = 20,
+        target_utilization_percent: int = 70
     ):
         super().__init__(scope, id_)
 
-        log_level = "INFO"
-        
-        #todo
+        provisioned = billing_mode == dynamodb.BillingMode.PROVISIONED
+        capacity = {'read_capacity': min_capacity, 'write_capacity': min_capacity} if provisioned else {}
+
+        self.dynamodb_table = dynamodb.Table(
+            self,
+            'ProjectsTable',
+            table_name=table_name,
+            partition_key=dynamodb.Attribute(name='pk', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name='sk', type=dynamodb.AttributeType.STRING),
+            billing_mode=billing_mode,
+            time_to_live_attribute='expires_at',
+            point_in_time_recovery_specification=dynamodb.PointInTimeRecoverySpecification(
+                point_in_time_recovery_enabled=True
+            ),
+            removal_policy=RemovalPolicy.DESTROY,  # DESTROY for development; use RETAIN for production
+            **capacity
+        )
+
+        #list access patterns
+        self.dynamodb_table.add_global_secondary_index(
+            index_name='gsi1',
+            partition_key=dynamodb.Attribute(name='gsi1pk', type=dynamodb.AttributeType.STRING),
+            sort_key=dynamodb.Attribute(name='gsi1sk', type=dynamodb.AttributeType.STRING),
+            projection_type=dynamodb.ProjectionType.ALL,
+            **capacity
+        )
+
+        if provisioned:
+            #scale table and index capacity on utilization
+            scalers = [
+                self.dynamodb_table.auto_scale_read_capacity(min_capacity=min_capacity, max_capacity=max_capacity),
+                self.dynamodb_table.auto_scale_write_capacity(min_capacity=min_capacity, max_capacity=max_capacity),
+                self.dynamodb_table.auto_scale_global_secondary_index_read_capacity(
+                    'gsi1', min_capacity=min_capacity, max_capacity=max_capacity
+                ),
+                self.dynamodb_table.auto_scale_global_secondary_index_write_capacity(
+                    'gsi1', min_capacity=min_capacity, max_capacity=max_capacity
+                ),
+            ]
+            for scaler in scalers:
+                scaler.scale_on_utilization(target_utilization_percent=target_utilization_percent)
@@ -0,0 +1,148 @@
+from aws_cdk import (
+    Duration,
+    RemovalPolicy,
+    Stack,
+    aws_lambda as lambda_,
+    aws_iam as iam,
+    aws_s3 as s3,
+    aws_dynamodb as dynamodb)
+from constructs import Construct
+from cdk_nag import NagSuppressions, NagPackSuppression
+
+class ProjectExporter(Construct):
+    '''
+    Asynchronous export of one entity type to S3 as gzip-compressed NDJSON.
+
+    The function runs exporter.main from the API runtime asset: a parallel Scan
+    of the gsi1 index streamed into a multipart upload. The API starts jobs and
+    signs download URLs; see grant_start. Async invocations are not retried:
+    a failed export is reported through its job's failed status.
+    '''
+
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        table: dynamodb.ITable,
+        code: lambda_.Code,
+        runtime: lambda_.Runtime,
+        architecture: lambda_.Architecture,
+        total_segments: int = 8,
+        memory_size: int = 1024,
+        timeout: Duration = Duration.minutes(15),
+        retention: Duration = Duration.days(7)
+    ):
+        super().__init__(scope, id_)
+
+        function_name = 'project-export-lambda'
+        stack = Stack.of(self)
+
+        self.export_bucket = s3.Bucket(
+            self,
+            'ExportBucket',
+            removal_policy=RemovalPolicy.DESTROY,  # DESTROY for development; use RETAIN for production
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            enforce_ssl=True,
+            lifecycle_rules=[
+                s3.LifecycleRule(
+                    expiration=retention,
+                    abort_incomplete_multipart_upload_after=Duration.days(1)
+                )
+            ]
+        )
+
+        export_lambda_role = iam.Role(
+            self,
+            'ExportLambdaRole',
+            assumed_by=iam.ServicePrincipal('lambda.amazonaws.com')
+        )
+
+        export_lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    'logs:CreateLogGroup',
+                    'logs:CreateLogStream',
+                    'logs:PutLogEvents'
+                ],
+                resources=[':'.join([
+                    'arn',
+                    'aws',
+                    'logs',
+                    stack.region,
+                    stack.account,
+                    'log-group',
+                    f'/aws/lambda/{function_name}',
+                    '*'
+                ])]
+            )
+        )
+
+        self.export_lambda = lambda_.Function(
+            self,
+            'ExportLambda',
+            description='exports an entity type from the Projects table to S3 as gzip NDJSON',
+            function_name=function_name,
+            runtime=runtime,
+            architecture=architecture,
+            code=code,
+            role=export_lambda_role,
+            handler='exporter.main',
+            memory_size=memory_size,
+            timeout=timeout,
+            #a failed run marks its job failed; a retry would scan and upload it all again
+            retry_attempts=0,
+            environment={
+                'LOG_LEVEL': 'INFO',
+                'TABLE_NAME': table.table_name,
+                'EXPORT_BUCKET': self.export_bucket.bucket_name,
+                'EXPORT_SEGMENTS': str(total_segments)
+            }
+        )
+
+        #scan the index and update the job item
+        table.grant_read_write_data(self.export_lambda)
+        self.export_bucket.grant_put(self.export_lambda, 'exports/*')
+
+        NagSuppressions.add_resource_suppressions(
+            self.export_bucket,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-S1',
+                    reason='Server access logs disabled for dev environment. Will be enabled in production.'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            export_lambda_role,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-IAM5',
+                    reason='Wildcards are scoped to the log group, the exports/ prefix and the table indexes'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            self.export_lambda,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-L1',
+                    reason='runtime version selected based on dependency support'
+                )
+            ]
+        )
+
+    def grant_start(self, function: lambda_.Function) -> None:
+        '''
+        Let function start exports and sign download URLs for finished ones.
+        '''
+        function.add_environment('EXPORT_FUNCTION_NAME', self.export_lambda.function_name)
+        function.add_environment('EXPORT_BUCKET', self.export_bucket.bucket_name)
+        self.export_lambda.grant_invoke(function)
+        self.export_bucket.grant_read(function, 'exports/*')
@@ -0,0 +1,137 @@
+from aws_cdk import (
+    Duration,
+    RemovalPolicy,
+    Stack,
+    aws_lambda as lambda_,
+    aws_iam as iam,
+    aws_s3 as s3,
+    aws_dynamodb as dynamodb)
+from constructs import Construct
+from cdk_nag import NagSuppressions, NagPackSuppression
+
+class ProjectImporter(Construct):
+    '''
+    Bulk import of JSONL/CSV objects from S3 into the Projects table.
+
+    The function runs importer.main from the API runtime asset, so it shares the
+    repository code with the Flask app. Invoke it with
+    {"bucket": ..., "key": ..., "entity": ...}; it checkpoints into the table and
+    re-invokes itself until the object is fully imported.
+    '''
+
+    def __init__(
+        self,
+        scope: Construct,
+        id_: str,
+        *,
+        table: dynamodb.ITable,
+        code: lambda_.Code,
+        runtime: lambda_.Runtime,
+        architecture: lambda_.Architecture,
+        workers: int = 8,
+        memory_size: int = 1024,
+        timeout: Duration = Duration.minutes(15)
+    ):
+        super().__init__(scope, id_)
+
+        function_name = 'project-import-lambda'
+        stack = Stack.of(self)
+
+        self.import_bucket = s3.Bucket(
+            self,
+            'ImportBucket',
+            removal_policy=RemovalPolicy.DESTROY,  # DESTROY for development; use RETAIN for production
+            block_public_access=s3.BlockPublicAccess.BLOCK_ALL,
+            encryption=s3.BucketEncryption.S3_MANAGED,
+            enforce_ssl=True
+        )
+
+        import_lambda_role = iam.Role(
+            self,
+            'ImportLambdaRole',
+            assumed_by=iam.ServicePrincipal('lambda.amazonaws.com')
+        )
+
+        import_lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=[
+                    'logs:CreateLogGroup',
+                    'logs:CreateLogStream',
+                    'logs:PutLogEvents'
+                ],
+                resources=[':'.join([
+                    'arn',
+                    'aws',
+                    'logs',
+                    stack.region,
+                    stack.account,
+                    'log-group',
+                    f'/aws/lambda/{function_name}',
+                    '*'
+                ])]
+            )
+        )
+
+        #continue a stopped import by invoking itself; the ARN is built from the name to avoid a role/function cycle
+        import_lambda_role.add_to_policy(
+            iam.PolicyStatement(
+                effect=iam.Effect.ALLOW,
+                actions=['lambda:InvokeFunction'],
+                resources=[f'arn:aws:lambda:{stack.region}:{stack.account}:function:{function_name}']
+            )
+        )
+
+        self.import_lambda = lambda_.Function(
+            self,
+            'ImportLambda',
+            description='streams JSONL/CSV objects from S3 into the Projects table',
+            function_name=function_name,
+            runtime=runtime,
+            architecture=architecture,
+            code=code,
+            role=import_lambda_role,
+            handler='importer.main',
+            memory_size=memory_size,
+            timeout=timeout,
+            environment={
+                'LOG_LEVEL': 'INFO',
+                'TABLE_NAME': table.table_name,
+                'IMPORT_WORKERS': str(workers)
+            }
+        )
+
+        table.grant_read_write_data(self.import_lambda)
+        self.import_bucket.grant_read(self.import_lambda)
+
+        NagSuppressions.add_resource_suppressions(
+            self.import_bucket,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-S1',
+                    reason='Server access logs disabled for dev environment. Will be enabled in production.'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            import_lambda_role,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-IAM5',
+                    reason='Wildcards are scoped to the log group, the import bucket and the table indexes'
+                )
+            ]
+        )
+
+        NagSuppressions.add_resource_suppressions(
+            self.import_lambda,
+            apply_to_children=True,
+            suppressions=[
+                NagPackSuppression(
+                    id='AwsSolutions-L1',
+                    reason='runtime version selected based on dependency support'
+                )
+            ]
+        )
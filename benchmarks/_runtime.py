@@ -0,0 +1,12 @@
+"""Put the Lambda runtime directory on ``sys.path`` for in-process benchmarks."""
+
+import os
+import sys
+
+RUNTIME_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    '..', 'app_components', 'project_svc_backend', 'api', 'runtime',
+))
+
+if RUNTIME_DIR not in sys.path:
+    sys.path.insert(0, RUNTIME_DIR)
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Compare the WSGI adapter against the previous test_request_context bridge.
+
+Run from the repository root:
+
+    python benchmarks/adapter_bench.py [--number 20000]
+"""
+
+import argparse
+import timeit
+
+import _runtime  # noqa: F401  (puts the runtime on sys.path)
+
+from flask import request
+
+import adapter
+import handler
+
+
+def legacy_main(event, context):
+    """The handler as it was before the adapter, kept here for comparison."""
+    path = event.get("path", "")
+    http_method = event.get("httpMethod", "")
+    headers = event.get("headers", {})
+    query_params = event.get("queryStringParameters", {}) or {}
+    path_params = event.get("pathParameters", {}) or {}
+    body = event.get("body", "")
+
+    with handler.app.test_request_context(
+        path=path,
+        method=http_method,
+        headers=headers,
+        query_string=query_params,
+        data=body,
+    ):
+        request.path_params = path_params
+        response = handler.app.full_dispatch_request()
+        return {
+            "statusCode": response.status_code,
+            "body": response.get_data(as_text=True),
+            "headers": dict(response.headers),
+        }
+
+
+def make_event(path, *, method='GET', query=None, header_count=10, body=None):
+    headers = {f'X-Bench-{i}': f'value-{i}' for i in range(header_count)}
+    headers.update({
+        'Host': 'example.execute-api.us-east-1.amazonaws.com',
+        'Accept': 'application/json',
+        'X-Forwarded-Proto': 'https',
+        'X-Forwarded-Port': '443',
+    })
+    return {
+        'resource': path,
+        'path': path,
+        'httpMethod': method,
+        'headers': headers,
+        'multiValueHeaders': {k: [v] for k, v in headers.items()},
+        'queryStringParameters': query,
+        'multiValueQueryStringParameters': {k: [v] for k, v in query.items()} if query else None,
+        'pathParameters': None,
+        'body': body,
+        'isBase64Encoded': False,
+        'requestContext': {'protocol': 'HTTP/1.1', 'identity': {'sourceIp': '203.0.113.1'}},
+    }
+
+
+SCENARIOS = {
+    'GET / (small)': make_event('/', header_count=2),
+    'GET /users?limit (20 headers)': make_event('/users', query={'limit': '50', 'cursor': 'abc'}, header_count=20),
+    'GET /users/<id> (60 headers)': make_event('/users/123', header_count=60),
+}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--number', type=int, default=20000)
+    args = parser.parse_args()
+
+    print(f"{'scenario':34} {'legacy us':>10} {'adapter us':>11} {'speedup':>8}")
+    for name, event in SCENARIOS.items():
+        legacy = timeit.timeit(lambda: legacy_main(event, None), number=args.number)
+        current = timeit.timeit(lambda: adapter.handle(handler.app, event, None), number=args.number)
+        legacy_us = legacy / args.number * 1e6
+        current_us = current / args.number * 1e6
+        print(f'{name:34} {legacy_us:10.1f} {current_us:11.1f} {legacy_us / current_us:7.2f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Payload size and CPU cost of each compression level on a list response.
+
+Run from the repository root:
+
+    python benchmarks/compression_bench.py [--items 500] [--number 50]
+"""
+
+import argparse
+import json
+import timeit
+
+import _runtime  # noqa: F401  (puts the runtime on sys.path)
+
+import compression
+
+
+def make_payload(items):
+    users = [
+        {
+            'id': f'user-{i:06d}',
+            'name': f'User {i}',
+            'email': f'user{i}@example.com',
+            'version': i % 7 + 1,
+            'updated_at': '2026-10-18T12:00:00+00:00',
+            'tags': ['alpha', 'beta', 'gamma'][: i % 3 + 1],
+        }
+        for i in range(items)
+    ]
+    return json.dumps({'users': users, 'next_cursor': None}).encode()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=500)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    body = make_payload(args.items)
+    print(f'payload: {len(body)} bytes ({args.items} items)')
+    print(f"{'codec':8} {'level':>5} {'bytes':>8} {'ratio':>6} {'ms':>8}")
+
+    levels = [('gzip', level) for level in range(1, 10)]
+    if compression.brotli is not None:
+        levels += [('br', quality) for quality in range(0, 12)]
+
+    for codec, level in levels:
+        kwargs = {'gzip_level': level} if codec == 'gzip' else {'brotli_quality': level}
+        compressed = compression.compress(body, codec, **kwargs)
+        seconds = timeit.timeit(lambda: compression.compress(body, codec, **kwargs), number=args.number)
+        print(
+            f'{codec:8} {level:5} {len(compressed):8} '
+            f'{len(body) / len(compressed):6.1f} {seconds / args.number * 1000:8.2f}'
+        )
+
+
+if __name__ == '__main__':
+    main()
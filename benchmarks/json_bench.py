@@ -0,0 +1,96 @@
+#!/usr/bin/env python3
+"""Cost of turning a list of DynamoDB items into a JSON response.
+
+Compares Flask's default provider, fed items converted to plain types first
+(what the runtime did before ``fastjson``), with ``FastJSONProvider`` on the
+items as DynamoDB returns them, using orjson and the stdlib fallback.
+
+Run from the repository root:
+
+    python benchmarks/json_bench.py [--items 1000] [--number 50]
+"""
+
+import argparse
+import decimal
+import timeit
+
+import _runtime  # noqa: F401  (puts the runtime on sys.path)
+
+from flask import Flask
+from flask.json.provider import DefaultJSONProvider
+
+import fastjson
+
+
+def make_items(count):
+    return [
+        {
+            'id': f'profile-{i:06d}',
+            'name': f'Profile {i}',
+            'email': f'profile{i}@example.com',
+            'bio': 'Lorem ipsum dolor sit amet, consectetur adipiscing elit. ' * 3,
+            'version': decimal.Decimal(i % 7 + 1),
+            'score': decimal.Decimal(f'{i % 100}.25'),
+            'tags': {'alpha', 'beta', 'gamma'},
+            'updated_at': '2026-10-18T12:00:00+00:00',
+            'address': {'city': 'Seattle', 'zip': decimal.Decimal(98101 + i % 50)},
+        }
+        for i in range(count)
+    ]
+
+
+def plain(value):
+    # the recursive pass every item needed with the default provider
+    if isinstance(value, decimal.Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    if isinstance(value, dict):
+        return {k: plain(v) for k, v in value.items()}
+    if isinstance(value, (list, set)):
+        return [plain(v) for v in value]
+    return value
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--items', type=int, default=1000)
+    parser.add_argument('--number', type=int, default=50)
+    args = parser.parse_args()
+
+    items = make_items(args.items)
+    payload = {'profiles': items, 'next_cursor': None}
+
+    default_app = Flask('default')
+    default_app.json = DefaultJSONProvider(default_app)
+    fast_app = fastjson.install(Flask('fast'))
+    orjson = fastjson.orjson
+
+    def stdlib_fast():
+        fastjson.orjson = None
+        try:
+            return fast_app.json.response(payload)
+        finally:
+            fastjson.orjson = orjson
+
+    def default_plain():
+        return default_app.json.response({'profiles': [plain(item) for item in items], 'next_cursor': None})
+
+    cases = [
+        ('flask default + plain()', default_plain),
+        ('fastjson (stdlib)', stdlib_fast),
+    ]
+    if orjson is not None:
+        cases.append(('fastjson (orjson)', lambda: fast_app.json.response(payload)))
+
+    print(f'{args.items} items, best of 5 x {args.number} responses')
+    print(f"{'provider':28} {'bytes':>9} {'ms':>8} {'speedup':>8}")
+    baseline = None
+    for name, build in cases:
+        with default_app.app_context(), fast_app.app_context():
+            size = len(build().get_data())
+            seconds = min(timeit.repeat(build, number=args.number, repeat=5)) / args.number
+        baseline = baseline or seconds
+        print(f'{name:28} {size:9} {seconds * 1000:8.2f} {baseline / seconds:7.1f}x')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,332 @@
+#!/usr/bin/env python3
+"""In-process benchmark of the Lambda request path (``handler.main``).
+
+Feeds synthetic API Gateway events of varying size into ``handler.main`` and
+reports per-scenario p50/p95/p99 latency, tracemalloc allocations per request
+and the cold-init cost of the handler module. The table is replaced by an
+in-memory repository, so the numbers are the request path alone and not
+DynamoDB latency.
+
+Run from the repository root:
+
+    python benchmarks/request_path.py --output bench.json
+    python benchmarks/request_path.py --compare before.json after.json
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import subprocess
+import sys
+import time
+import tracemalloc
+
+import _runtime
+
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+
+import handler
+import metrics
+import repository
+
+# payload formats the adapter understands
+PAYLOAD_VERSIONS = ('1.0', '2.0')
+
+SIZES = {
+    'small': {'headers': 4, 'query': 0, 'body': 64},
+    'medium': {'headers': 25, 'query': 4, 'body': 4 * 1024},
+    'large': {'headers': 80, 'query': 16, 'body': 64 * 1024},
+}
+
+
+class InMemoryRepository(repository.Repository):
+    """Repository backed by a dict, keeping the real item shape."""
+
+    def __init__(self):
+        super().__init__('Benchmark')
+        self.items = {}
+
+    def get(self, entity, entity_id):
+        return self.items.get((entity, entity_id))
+
+    def put(self, entity, entity_id, attributes, *, expires_at=None):
+        previous = self.items.get((entity, entity_id), {})
+        item = {k: v for k, v in attributes.items() if k not in repository.MANAGED_ATTRIBUTES}
+        item.update({
+            'id': entity_id,
+            'version': previous.get('version', 0) + 1,
+            'updated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        })
+        self.items[(entity, entity_id)] = item
+        self._notify(repository.key(entity, entity_id))
+        return item
+
+    def list(self, entity, *, limit=50, cursor=None):
+        items = [v for (e, _), v in sorted(self.items.items()) if e == entity]
+        return items[:limit], None
+
+
+def seed(repo, count=200):
+    for i in range(count):
+        repo.put('user', f'u{i:04d}', {'name': f'User {i}', 'email': f'user{i}@example.com'})
+        repo.put('profile', f'p{i:04d}', {'name': f'Profile {i}', 'bio': 'lorem ipsum ' * 8})
+
+
+def make_headers(count):
+    headers = {
+        'Host': 'abc123.execute-api.us-east-1.amazonaws.com',
+        'Accept': 'application/json',
+        'Accept-Encoding': 'gzip, deflate, br',
+        'User-Agent': 'request-path-benchmark',
+        'X-Forwarded-Proto': 'https',
+        'X-Forwarded-Port': '443',
+    }
+    headers.update({f'X-Custom-{i}': f'value-{i}' * 3 for i in range(max(0, count - len(headers)))})
+    return headers
+
+
+def make_body(size):
+    filler = 'x' * max(0, size - 32)
+    return json.dumps({'name': 'Benchmark', 'bio': filler})
+
+
+def event_v1(method, path, size):
+    spec = SIZES[size]
+    headers = make_headers(spec['headers'])
+    query = {f'q{i}': f'value {i}' for i in range(spec['query'])} or None
+    body = make_body(spec['body']) if method in ('POST', 'PUT') else None
+    if body is not None:
+        headers['Content-Type'] = 'application/json'
+    return {
+        'resource': path,
+        'path': path,
+        'httpMethod': method,
+        'headers': headers,
+        'multiValueHeaders': {k: [v] for k, v in headers.items()},
+        'queryStringParameters': query,
+        'multiValueQueryStringParameters': {k: [v] for k, v in query.items()} if query else None,
+        'pathParameters': None,
+        'stageVariables': None,
+        'body': body,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'stage': 'api',
+            'httpMethod': method,
+            'protocol': 'HTTP/1.1',
+            'identity': {'sourceIp': '203.0.113.10'},
+        },
+    }
+
+
+def event_v2(method, path, size):
+    spec = SIZES[size]
+    headers = {k.lower(): v for k, v in make_headers(spec['headers']).items()}
+    query = '&'.join(f'q{i}=value%20{i}' for i in range(spec['query']))
+    body = make_body(spec['body']) if method in ('POST', 'PUT') else None
+    if body is not None:
+        headers['content-type'] = 'application/json'
+    return {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': path,
+        'rawQueryString': query,
+        'cookies': ['session=abc'],
+        'headers': headers,
+        'queryStringParameters': dict(p.split('=') for p in query.split('&')) if query else None,
+        'body': body,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'stage': '$default',
+            'http': {
+                'method': method,
+                'path': path,
+                'protocol': 'HTTP/1.1',
+                'sourceIp': '203.0.113.10',
+            },
+        },
+    }
+
+
+EVENT_FACTORIES = {'1.0': event_v1, '2.0': event_v2}
+
+ROUTES = [
+    ('GET', '/'),
+    ('GET', '/users'),
+    ('GET', '/users/u0042'),
+    ('GET', '/profiles/p0042'),
+    ('PUT', '/profiles/p0042'),
+    ('GET', '/profiles/missing'),
+]
+
+
+def scenarios(versions, sizes):
+    for version in versions:
+        for size in sizes:
+            for method, path in ROUTES:
+                name = f'v{version} {size} {method} {path}'
+                yield name, EVENT_FACTORIES[version](method, path, size)
+
+
+def percentile(samples, pct):
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+def run_scenario(event, iterations, warmup):
+    for _ in range(warmup):
+        handler.main(event, None)
+
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter_ns()
+        response = handler.main(event, None)
+        samples.append((time.perf_counter_ns() - start) / 1000)
+
+    # allocations are measured in a separate pass, tracing skews latency
+    allocation_runs = max(1, iterations // 10)
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    tracemalloc.reset_peak()
+    before = tracemalloc.take_snapshot()
+    for _ in range(allocation_runs):
+        handler.main(event, None)
+    after = tracemalloc.take_snapshot()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    allocated = sum(stat.size_diff for stat in after.compare_to(before, 'filename') if stat.size_diff > 0)
+
+    return {
+        'status': response['statusCode'],
+        'iterations': iterations,
+        'p50_us': percentile(samples, 50),
+        'p95_us': percentile(samples, 95),
+        'p99_us': percentile(samples, 99),
+        'mean_us': statistics.fmean(samples),
+        'peak_alloc_bytes': peak - baseline,
+        'retained_bytes_per_request': allocated / allocation_runs,
+    }
+
+
+COLD_INIT_PROBE = '''
+import json, os, time
+t0 = time.perf_counter()
+import handler
+t1 = time.perf_counter()
+import metrics
+metrics.stream = open(os.devnull, "w")
+handler.main({"httpMethod": "GET", "path": "/", "headers": {}}, None)
+t2 = time.perf_counter()
+print(json.dumps({"import_ms": (t1 - t0) * 1000, "first_request_ms": (t2 - t1) * 1000}))
+'''
+
+
+def cold_init(runs):
+    env = dict(os.environ, PYTHONPATH=_runtime.RUNTIME_DIR)
+    results = []
+    for _ in range(runs):
+        completed = subprocess.run(
+            [sys.executable, '-c', COLD_INIT_PROBE],
+            cwd=_runtime.RUNTIME_DIR,
+            env=env,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        results.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+    return {
+        'runs': runs,
+        'import_ms_p50': statistics.median(r['import_ms'] for r in results),
+        'first_request_ms_p50': statistics.median(r['first_request_ms'] for r in results),
+    }
+
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ['git', 'rev-parse', '--short', 'HEAD'],
+            capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(before_path, after_path, threshold):
+    with open(before_path) as f:
+        before = json.load(f)
+    with open(after_path) as f:
+        after = json.load(f)
+
+    print(f"{'scenario':48} {'p50 before':>10} {'p50 after':>10} {'change':>8}")
+    regressions = 0
+    for name, result in after['scenarios'].items():
+        old = before['scenarios'].get(name)
+        if old is None:
+            continue
+        change = (result['p50_us'] - old['p50_us']) / old['p50_us'] * 100
+        flag = ' !' if change > threshold else ''
+        regressions += bool(flag)
+        print(f"{name:48} {old['p50_us']:10.1f} {result['p50_us']:10.1f} {change:+7.1f}%{flag}")
+    for key in ('import_ms_p50', 'first_request_ms_p50'):
+        old, new = before['cold_init'][key], after['cold_init'][key]
+        print(f"{'cold init ' + key:48} {old:10.1f} {new:10.1f} {(new - old) / old * 100:+7.1f}%")
+    return 1 if regressions else 0
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--iterations', type=int, default=2000)
+    parser.add_argument('--warmup', type=int, default=200)
+    parser.add_argument('--cold-runs', type=int, default=5)
+    parser.add_argument('--sizes', nargs='+', choices=list(SIZES), default=list(SIZES))
+    parser.add_argument('--versions', nargs='+', choices=PAYLOAD_VERSIONS, default=list(PAYLOAD_VERSIONS))
+    parser.add_argument('--output', help='write the results to this JSON file')
+    parser.add_argument('--compare', nargs=2, metavar=('BEFORE', 'AFTER'),
+                        help='compare two result files instead of running')
+    parser.add_argument('--threshold', type=float, default=10.0,
+                        help='p50 increase, in percent, reported as a regression by --compare')
+    args = parser.parse_args(argv)
+
+    if args.compare:
+        return compare(*args.compare, args.threshold)
+
+    # keep the cost of writing EMF records, not the terminal noise
+    metrics.stream = open(os.devnull, 'w')
+
+    repo = InMemoryRepository()
+    repo.write_listeners.append(handler.invalidate_item)
+    handler.repository = repo
+    seed(repo)
+
+    results = {
+        'commit': git_commit(),
+        'python': platform.python_version(),
+        'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+        'scenarios': {},
+    }
+    print(f"{'scenario':48} {'status':>6} {'p50 us':>8} {'p95 us':>8} {'p99 us':>8} {'peak KiB':>9}")
+    for name, event in scenarios(args.versions, args.sizes):
+        result = run_scenario(event, args.iterations, args.warmup)
+        results['scenarios'][name] = result
+        print(
+            f"{name:48} {result['status']:6} {result['p50_us']:8.1f} {result['p95_us']:8.1f} "
+            f"{result['p99_us']:8.1f} {result['peak_alloc_bytes'] / 1024:9.1f}"
+        )
+
+    results['cold_init'] = cold_init(args.cold_runs)
+    print(
+        f"cold init: import {results['cold_init']['import_ms_p50']:.1f} ms, "
+        f"first request {results['cold_init']['first_request_ms_p50']:.1f} ms"
+    )
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(results, f, indent=2)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,81 @@
+import os
+import sys
+
+# The Lambda runtime is deployed as a flat asset, so its modules import each
+# other by top-level name. Mirror that layout for the runtime tests.
+RUNTIME_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    '..', '..', 'app_components', 'project_svc_backend', 'api', 'runtime',
+))
+
+# The goals runtime is bundled on top of those modules.
+GOALS_RUNTIME_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    '..', '..', 'app_components', 'goals_svc_backend', 'api', 'runtime',
+))
+
+# The frontend deployer custom resource is a flat asset too.
+DEPLOYER_DIR = os.path.abspath(os.path.join(
+    os.path.dirname(__file__),
+    '..', '..', 'app_components', 'frontend', 'hosting', 'deployer',
+))
+
+for path in (RUNTIME_DIR, GOALS_RUNTIME_DIR, DEPLOYER_DIR):
+    if path not in sys.path:
+        sys.path.insert(0, path)
+
+import pytest
+
+import clients
+
+
+@pytest.fixture
+def projects_table(monkeypatch):
+    """A moto-backed Projects table with the ProjectDatabase key schema."""
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    # shared clients must not outlive the mock they were created in
+    clients.reset()
+    with moto.mock_aws():
+        table = boto3.resource('dynamodb').create_table(
+            TableName='Projects',
+            KeySchema=[
+                {'AttributeName': 'pk', 'KeyType': 'HASH'},
+                {'AttributeName': 'sk', 'KeyType': 'RANGE'},
+            ],
+            AttributeDefinitions=[
+                {'AttributeName': name, 'AttributeType': 'S'}
+                for name in ('pk', 'sk', 'gsi1pk', 'gsi1sk')
+            ],
+            GlobalSecondaryIndexes=[{
+                'IndexName': 'gsi1',
+                'KeySchema': [
+                    {'AttributeName': 'gsi1pk', 'KeyType': 'HASH'},
+                    {'AttributeName': 'gsi1sk', 'KeyType': 'RANGE'},
+                ],
+                'Projection': {'ProjectionType': 'ALL'},
+            }],
+            BillingMode='PAY_PER_REQUEST',
+        )
+        yield table
+    clients.reset()
+
+
+class AcceptingVerifier:
+    """Stands in for the Cognito token verifier: every bearer token is valid, and names its caller."""
+
+    def verify(self, token):
+        return {'sub': token, 'token_use': 'access'}
+
+
+@pytest.fixture
+def signed_in(monkeypatch):
+    """Accept any bearer token on auth.required routes; returns headers carrying one."""
+    import auth
+
+    monkeypatch.setattr(auth, 'verifier', AcceptingVerifier())
+    return {'Authorization': 'Bearer user-1'}
@@ -1,15 +1,47 @@
 import aws_cdk as core
 import aws_cdk.assertions as assertions
 
-from stacks.app_layer_stack import AppLayerStack
+from app_components.project_svc_backend.component import ProjectBackend
+
 
-# example tests. To run these tests, uncomment this file along with the example
-# resource in stacks/app_layer_stack.py
 def test_lambda_function_created():
-    app = core.App()
-    stack = AppLayerStack(app, "SampleAppLayerStack")
+    # skip asset bundling, the template is all this test looks at
+    app = core.App(context={'aws:cdk:bundling-stacks': []})
+    stack = ProjectBackend(app, "SampleAppLayerStack", dynamodb_table_name="Projects")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Timeout": 30
+    })
+
+
+def test_goals_backend_serves_goals_on_top_of_the_shared_runtime():
+    from app_components.goals_svc_backend.component import GoalsBackend
+
+    app = core.App(context={'aws:cdk:bundling-stacks': []})
+    stack = GoalsBackend(app, "GoalsStack")
+    template = assertions.Template.from_stack(stack)
+
+    template.has_resource_properties("AWS::Lambda::Function", {
+        "Handler": "goals.main",
+        "Environment": {"Variables": assertions.Match.object_like({
+            "GOALS_TABLE_NAME": {"Ref": assertions.Match.any_value()}
+        })}
+    })
+    template.resource_count_is("AWS::DynamoDB::Table", 1)
+    template.resource_count_is("AWS::ApiGatewayV2::Route", 3)
+    template.has_resource_properties("AWS::ApiGatewayV2::Stage", {"StageName": "api"})
+
+
+def test_goals_routes_sit_behind_the_jwt_authorizer_when_an_audience_is_set():
+    from app_components.goals_svc_backend.component import GoalsBackend
+
+    app = core.App(context={'aws:cdk:bundling-stacks': []})
+    stack = GoalsBackend(app, "GoalsStack", jwt_audience=['client-1'])
     template = assertions.Template.from_stack(stack)
 
-#     template.has_resource_properties("AWS::Lambda::Function", {
-#         "Timeout": 30
-#     })
+    template.has_resource_properties("AWS::ApiGatewayV2::Authorizer", {
+        "AuthorizerType": "JWT",
+        "JwtConfiguration": {"Audience": ["client-1"], "Issuer": assertions.Match.any_value()}
+    })
+    template.all_resources_properties("AWS::ApiGatewayV2::Route", {"AuthorizationType": "JWT"})
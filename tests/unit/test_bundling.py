@@ -0,0 +1,112 @@
+import os
+
+from aws_cdk import aws_lambda as lambda_
+
+from app_components.project_svc_backend.api.bundling import CachedPythonBundling, source_hash
+from app_components.project_svc_backend.api.build_tools import slim_asset
+
+
+def touch(path, content=''):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, 'w') as f:
+        f.write(content)
+
+
+def test_slim_asset_strips_bloat_and_keeps_runtime_files(tmp_path):
+    root = str(tmp_path)
+    touch(os.path.join(root, 'handler.py'), 'x = 1\n')
+    touch(os.path.join(root, 'pkg', '__init__.py'), 'y = 2\n')
+    touch(os.path.join(root, 'pkg', 'tests', 'test_pkg.py'))
+    touch(os.path.join(root, 'pkg', '__init__.pyi'))
+    touch(os.path.join(root, 'pkg', '__pycache__', '__init__.cpython-39.pyc'))
+    touch(os.path.join(root, 'pkg-1.0.dist-info', 'RECORD'))
+    touch(os.path.join(root, 'pkg-1.0.dist-info', 'METADATA'))
+    touch(os.path.join(root, 'bin', 'pkg'))
+
+    slim_asset.main([root])
+
+    assert os.path.exists(os.path.join(root, 'handler.py'))
+    assert os.path.exists(os.path.join(root, 'pkg-1.0.dist-info', 'METADATA'))
+    assert not os.path.exists(os.path.join(root, 'pkg', 'tests'))
+    assert not os.path.exists(os.path.join(root, 'pkg', '__init__.pyi'))
+    assert not os.path.exists(os.path.join(root, 'pkg', '__pycache__', '__init__.cpython-39.pyc'))
+    assert not os.path.exists(os.path.join(root, 'pkg-1.0.dist-info', 'RECORD'))
+    assert not os.path.exists(os.path.join(root, 'bin'))
+    assert os.listdir(os.path.join(root, 'pkg', '__pycache__'))
+
+
+def test_cache_key_tracks_requirements_and_architecture(tmp_path):
+    requirements = tmp_path / 'requirements.txt'
+    requirements.write_text('flask\n')
+
+    def key(architecture):
+        return CachedPythonBundling(
+            str(tmp_path),
+            runtime=lambda_.Runtime.PYTHON_3_13,
+            architecture=architecture,
+            cache_dir=str(tmp_path / 'cache'),
+        ).cache_key()
+
+    x86_key = key(lambda_.Architecture.X86_64)
+    assert x86_key == key(lambda_.Architecture.X86_64)
+    assert x86_key != key(lambda_.Architecture.ARM_64)
+
+    requirements.write_text('flask\nrequests\n')
+    assert x86_key != key(lambda_.Architecture.X86_64)
+
+
+def test_shared_dirs_are_copied_first_and_provide_the_requirements(tmp_path):
+    shared, service = tmp_path / 'shared', tmp_path / 'service'
+    touch(str(shared / 'requirements.txt'), 'flask\n')
+    touch(str(shared / 'adapter.py'), 'shared = True\n')
+    touch(str(shared / 'handler.py'), 'x = 1\n')
+    touch(str(service / 'handler.py'), 'x = 2\n')
+
+    bundling = CachedPythonBundling(
+        str(service),
+        runtime=lambda_.Runtime.PYTHON_3_13,
+        architecture=lambda_.Architecture.X86_64,
+        shared_dirs=[str(shared)],
+        cache_dir=str(tmp_path / 'cache'),
+    )
+    assert bundling.requirements_path == str(shared / 'requirements.txt')
+
+    output = tmp_path / 'output'
+    bundling._cached_dependencies = lambda: str(tmp_path / 'empty')
+    (tmp_path / 'empty').mkdir()
+    bundling.runtime_python = lambda: None
+    assert bundling.try_bundle(str(output), None)
+    assert (output / 'adapter.py').read_text() == 'shared = True\n'
+    assert (output / 'handler.py').read_text() == 'x = 2\n'
+
+
+def test_source_hash_covers_every_directory(tmp_path):
+    shared, service = tmp_path / 'shared', tmp_path / 'service'
+    touch(str(shared / 'adapter.py'), 'a = 1\n')
+    touch(str(service / 'goals.py'), 'g = 1\n')
+
+    before = source_hash(str(shared), str(service))
+    touch(str(shared / 'adapter.py'), 'a = 2\n')
+    assert source_hash(str(shared), str(service)) != before
+
+
+def test_import_budget_is_measured_on_the_entry_module(tmp_path):
+    touch(str(tmp_path / 'service' / 'goals.py'), 'g = 1\n')
+    (tmp_path / 'empty').mkdir()
+    bundling = CachedPythonBundling(
+        str(tmp_path / 'service'),
+        runtime=lambda_.Runtime.PYTHON_3_13,
+        architecture=lambda_.Architecture.X86_64,
+        entry_module='goals',
+        import_budget_ms=500,
+        cache_dir=str(tmp_path / 'cache'),
+    )
+    runs = []
+    bundling._cached_dependencies = lambda: str(tmp_path / 'empty')
+    bundling.runtime_python = lambda: 'python3.13'
+    bundling._host_matches_target = lambda: True
+    bundling._run = lambda *command: runs.append(command)
+
+    assert bundling.try_bundle(str(tmp_path / 'output'), None)
+    [report] = [command for command in runs if command[1].endswith('import_report.py')]
+    assert report[report.index('--module') + 1] == 'goals'
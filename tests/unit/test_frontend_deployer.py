@@ -0,0 +1,163 @@
+import io
+import time
+import zipfile
+
+import pytest
+
+import deployer
+
+
+@pytest.fixture
+def s3(monkeypatch):
+    moto = pytest.importorskip('moto')
+    import boto3
+
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    monkeypatch.setenv('AWS_ACCESS_KEY_ID', 'testing')
+    monkeypatch.setenv('AWS_SECRET_ACCESS_KEY', 'testing')
+    with moto.mock_aws():
+        client = boto3.client('s3')
+        client.create_bucket(Bucket='hosting')
+        yield client
+
+
+class FakeCloudFront:
+    def __init__(self):
+        self.invalidations = []
+
+    def create_invalidation(self, DistributionId, InvalidationBatch):
+        self.invalidations.append(InvalidationBatch['Paths']['Items'])
+
+
+def release(version, chunk):
+    return [
+        ('index.html', f'<script src="/assets/{chunk}"></script><!-- {version} -->'.encode()),
+        ('vite.svg', b'<svg/>'),
+        (f'assets/{chunk}', f'console.log({version!r})'.encode()),
+    ]
+
+
+def deploy(s3, cloudfront, files, release_id, **kwargs):
+    return deployer.deploy(
+        files, bucket='hosting', release_id=release_id, distribution_id='E123',
+        s3=s3, cloudfront=cloudfront, **kwargs,
+    )
+
+
+def keys(s3):
+    return sorted(obj['Key'] for obj in s3.list_objects_v2(Bucket='hosting').get('Contents', []))
+
+
+def test_metadata_per_file_class():
+    assert deployer.content_type('assets/index-1a2b.js') == 'text/javascript; charset=utf-8'
+    assert deployer.content_type('vite.svg') == 'image/svg+xml; charset=utf-8'
+    assert deployer.content_type('assets/logo-1a2b.png') == 'image/png'
+    assert deployer.cache_control('assets/index-1a2b.js', 60) == 'public, max-age=60, immutable'
+    assert deployer.cache_control('index.html') == 'no-cache'
+
+
+def test_uploads_only_changes_and_invalidates_changed_entry_points(s3):
+    cloudfront = FakeCloudFront()
+    first = deploy(s3, cloudfront, release('v1', 'index-aaa.js'), 'r1')
+    assert first['uploaded'] == ['assets/index-aaa.js', 'index.html', 'vite.svg']
+    assert cloudfront.invalidations == [['/*']]
+
+    head = s3.head_object(Bucket='hosting', Key='assets/index-aaa.js')
+    assert head['CacheControl'] == 'public, max-age=31536000, immutable'
+    assert head['ContentType'] == 'text/javascript; charset=utf-8'
+    assert s3.head_object(Bucket='hosting', Key='index.html')['CacheControl'] == 'no-cache'
+
+    second = deploy(s3, cloudfront, release('v2', 'index-bbb.js'), 'r2')
+    assert second['uploaded'] == ['assets/index-bbb.js', 'index.html']
+    assert second['removed'] == ['assets/index-aaa.js']
+    assert cloudfront.invalidations[-1] == ['/', '/index.html']
+
+    # nothing changed: nothing uploaded, nothing invalidated
+    third = deploy(s3, cloudfront, release('v2', 'index-bbb.js'), 'r3')
+    assert third['uploaded'] == [] and third['invalidated'] == []
+    assert len(cloudfront.invalidations) == 2
+
+
+def test_keeps_the_chunks_of_the_last_releases_only(s3):
+    cloudfront = FakeCloudFront()
+    s3.put_object(Bucket='hosting', Key='assets/left-by-an-old-deploy.js', Body=b'')
+
+    for version in range(1, 5):
+        deploy(s3, cloudfront, release(f'v{version}', f'index-{version}.js'), f'r{version}', keep=2)
+
+    assert keys(s3) == [
+        '.deploy/r3.json',
+        '.deploy/r4.json',
+        '.deploy/releases.json',
+        'assets/index-3.js',
+        'assets/index-4.js',
+        'index.html',
+        'vite.svg',
+    ]
+
+
+def test_custom_resource_reads_the_zipped_build(s3):
+    archive = io.BytesIO()
+    with zipfile.ZipFile(archive, 'w') as zf:
+        for path, data in release('v1', 'index-aaa.js'):
+            zf.writestr(path, data)
+    s3.create_bucket(Bucket='assets')
+    s3.put_object(Bucket='assets', Key='dist.zip', Body=archive.getvalue())
+
+    response = deployer.on_event({
+        'RequestType': 'Create',
+        'ResourceProperties': {
+            'SourceBucket': 'assets',
+            'SourceKey': 'dist.zip',
+            'DestinationBucket': 'hosting',
+            'ReleaseId': 'r1',
+            'KeepReleases': '3',
+            'AssetMaxAge': '31536000',
+        },
+    }, None)
+
+    assert response['Data']['Uploaded'] == 3
+    assert 'index.html' in keys(s3)
+    assert deployer.on_event({'RequestType': 'Delete', 'ResourceProperties': {'DestinationBucket': 'hosting'}}, None) == {
+        'PhysicalResourceId': response['PhysicalResourceId'],
+    }
+
+
+def test_precompressed_variants_keep_their_original_type(s3):
+    deploy(s3, FakeCloudFront(), [
+        ('index.html', b'<html/>'),
+        ('index.html.br', b'br bytes'),
+        ('assets/index-aaa.js.gz', b'gz bytes'),
+    ], 'r1')
+
+    br = s3.head_object(Bucket='hosting', Key='index.html.br')
+    assert (br['ContentType'], br['ContentEncoding'], br['CacheControl']) == ('text/html; charset=utf-8', 'br', 'no-cache')
+    gz = s3.head_object(Bucket='hosting', Key='assets/index-aaa.js.gz')
+    assert (gz['ContentType'], gz['ContentEncoding']) == ('text/javascript; charset=utf-8', 'gzip')
+    assert 'ContentEncoding' not in s3.head_object(Bucket='hosting', Key='index.html')
+
+
+def test_entry_points_go_live_after_every_chunk_they_reference(s3):
+    puts = []
+    real_put = s3.put_object
+
+    def put_object(**kwargs):
+        if deployer.is_hashed(kwargs['Key']):
+            # slow chunks: uploaded together with index.html they would finish last
+            time.sleep(0.05)
+        puts.append(kwargs['Key'])
+        return real_put(**kwargs)
+
+    s3.put_object = put_object
+    files = release('v1', 'index-aaa.js') + [
+        ('assets/index-aaa.js.br', b'br bytes'),
+        ('assets/index-aaa.js.gz', b'gz bytes'),
+        ('index.html.br', b'br bytes'),
+    ]
+    deploy(s3, FakeCloudFront(), files, 'r1')
+
+    site = [key for key in puts if not key.startswith(deployer.DEPLOY_PREFIX)]
+    hashed = [i for i, key in enumerate(site) if deployer.is_hashed(key)]
+    entry_points = [i for i, key in enumerate(site) if not deployer.is_hashed(key)]
+    assert len(hashed) == 3 and len(entry_points) == 3
+    assert max(hashed) < min(entry_points)
@@ -0,0 +1,121 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from app_components.frontend.hosting.infrastructure import HostedWebApp
+
+
+@pytest.fixture(scope='module')
+def dist(tmp_path_factory):
+    dist = tmp_path_factory.mktemp('dist')
+    (dist / 'assets').mkdir()
+    (dist / 'index.html').write_text('<script type="module" src="/assets/index-3f2a1b.js"></script>')
+    (dist / 'assets' / 'index-3f2a1b.js').write_text('console.log("app")')
+    return dist
+
+
+def synth(dist, **kwargs):
+    app = core.App()
+    stack = core.Stack(app, 'FrontEndHostingTest')
+    HostedWebApp(stack, 'Identity', dist_path=str(dist), **kwargs)
+    return assertions.Template.from_stack(stack)
+
+
+@pytest.fixture(scope='module')
+def template(dist):
+    return synth(dist)
+
+
+def custom_headers(template, policy_id):
+    policy = template.to_json()['Resources'][policy_id]['Properties']['ResponseHeadersPolicyConfig']
+    headers = {header['Header']: header for header in policy['CustomHeadersConfig']['Items']}
+    assert all(header['Override'] for header in headers.values())
+    return {name: header['Value'] for name, header in headers.items()}
+
+
+def cache_control(template, policy_id):
+    return custom_headers(template, policy_id)['Cache-Control']
+
+
+def test_hashed_assets_are_cached_for_a_year_and_immutable(template):
+    [config] = template.find_resources('AWS::CloudFront::Distribution').values()
+    config = config['Properties']['DistributionConfig']
+    [assets] = config['CacheBehaviors']
+    assert assets['PathPattern'] == '/assets/*'
+    assert assets['Compress']
+
+    policy = template.to_json()['Resources'][assets['CachePolicyId']['Ref']]['Properties']['CachePolicyConfig']
+    assert policy['MinTTL'] == policy['DefaultTTL'] == policy['MaxTTL'] == 365 * 24 * 3600
+    assert cache_control(template, assets['ResponseHeadersPolicyId']['Ref']) == 'public, max-age=31536000, immutable'
+
+
+def test_entry_points_are_revalidated(template):
+    [config] = template.find_resources('AWS::CloudFront::Distribution').values()
+    default = config['Properties']['DistributionConfig']['DefaultCacheBehavior']
+
+    policy = template.to_json()['Resources'][default['CachePolicyId']['Ref']]['Properties']['CachePolicyConfig']
+    assert policy['DefaultTTL'] == 0
+    assert policy['ParametersInCacheKeyAndForwardedToOrigin']['EnableAcceptEncodingBrotli']
+    assert cache_control(template, default['ResponseHeadersPolicyId']['Ref']) == 'no-cache'
+
+
+def test_deploys_are_incremental_releases(template):
+    template.resource_count_is('Custom::CDKBucketDeployment', 0)
+    template.has_resource_properties('AWS::Lambda::Function', {
+        'Handler': 'deployer.on_event',
+        'Runtime': 'python3.13',
+    })
+    template.has_resource_properties('Custom::IncrementalDeployment', {
+        'ReleaseId': assertions.Match.any_value(),
+        'DistributionId': assertions.Match.any_value(),
+        'KeepReleases': '3',
+        'AssetMaxAge': '31536000',
+    })
+
+
+def test_the_distribution_cannot_read_the_release_manifests(template):
+    [policy] = template.find_resources('AWS::S3::BucketPolicy').values()
+    [deny] = [st for st in policy['Properties']['PolicyDocument']['Statement'] if st['Effect'] == 'Deny'
+              and st['Principal'] == {'Service': 'cloudfront.amazonaws.com'}]
+    assert deny['Action'] == 's3:GetObject'
+    assert deny['Resource']['Fn::Join'][1][-1] == '/.deploy/*'
+
+
+def test_both_behaviors_serve_precompressed_variants(template):
+    [config] = template.find_resources('AWS::CloudFront::Distribution').values()
+    config = config['Properties']['DistributionConfig']
+    for behavior in [config['DefaultCacheBehavior'], *config['CacheBehaviors']]:
+        [association] = behavior['FunctionAssociations']
+        assert association['EventType'] == 'viewer-request'
+        # the variant served depends on Accept-Encoding, for caches past CloudFront too
+        assert custom_headers(template, behavior['ResponseHeadersPolicyId']['Ref'])['Vary'] == 'Accept-Encoding'
+    template.has_resource_properties('AWS::CloudFront::Function', {
+        'FunctionConfig': assertions.Match.object_like({'Runtime': 'cloudfront-js-2.0'}),
+    })
+
+
+def test_api_is_routed_through_the_distribution(dist):
+    template = synth(dist, api_domain_name='abc123.execute-api.us-east-1.amazonaws.com')
+    [config] = template.find_resources('AWS::CloudFront::Distribution').values()
+    config = config['Properties']['DistributionConfig']
+    api = next(b for b in config['CacheBehaviors'] if b['PathPattern'] == '/api/*')
+    assert 'FunctionAssociations' not in api
+    assert len(api['AllowedMethods']) == 7
+    assert api['CachedMethods'] == ['GET', 'HEAD']
+    # managed AllViewerExceptHostHeader
+    assert api['OriginRequestPolicyId'] == 'b689b0a8-53d0-40ab-baf2-68738e2966ac'
+
+    origin = next(o for o in config['Origins'] if o['Id'] == api['TargetOriginId'])
+    assert origin['DomainName'] == 'abc123.execute-api.us-east-1.amazonaws.com'
+    assert origin['CustomOriginConfig']['OriginProtocolPolicy'] == 'https-only'
+
+    policy = template.to_json()['Resources'][api['CachePolicyId']['Ref']]['Properties']['CachePolicyConfig']
+    key = policy['ParametersInCacheKeyAndForwardedToOrigin']
+    assert key['HeadersConfig'] == {'HeaderBehavior': 'whitelist', 'Headers': ['Authorization']}
+    assert key['QueryStringsConfig'] == {'QueryStringBehavior': 'all'}
+    assert policy['DefaultTTL'] == 0
+
+
+def test_api_behavior_is_optional(template):
+    [config] = template.find_resources('AWS::CloudFront::Distribution').values()
+    assert [b['PathPattern'] for b in config['Properties']['DistributionConfig']['CacheBehaviors']] == ['/assets/*']
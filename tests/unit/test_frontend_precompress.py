@@ -0,0 +1,70 @@
+import gzip
+import json
+import os
+import re
+import shutil
+import subprocess
+
+import pytest
+
+brotli = pytest.importorskip('brotli')
+
+from app_components.frontend.hosting.build_tools import precompress
+
+FUNCTION_PATH = os.path.join(
+    os.path.dirname(__file__),
+    '..', '..', 'app_components', 'frontend', 'hosting', 'functions', 'serve_precompressed.js',
+)
+
+
+def test_writes_max_level_variants_of_text_files_only(tmp_path, capsys):
+    script = b'export const routes = ' + b'["/", "/profiles"], ' * 200
+    (tmp_path / 'assets').mkdir()
+    (tmp_path / 'index.html').write_bytes(b'<!doctype html><div id="root"></div>')
+    (tmp_path / 'assets' / 'index-1a2b.js').write_bytes(script)
+    (tmp_path / 'assets' / 'logo-1a2b.png').write_bytes(b'\x89PNG')
+
+    precompress.main([str(tmp_path), '--report', str(tmp_path.parent / 'sizes.json')])
+
+    br = (tmp_path / 'assets' / 'index-1a2b.js.br').read_bytes()
+    gz = (tmp_path / 'assets' / 'index-1a2b.js.gz').read_bytes()
+    assert brotli.decompress(br) == gzip.decompress(gz) == script
+    assert (tmp_path / 'index.html.br').exists() and (tmp_path / 'index.html.gz').exists()
+    assert not (tmp_path / 'assets' / 'logo-1a2b.png.br').exists()
+
+    report = json.loads((tmp_path.parent / 'sizes.json').read_text())
+    assert report['assets/index-1a2b.js'] == {'original': len(script), 'br': len(br), 'gz': len(gz)}
+    assert len(br) < len(gz) < len(script)
+    assert 'assets/index-1a2b.js' in capsys.readouterr().out
+
+
+def test_gzip_variants_are_reproducible(tmp_path):
+    (tmp_path / 'app.css').write_text('body { margin: 0 }')
+    precompress.precompress(str(tmp_path))
+    first = (tmp_path / 'app.css.gz').read_bytes()
+    precompress.precompress(str(tmp_path))
+    assert (tmp_path / 'app.css.gz').read_bytes() == first
+
+
+def test_function_rewrites_the_same_extensions_the_build_compresses():
+    with open(FUNCTION_PATH) as f:
+        source = f.read()
+    extensions = re.search(r'COMPRESSIBLE = /\\\.\(([^)]*)\)', source).group(1).split('|')
+    assert sorted('.' + ext for ext in extensions) == sorted(precompress.COMPRESSIBLE_EXTENSIONS)
+
+
+@pytest.mark.skipif(shutil.which('node') is None, reason='node is not installed')
+@pytest.mark.parametrize('uri, accept_encoding, expected', [
+    ('/assets/index-1a2b.js', 'gzip, deflate, br, zstd', '/assets/index-1a2b.js.br'),
+    ('/assets/index-1a2b.js', 'gzip, br;q=0', '/assets/index-1a2b.js.gz'),
+    ('/assets/index-1a2b.js', 'identity', '/assets/index-1a2b.js'),
+    ('/assets/index-1a2b.js', None, '/assets/index-1a2b.js'),
+    ('/', 'br', '/index.html.br'),
+    ('/assets/logo-1a2b.png', 'br', '/assets/logo-1a2b.png'),
+])
+def test_function_picks_the_best_accepted_variant(uri, accept_encoding, expected):
+    headers = {'accept-encoding': {'value': accept_encoding}} if accept_encoding else {}
+    event = {'request': {'uri': uri, 'headers': headers}}
+    script = f'{open(FUNCTION_PATH).read()}\nconsole.log(handler({json.dumps(event)}).uri);'
+    result = subprocess.run(['node', '-e', script], capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == expected
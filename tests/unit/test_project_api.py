@@ -0,0 +1,318 @@
+import aws_cdk as core
+import aws_cdk.assertions as assertions
+import pytest
+
+from app_components.project_svc_backend.api.routes import load_app, routes
+from app_components.project_svc_backend.component import ProjectBackend
+
+
+def synth(**kwargs):
+    # skip asset bundling, the template is all these tests look at
+    app = core.App(context={'aws:cdk:bundling-stacks': []})
+    stack = ProjectBackend(app, 'ProjectSvcBackendTest', dynamodb_table_name='Projects', **kwargs)
+    return assertions.Template.from_stack(stack)
+
+
+@pytest.fixture(scope='module')
+def cached_template():
+    return synth(api_cache_cluster_size='0.5')
+
+
+def test_stage_cache_is_off_by_default():
+    template = synth()
+    template.has_resource_properties('AWS::ApiGateway::Stage', {
+        'CacheClusterEnabled': False,
+    })
+
+
+def test_stage_cache_cluster_and_method_settings(cached_template):
+    cached_template.has_resource_properties('AWS::ApiGateway::Stage', {
+        'StageName': 'api',
+        'CacheClusterEnabled': True,
+        'CacheClusterSize': '0.5',
+        'MethodSettings': assertions.Match.array_with([
+            assertions.Match.object_like({
+                'ResourcePath': '/~1profiles~1{profile_id}',
+                'HttpMethod': 'GET',
+                'CachingEnabled': True,
+                'CacheTtlInSeconds': 300,
+                'CacheDataEncrypted': True,
+            }),
+            assertions.Match.object_like({
+                'ResourcePath': '/~1profiles',
+                'HttpMethod': 'GET',
+                'CachingEnabled': True,
+                'CacheTtlInSeconds': 60,
+                'CacheDataEncrypted': True,
+            }),
+        ]),
+    })
+
+
+def test_cache_keys_are_declared_on_the_methods(cached_template):
+    # both routes need a token, so each caller gets entries of their own
+    cached_template.has_resource_properties('AWS::ApiGateway::Method', {
+        'HttpMethod': 'GET',
+        'RequestParameters': {
+            'method.request.path.profile_id': True,
+            'method.request.header.Authorization': False,
+        },
+        'Integration': assertions.Match.object_like({
+            'CacheKeyParameters': [
+                'method.request.path.profile_id',
+                'method.request.header.Authorization',
+            ],
+        }),
+    })
+    cached_template.has_resource_properties('AWS::ApiGateway::Method', {
+        'HttpMethod': 'GET',
+        'RequestParameters': {
+            'method.request.querystring.limit': False,
+            'method.request.querystring.cursor': False,
+            'method.request.header.Authorization': False,
+        },
+        'Integration': assertions.Match.object_like({
+            'CacheKeyParameters': [
+                'method.request.querystring.limit',
+                'method.request.querystring.cursor',
+                'method.request.header.Authorization',
+            ],
+        }),
+    })
+
+
+def test_function_can_flush_the_stage_cache(cached_template):
+    cached_template.has_resource_properties('AWS::IAM::Policy', {
+        'PolicyDocument': {
+            'Statement': assertions.Match.array_with([
+                assertions.Match.object_like({
+                    'Action': 'apigateway:DELETE',
+                    'Effect': 'Allow',
+                    'Resource': {'Fn::Join': ['', assertions.Match.array_with([
+                        assertions.Match.string_like_regexp('^:apigateway:'),
+                        assertions.Match.string_like_regexp('^/stages/api/cache/data$'),
+                    ])]},
+                }),
+            ]),
+        },
+    })
+    cached_template.has_resource_properties('AWS::Lambda::Function', {
+        'Environment': {
+            'Variables': assertions.Match.object_like({
+                'API_CACHE_REST_API_ID': {'Ref': assertions.Match.string_like_regexp('sampleapplayerapi')},
+                'API_CACHE_STAGE_NAME': 'api',
+            }),
+        },
+    })
+
+
+def test_api_invokes_the_live_alias():
+    template = synth()
+    template.has_resource_properties('AWS::Lambda::Alias', {'Name': 'live'})
+    permissions = template.find_resources('AWS::Lambda::Permission')
+    assert permissions
+    assert all('Alias' in str(p['Properties']['FunctionName']) for p in permissions.values())
+
+
+def test_snap_start_publishes_versions_and_imports_eagerly():
+    template = synth(snap_start=True)
+    template.has_resource_properties('AWS::Lambda::Function', {
+        'SnapStart': {'ApplyOn': 'PublishedVersions'},
+        'Environment': {
+            'Variables': assertions.Match.object_like({'LAZY_IMPORTS': 'false'}),
+        },
+    })
+    template.resource_count_is('AWS::Lambda::Version', 1)
+
+
+def test_provisioned_concurrency_autoscales_on_utilization():
+    template = synth(provisioned_concurrency=2, max_provisioned_concurrency=10)
+    template.has_resource_properties('AWS::Lambda::Alias', {
+        'ProvisionedConcurrencyConfig': {'ProvisionedConcurrentExecutions': 2},
+    })
+    template.has_resource_properties('AWS::ApplicationAutoScaling::ScalableTarget', {
+        'MinCapacity': 2,
+        'MaxCapacity': 10,
+        'ScalableDimension': 'lambda:function:ProvisionedConcurrency',
+    })
+    template.has_resource_properties('AWS::ApplicationAutoScaling::ScalingPolicy', {
+        'TargetTrackingScalingPolicyConfiguration': assertions.Match.object_like({
+            'TargetValue': 0.7,
+        }),
+    })
+
+
+def test_snap_start_and_provisioned_concurrency_are_exclusive():
+    with pytest.raises(ValueError):
+        synth(snap_start=True, provisioned_concurrency=1)
+
+
+def test_batch_get_resources_are_routed_to_the_alias():
+    template = synth()
+    resources = template.find_resources('AWS::ApiGateway::Resource')
+    batch_ids = {
+        logical_id for logical_id, r in resources.items()
+        if r['Properties']['PathPart'] in ('users:batchGet', 'profiles:batchGet')
+    }
+    assert len(batch_ids) == 2
+    methods = template.find_resources('AWS::ApiGateway::Method', {'Properties': {'HttpMethod': 'POST'}})
+    assert batch_ids <= {m['Properties']['ResourceId']['Ref'] for m in methods.values()}
+
+
+def test_importer_shares_the_runtime_asset_and_can_continue_itself():
+    template = synth()
+    functions = template.find_resources('AWS::Lambda::Function')
+    by_handler = {f['Properties']['Handler']: f['Properties'] for f in functions.values()}
+    assert by_handler['importer.main']['Code'] == by_handler['handler.main']['Code']
+    assert by_handler['importer.main']['Timeout'] == 900
+
+    template.has_resource_properties('AWS::IAM::Policy', {
+        'PolicyDocument': {
+            'Statement': assertions.Match.array_with([
+                assertions.Match.object_like({
+                    'Action': 'lambda:InvokeFunction',
+                    'Resource': {'Fn::Join': ['', assertions.Match.array_with([
+                        assertions.Match.string_like_regexp(':function:project-import-lambda$'),
+                    ])]},
+                }),
+            ]),
+        },
+    })
+
+
+def test_api_can_start_exports_and_sign_downloads():
+    template = synth()
+    functions = template.find_resources('AWS::Lambda::Function')
+    by_handler = {f['Properties']['Handler']: f['Properties'] for f in functions.values()}
+    api_env = by_handler['handler.main']['Environment']['Variables']
+    assert set(api_env) >= {'EXPORT_FUNCTION_NAME', 'EXPORT_BUCKET'}
+    assert by_handler['exporter.main']['Code'] == by_handler['handler.main']['Code']
+    template.has_resource_properties('AWS::Lambda::EventInvokeConfig', {
+        'FunctionName': {'Ref': assertions.Match.string_like_regexp('ExportLambda')},
+        'MaximumRetryAttempts': 0,
+    })
+
+    template.has_resource_properties('AWS::ApiGateway::Resource', {'PathPart': 'exports'})
+    template.has_resource_properties('AWS::S3::Bucket', {
+        'LifecycleConfiguration': {
+            'Rules': [assertions.Match.object_like({'ExpirationInDays': 7})],
+        },
+    })
+
+
+def test_rest_api_verifies_cognito_tokens_in_the_function():
+    template = synth(jwt_audience=['web-client', 'mobile-client'])
+    template.has_resource_properties('AWS::Lambda::Function', {
+        'FunctionName': 'api-svc-lambda-flask',
+        'Environment': {
+            'Variables': assertions.Match.object_like({
+                'COGNITO_USER_POOL_ID': {'Fn::ImportValue': 'CognitoUserPoolId'},
+                'COGNITO_APP_CLIENT_IDS': 'web-client,mobile-client',
+            }),
+        },
+    })
+
+
+def test_the_user_pool_is_configured_without_an_audience_too():
+    # the function fails closed without it
+    template = synth()
+    template.has_resource_properties('AWS::Lambda::Function', {
+        'FunctionName': 'api-svc-lambda-flask',
+        'Environment': {
+            'Variables': assertions.Match.object_like({
+                'COGNITO_USER_POOL_ID': {'Fn::ImportValue': 'CognitoUserPoolId'},
+                'COGNITO_APP_CLIENT_IDS': '',
+            }),
+        },
+    })
+
+
+def test_http_api_mode_proxies_everything_behind_the_jwt_authorizer():
+    template = synth(api_type='http', jwt_audience=['web-client'])
+    template.resource_count_is('AWS::ApiGateway::RestApi', 0)
+    template.has_resource_properties('AWS::ApiGatewayV2::Api', {'ProtocolType': 'HTTP'})
+    template.has_resource_properties('AWS::ApiGatewayV2::Integration', {
+        'PayloadFormatVersion': '2.0',
+        'IntegrationUri': {'Ref': assertions.Match.string_like_regexp('ApiSvcLiveAlias')},
+    })
+    template.has_resource_properties('AWS::ApiGatewayV2::Authorizer', {
+        'AuthorizerType': 'JWT',
+        'JwtConfiguration': {'Audience': ['web-client'], 'Issuer': assertions.Match.any_value()},
+    })
+    template.has_resource_properties('AWS::ApiGatewayV2::Route', {
+        'RouteKey': '$default',
+        'AuthorizationType': 'JWT',
+    })
+    template.has_resource_properties('AWS::ApiGatewayV2::Route', {
+        'RouteKey': 'GET /',
+        'AuthorizationType': 'NONE',
+    })
+    template.has_resource_properties('AWS::ApiGatewayV2::Stage', {'StageName': 'api', 'AutoDeploy': True})
+
+
+def test_http_api_mode_rejects_rest_only_options():
+    with pytest.raises(ValueError):
+        synth(api_type='http', api_cache_cluster_size='0.5')
+
+
+def test_rest_api_validates_requests_with_models_from_the_route_schemas(cached_template):
+    cached_template.has_resource_properties('AWS::ApiGateway::RequestValidator', {
+        'ValidateRequestBody': True,
+        'ValidateRequestParameters': True,
+    })
+    cached_template.has_resource_properties('AWS::ApiGateway::Model', {
+        'Name': 'BatchGetRequest',
+        'ContentType': 'application/json',
+        'Schema': assertions.Match.object_like({
+            '$schema': 'http://json-schema.org/draft-04/schema#',
+            'required': ['ids'],
+            'properties': {'ids': {'type': 'array', 'maxItems': 500, 'items': {'type': 'string', 'minLength': 1}}},
+        }),
+    })
+    cached_template.has_resource_properties('AWS::ApiGateway::Method', {
+        'HttpMethod': 'POST',
+        'RequestModels': {'application/json': {'Ref': assertions.Match.string_like_regexp('BatchGetRequestModel')}},
+        'RequestValidatorId': {'Ref': assertions.Match.string_like_regexp('BodyAndParametersValidator')},
+        'MethodResponses': [assertions.Match.object_like({'StatusCode': '200'})],
+    })
+    cached_template.has_resource_properties('AWS::Lambda::Function', {
+        'Environment': {'Variables': assertions.Match.object_like({'VALIDATED_AT_GATEWAY': 'true'})},
+    })
+
+
+def test_http_api_mode_leaves_validation_to_the_function():
+    template = synth(api_type='http')
+    template.resource_count_is('AWS::ApiGateway::RequestValidator', 0)
+    for function in template.find_resources('AWS::Lambda::Function').values():
+        assert 'VALIDATED_AT_GATEWAY' not in function['Properties'].get('Environment', {}).get('Variables', {})
+
+
+def test_rest_api_resources_are_generated_from_the_flask_routes():
+    template = synth()
+    resources = template.find_resources('AWS::ApiGateway::Resource')
+    paths = {}
+
+    def path(logical_id):
+        if logical_id not in paths:
+            properties = resources[logical_id]['Properties']
+            parent = properties['ParentId']
+            prefix = path(parent['Ref']) if 'Ref' in parent else ''
+            paths[logical_id] = f"{prefix}/{properties['PathPart']}"
+        return paths[logical_id]
+
+    served = set()
+    for method in template.find_resources('AWS::ApiGateway::Method').values():
+        resource_id = method['Properties']['ResourceId']
+        served.add((method['Properties']['HttpMethod'], path(resource_id['Ref']) if 'Ref' in resource_id else '/'))
+
+    flask_routes = {(route.method, route.path) for route in routes(load_app())}
+    assert served == flask_routes
+    assert ('PUT', '/users/{user_id}') in served
+    # every method shares one invoke permission
+    template.resource_count_is('AWS::Lambda::Permission', 1)
+
+
+def test_rest_api_routes_know_which_views_need_a_token():
+    by_key = {(route.method, route.path): route for route in routes(load_app())}
+    assert not by_key[('GET', '/')].authenticated
+    assert by_key[('GET', '/profiles/{profile_id}')].authenticated
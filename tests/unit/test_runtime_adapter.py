@@ -0,0 +1,230 @@
+import base64
+import gzip
+import json
+
+import pytest
+from flask import Flask, Response, request
+
+import adapter
+import compression
+import handler
+
+
+def make_event(path, method='GET', **overrides):
+    event = {
+        'path': path,
+        'httpMethod': method,
+        'headers': {'Host': 'api.example.com'},
+        'multiValueHeaders': {'Host': ['api.example.com']},
+        'queryStringParameters': None,
+        'multiValueQueryStringParameters': None,
+        'pathParameters': None,
+        'body': None,
+        'isBase64Encoded': False,
+        'requestContext': {'identity': {'sourceIp': '203.0.113.9'}},
+    }
+    event.update(overrides)
+    return event
+
+
+echo_app = Flask('echo')
+
+
+@echo_app.route('/echo', methods=['GET', 'POST'])
+def echo():
+    return {
+        'tags': request.args.getlist('tag'),
+        'accept': request.headers.get('Accept'),
+        'cookies': dict(request.cookies),
+        'body': request.get_data(as_text=True),
+        'remote_addr': request.remote_addr,
+    }
+
+
+@echo_app.route('/binary')
+def binary():
+    response = Response(b'\x89PNG\x00\xff', mimetype='image/png')
+    response.headers.add('Set-Cookie', 'a=1')
+    response.headers.add('Set-Cookie', 'b=2')
+    return response
+
+
+def test_handler_routes_through_adapter():
+    response = handler.main(make_event('/'), None)
+    assert response['statusCode'] == 200
+    assert response['isBase64Encoded'] is False
+    assert json.loads(response['body'])['message'] == 'Hello Flask!'
+
+
+def test_multi_value_query_and_headers_are_preserved():
+    event = make_event(
+        '/echo',
+        multiValueQueryStringParameters={'tag': ['a b', 'c&d']},
+        multiValueHeaders={
+            'Accept': ['application/json', 'text/plain'],
+            'Cookie': ['x=1', 'y=2'],
+        },
+    )
+    response = adapter.handle(echo_app, event)
+    assert response['statusCode'] == 200
+    body = echo_app.json.loads(response['body'])
+    assert body['tags'] == ['a b', 'c&d']
+    assert body['accept'] == 'application/json, text/plain'
+    assert body['cookies'] == {'x': '1', 'y': '2'}
+    assert body['remote_addr'] == '203.0.113.9'
+
+
+def test_single_value_fields_are_used_without_multi_value_fields():
+    event = make_event(
+        '/echo',
+        multiValueHeaders=None,
+        headers={'Accept': 'text/html'},
+        queryStringParameters={'tag': 'only'},
+    )
+    body = echo_app.json.loads(adapter.handle(echo_app, event)['body'])
+    assert body['tags'] == ['only']
+    assert body['accept'] == 'text/html'
+
+
+def test_content_type_is_a_wsgi_string_like_every_other_header():
+    event = make_event('/echo', method='POST', multiValueHeaders={
+        'Content-Type': ['text/plain; name=café'],
+        'X-Name': ['café'],
+    })
+    environ = adapter.build_environ(event)
+    assert environ['CONTENT_TYPE'] == adapter._wsgi_str('text/plain; name=café')
+    assert environ['CONTENT_TYPE'].endswith(environ['HTTP_X_NAME'])
+
+
+def test_base64_request_body_is_decoded():
+    payload = 'héllo'.encode('utf-8')
+    event = make_event(
+        '/echo',
+        method='POST',
+        body=base64.b64encode(payload).decode('ascii'),
+        isBase64Encoded=True,
+    )
+    body = echo_app.json.loads(adapter.handle(echo_app, event)['body'])
+    assert body['body'] == 'héllo'
+
+
+def test_binary_response_is_base64_encoded_with_multi_value_headers():
+    response = adapter.handle(echo_app, make_event('/binary'))
+    assert response['isBase64Encoded'] is True
+    assert base64.b64decode(response['body']) == b'\x89PNG\x00\xff'
+    assert response['multiValueHeaders']['Set-Cookie'] == ['a=1', 'b=2']
+
+
+def test_undecodable_body_without_a_content_type_is_base64_encoded():
+    def raw_app(environ, start_response):
+        start_response('200 OK', [])
+        return [b'\xff\xfe raw']
+
+    response = adapter.handle(raw_app, make_event('/raw'))
+    assert response['statusCode'] == 200
+    assert response['isBase64Encoded'] is True
+    assert base64.b64decode(response['body']) == b'\xff\xfe raw'
+
+
+@echo_app.route('/large')
+def large():
+    return {'items': [{'id': i, 'name': f'item {i}'} for i in range(200)]}
+
+
+def test_large_json_is_compressed_for_clients_that_accept_it():
+    event = make_event('/large', multiValueHeaders={'Accept-Encoding': ['gzip, deflate']})
+    response = adapter.handle(echo_app, event)
+    assert response['isBase64Encoded'] is True
+    assert response['multiValueHeaders']['Content-Encoding'] == ['gzip']
+    assert response['multiValueHeaders']['Vary'] == ['Accept-Encoding']
+    body = gzip.decompress(base64.b64decode(response['body']))
+    assert len(echo_app.json.loads(body)['items']) == 200
+    assert response['multiValueHeaders']['Content-Length'] == [
+        str(len(base64.b64decode(response['body'])))
+    ]
+
+
+def test_small_or_unaccepted_bodies_stay_plain_but_vary():
+    response = adapter.handle(echo_app, make_event('/large'))
+    assert response['isBase64Encoded'] is False
+    assert 'Content-Encoding' not in response['multiValueHeaders']
+    assert response['multiValueHeaders']['Vary'] == ['Accept-Encoding']
+
+    event = make_event('/echo', multiValueHeaders={'Accept-Encoding': ['gzip']})
+    assert adapter.handle(echo_app, event)['isBase64Encoded'] is False
+
+
+def test_negotiation_honours_q_values():
+    assert compression.negotiate('gzip;q=0.5, br') == ('br' if compression.brotli else 'gzip')
+    assert compression.negotiate('br;q=0, gzip') == 'gzip'
+    assert compression.negotiate('identity') is None
+    assert compression.negotiate('*') == compression.SUPPORTED[0]
+
+
+def make_v2_event(path, method='GET', query='', headers=None, cookies=None, body=None, stage='$default'):
+    raw_path = path if stage == '$default' else f'/{stage}{path}'
+    return {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': raw_path,
+        'rawQueryString': query,
+        'cookies': cookies,
+        'headers': {'host': 'api.example.com', **(headers or {})},
+        'body': body,
+        'isBase64Encoded': False,
+        'requestContext': {
+            'stage': stage,
+            'http': {'method': method, 'path': raw_path, 'protocol': 'HTTP/1.1', 'sourceIp': '203.0.113.9'},
+        },
+    }
+
+
+PARITY_CASES = [
+    (
+        make_event(
+            '/echo',
+            multiValueQueryStringParameters={'tag': ['a b', 'c&d']},
+            multiValueHeaders={'Accept': ['application/json'], 'Cookie': ['x=1', 'y=2']},
+        ),
+        make_v2_event(
+            '/echo', query='tag=a%20b&tag=c%26d',
+            headers={'accept': 'application/json'}, cookies=['x=1', 'y=2'],
+        ),
+    ),
+    (
+        make_event('/echo', method='POST', body='{"a": 1}'),
+        make_v2_event('/echo', method='POST', body='{"a": 1}', stage='api'),
+    ),
+    (
+        make_event('/large', multiValueHeaders={'Accept-Encoding': ['gzip']}),
+        make_v2_event('/large', headers={'accept-encoding': 'gzip'}),
+    ),
+]
+
+
+@pytest.mark.parametrize('v1_event, v2_event', PARITY_CASES)
+def test_v1_and_v2_events_get_the_same_response(v1_event, v2_event):
+    v1 = adapter.handle(echo_app, v1_event)
+    v2 = adapter.handle(echo_app, v2_event)
+
+    assert 'multiValueHeaders' not in v2
+    assert v2['statusCode'] == v1['statusCode']
+    assert v2['isBase64Encoded'] == v1['isBase64Encoded']
+    assert v2['body'] == v1['body']
+    v1_headers = {k: ', '.join(v) for k, v in v1['multiValueHeaders'].items() if k != 'Server-Timing'}
+    assert {k: v for k, v in v2['headers'].items() if k != 'Server-Timing'} == v1_headers
+
+
+def test_v2_set_cookie_headers_move_to_cookies():
+    response = adapter.handle(echo_app, make_v2_event('/binary'))
+    assert response['cookies'] == ['a=1', 'b=2']
+    assert 'Set-Cookie' not in response['headers']
+
+
+@pytest.mark.parametrize('path', ['/', '/users', '/profiles/missing'])
+def test_handler_answers_v1_and_v2_alike(path, monkeypatch, signed_in):
+    monkeypatch.setattr(handler.repository, 'list', lambda entity, **kw: ([], None))
+    monkeypatch.setattr(handler, 'read_item', lambda entity, entity_id: None)
+    v1 = handler.main(make_event(path, multiValueHeaders={key: [value] for key, value in signed_in.items()}), None)
+    v2 = handler.main(make_v2_event(path, headers=signed_in, stage='api'), None)
+    assert (v2['statusCode'], v2['body']) == (v1['statusCode'], v1['body'])
@@ -0,0 +1,237 @@
+import json
+import time
+
+import pytest
+
+jwt = pytest.importorskip('jwt')
+rsa = pytest.importorskip('cryptography.hazmat.primitives.asymmetric.rsa')
+
+import auth
+import handler
+import repository
+from repository import Repository
+
+ISSUER = auth.issuer_for('us-east-1_test', 'us-east-1')
+CLIENT_ID = 'web-client'
+
+
+def new_key(kid):
+    private_key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    jwk = json.loads(jwt.algorithms.RSAAlgorithm.to_jwk(private_key.public_key()))
+    return private_key, {**jwk, 'kid': kid, 'alg': 'RS256', 'use': 'sig'}
+
+
+@pytest.fixture(scope='module')
+def keys():
+    return dict(first=new_key('first'), second=new_key('second'))
+
+
+class StubJWKS:
+    """Stands in for the pool's jwks.json endpoint."""
+
+    def __init__(self, *jwks):
+        self.keys = list(jwks)
+        self.requests = []
+
+    def __call__(self, url):
+        self.requests.append(url)
+        return {'keys': list(self.keys)}
+
+
+def token(private_key, kid='first', **claims):
+    claims = {
+        'iss': ISSUER,
+        'sub': 'user-1',
+        'token_use': 'id',
+        'aud': CLIENT_ID,
+        'exp': int(time.time()) + 3600,
+        **claims,
+    }
+    return jwt.encode(claims, private_key, algorithm='RS256', headers={'kid': kid})
+
+
+def make_verifier(endpoint, clock=time.monotonic):
+    jwks = auth.JWKSCache(f'{ISSUER}/.well-known/jwks.json', fetch=endpoint, clock=clock)
+    return auth.TokenVerifier(ISSUER, [CLIENT_ID], jwks=jwks)
+
+
+def test_verifies_id_and_access_tokens(keys):
+    private_key, jwk = keys['first']
+    endpoint = StubJWKS(jwk)
+    verifier = make_verifier(endpoint)
+
+    assert verifier.verify(token(private_key))['sub'] == 'user-1'
+    access = token(private_key, token_use='access', aud=None, client_id=CLIENT_ID, scope='profile')
+    assert verifier.verify(access)['scope'] == 'profile'
+    assert endpoint.requests == [f'{ISSUER}/.well-known/jwks.json']
+
+
+@pytest.mark.parametrize('claims', [
+    {'aud': 'another-client'},
+    {'iss': auth.issuer_for('us-east-1_other', 'us-east-1')},
+    {'exp': int(time.time()) - 60},
+    {'token_use': 'refresh'},
+])
+def test_rejects_tokens_that_are_not_for_this_pool_and_client(keys, claims):
+    private_key, jwk = keys['first']
+    verifier = make_verifier(StubJWKS(jwk))
+
+    with pytest.raises(auth.AuthError):
+        verifier.verify(token(private_key, **claims))
+
+
+def test_rejects_every_token_when_no_app_client_is_configured(keys):
+    private_key, jwk = keys['first']
+    jwks = auth.JWKSCache(f'{ISSUER}/.well-known/jwks.json', fetch=StubJWKS(jwk))
+    verifier = auth.TokenVerifier(ISSUER, [], jwks=jwks)
+
+    with pytest.raises(auth.AuthError, match='no app client ids'):
+        verifier.verify(token(private_key))
+
+
+def test_rejects_a_token_signed_with_another_key(keys):
+    private_key, _ = keys['second']
+    _, jwk = keys['first']
+    verifier = make_verifier(StubJWKS(jwk))
+
+    with pytest.raises(auth.AuthError):
+        verifier.verify(token(private_key, kid='first'))
+
+
+def test_unknown_kid_refetches_the_jwks_at_most_once_a_minute(keys):
+    first_key, first_jwk = keys['first']
+    second_key, second_jwk = keys['second']
+    endpoint = StubJWKS(first_jwk)
+    now = [0.0]
+    verifier = make_verifier(endpoint, clock=lambda: now[0])
+    verifier.verify(token(first_key))
+
+    # the pool rotates its signing key
+    endpoint.keys.append(second_jwk)
+    with pytest.raises(auth.AuthError):
+        verifier.verify(token(second_key, kid='second'))
+    assert len(endpoint.requests) == 1
+
+    now[0] += auth.JWKS_MIN_REFRESH_SECONDS
+    assert verifier.verify(token(second_key, kid='second'))['sub'] == 'user-1'
+    assert len(endpoint.requests) == 2
+
+    with pytest.raises(auth.AuthError):
+        verifier.verify(token(second_key, kid='forged'))
+    assert len(endpoint.requests) == 2
+
+
+def test_jwks_outages_are_503_until_a_key_set_was_fetched(keys):
+    private_key, jwk = keys['first']
+    second_key, _ = keys['second']
+    endpoint = StubJWKS(jwk)
+    down = [True]
+
+    def flaky(url):
+        if down[0]:
+            raise ConnectionError('jwks endpoint unreachable')
+        return endpoint(url)
+
+    now = [0.0]
+    verifier = make_verifier(flaky, clock=lambda: now[0])
+    with pytest.raises(auth.KeysUnavailableError):
+        verifier.verify(token(private_key))
+    # a failed fetch waits its turn too
+    down[0] = False
+    with pytest.raises(auth.KeysUnavailableError):
+        verifier.verify(token(private_key))
+    assert endpoint.requests == []
+
+    now[0] += auth.JWKS_MIN_REFRESH_SECONDS
+    assert verifier.verify(token(private_key))['sub'] == 'user-1'
+
+    # with a key set on hand, a failed refetch is an unknown key
+    down[0] = True
+    now[0] += auth.JWKS_MIN_REFRESH_SECONDS
+    with pytest.raises(auth.AuthError):
+        verifier.verify(token(second_key, kid='second'))
+
+
+def test_verified_claims_are_memoized_until_the_token_expires(keys, monkeypatch):
+    private_key, jwk = keys['first']
+    verifier = make_verifier(StubJWKS(jwk))
+    decoded = []
+    real_decode = verifier._decode
+    monkeypatch.setattr(verifier, '_decode', lambda t: decoded.append(t) or real_decode(t))
+    now = int(time.time())
+    tok = token(private_key, exp=now + 60)
+
+    assert verifier.verify(tok) == verifier.verify(tok)
+    assert len(decoded) == 1
+
+    # past the memoized expiry the signature is checked again
+    verifier.clock = lambda: now + 61
+    verifier.verify(tok)
+    assert len(decoded) == 2
+
+
+@pytest.fixture
+def protected(projects_table, monkeypatch, keys):
+    monkeypatch.setattr(repository, 'backoff', lambda attempt: None)
+    monkeypatch.setattr(handler, 'repository', Repository('Projects'))
+    monkeypatch.setattr(auth, 'verifier', make_verifier(StubJWKS(keys['first'][1])))
+
+
+def call(method, path, headers=None, **event):
+    response = handler.main({
+        'httpMethod': method,
+        'path': path,
+        'headers': headers or {},
+        'body': None,
+        **event,
+    }, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_profile_routes_require_a_valid_bearer_token(protected, keys):
+    private_key, _ = keys['first']
+
+    assert call('GET', '/profiles')[0] == 401
+    assert call('GET', '/profiles', {'Authorization': 'Bearer not-a-jwt'})[0] == 401
+    status, body = call('GET', '/profiles', {'Authorization': f'Bearer {token(private_key)}'})
+    assert status == 200 and body['profiles'] == []
+    # routes outside /profiles stay public
+    assert call('GET', '/')[0] == 200
+
+
+def test_protected_routes_fail_closed_without_a_user_pool(projects_table, monkeypatch):
+    monkeypatch.setattr(handler, 'repository', Repository('Projects'))
+    monkeypatch.setattr(auth, 'verifier', None)
+
+    status, body = call('GET', '/profiles', {'Authorization': 'Bearer anything'})
+    assert status == 401 and body['error'] == 'token verification is not configured'
+    assert call('GET', '/')[0] == 200
+
+
+def test_a_jwks_outage_is_answered_with_503(protected, keys, monkeypatch):
+    private_key, _ = keys['first']
+
+    def unreachable(url):
+        raise ConnectionError('jwks endpoint unreachable')
+
+    monkeypatch.setattr(auth, 'verifier', make_verifier(unreachable))
+    status, body = call('GET', '/profiles', {'Authorization': f'Bearer {token(private_key)}'})
+    assert status == 503 and 'could not fetch signing keys' in body['error']
+
+
+def test_claims_verified_by_the_http_api_authorizer_are_trusted(protected):
+    event = {
+        'version': '2.0',
+        'routeKey': '$default',
+        'rawPath': '/profiles',
+        'rawQueryString': '',
+        'headers': {},
+        'requestContext': {
+            'http': {'method': 'GET', 'path': '/profiles', 'sourceIp': '127.0.0.1'},
+            'stage': '$default',
+            'authorizer': {'jwt': {'claims': {'sub': 'user-1'}, 'scopes': None}},
+        },
+        'isBase64Encoded': False,
+    }
+    response = handler.main(event, None)
+    assert response['statusCode'] == 200
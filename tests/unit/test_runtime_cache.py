@@ -0,0 +1,51 @@
+from cache import MISSING, TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_entries_expire_after_ttl_even_when_hit():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=10, ttl=30, clock=clock)
+    cache.set('k', 'v')
+    clock.now = 29
+    assert cache.get('k') == 'v'
+    clock.now = 30
+    assert cache.get('k') is MISSING
+    assert cache.stats()['expirations'] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2, ttl=30)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    assert cache.get('b') is MISSING
+    assert cache.get('a') == 1
+    assert cache.stats()['evictions'] == 1
+
+
+def test_misses_are_cached_for_the_negative_ttl():
+    clock = FakeClock()
+    cache = TTLCache(ttl=30, negative_ttl=5, clock=clock)
+    loads = []
+    load = lambda: loads.append(1)
+
+    assert cache.get_or_load('gone', load) is None
+    assert cache.get_or_load('gone', load) is None
+    assert len(loads) == 1
+    clock.now = 5
+    cache.get_or_load('gone', load)
+    assert len(loads) == 2
+
+
+def test_zero_ttl_disables_caching():
+    cache = TTLCache(ttl=0)
+    cache.set('k', 'v')
+    assert cache.get('k') is MISSING
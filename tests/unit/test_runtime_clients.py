@@ -0,0 +1,153 @@
+import http.server
+import io
+import json
+import threading
+
+import pytest
+
+import clients
+import metrics
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture(autouse=True)
+def fresh_clients():
+    clients.reset()
+    yield
+    clients.reset()
+
+
+@pytest.fixture
+def server():
+    """A keep-alive HTTP server answering with the statuses queued in ``replies``."""
+    replies = []
+    seen = []
+
+    class Handler(http.server.BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            seen.append(self.path)
+            status = replies.pop(0) if replies else 200
+            body = json.dumps({'status': status}).encode()
+            self.send_response(status)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{httpd.server_port}', replies, seen
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def test_aws_clients_are_shared_and_tuned(projects_table):
+    config = clients.aws_config(pool_size=32)
+    assert config.max_pool_connections == 32
+    assert config.tcp_keepalive is True
+    assert config.retries == {'mode': 'adaptive', 'max_attempts': clients.AWS_MAX_ATTEMPTS}
+    assert (config.connect_timeout, config.read_timeout) == (clients.AWS_CONNECT_TIMEOUT, clients.AWS_READ_TIMEOUT)
+    assert clients.aws_config().max_pool_connections == clients.MAX_POOL_CONNECTIONS
+
+    s3 = clients.client('s3')
+    assert clients.client('s3') is s3
+    assert clients.client('s3', pool_size=32) is not s3
+    assert clients.client('s3', pool_size=32).meta.config.max_pool_connections == 32
+
+
+def test_breaker_opens_after_repeated_failures_and_probes_once():
+    clock = Clock()
+    breaker = clients.CircuitBreaker(failure_threshold=3, reset_timeout=10, clock=clock)
+    for _ in range(2):
+        breaker.failure()
+    assert breaker.allow()
+    breaker.failure()
+    assert breaker.state == 'open' and not breaker.allow()
+
+    clock.now = 10
+    assert breaker.state == 'half-open'
+    assert breaker.allow() and not breaker.allow()
+    # the trial failed: open again for another reset_timeout
+    breaker.failure()
+    assert breaker.state == 'open'
+
+    clock.now = 20
+    assert breaker.allow()
+    breaker.success()
+    assert breaker.state == 'closed' and breaker.failures == 0
+
+
+def test_a_trial_call_that_never_reaches_the_host_does_not_keep_the_circuit_open(server):
+    url, replies, seen = server
+    clock = Clock()
+    http = clients.HttpClient(
+        retries=0, breaker_factory=lambda: clients.CircuitBreaker(failure_threshold=1, reset_timeout=10, clock=clock)
+    )
+    replies.append(500)
+    assert http.get(f'{url}/a').status_code == 500
+
+    clock.now = 10
+    # the deadline ran out before the trial
+    with pytest.raises(ValueError):
+        http.get(f'{url}/a', timeout=-1)
+    assert http.get(f'{url}/a').status_code == 200
+    assert http.breaker(url.split('//', 1)[1]).state == 'closed'
+
+
+def test_http_client_reuses_connections(server):
+    url, _, seen = server
+
+    for _ in range(3):
+        assert clients.http.get(f'{url}/ping').ok
+
+    assert len(seen) == 3
+    assert clients.take_connection_counts() == (1, 2)
+    assert clients.take_connection_counts() == (0, 0)
+
+
+def test_http_client_retries_unavailable_responses(server):
+    url, replies, seen = server
+    replies.extend([503, 503])
+
+    assert clients.http.get(f'{url}/flaky').status_code == 200
+    assert seen == ['/flaky'] * 3
+
+
+def test_http_client_fails_fast_once_the_circuit_is_open(server):
+    url, replies, seen = server
+    http = clients.HttpClient(retries=0, breaker_factory=lambda: clients.CircuitBreaker(failure_threshold=2))
+    replies.extend([500, 500])
+
+    assert http.get(f'{url}/a').status_code == 500
+    assert http.get(f'{url}/a').status_code == 500
+    with pytest.raises(clients.CircuitOpenError):
+        http.get(f'{url}/a')
+    assert len(seen) == 2
+
+
+def test_request_metrics_count_new_and_reused_connections(server, monkeypatch):
+    url, _, _ = server
+    stream = io.StringIO()
+    monkeypatch.setattr(metrics, 'stream', stream)
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    clients.http.get(url)
+    clients.http.get(url)
+
+    entry = metrics.record(metrics.RequestTimer(), 'GET', 200, 0)
+
+    assert (entry['NewConnections'], entry['ReusedConnections']) == (1, 1)
+    names = [m['Name'] for m in entry['_aws']['CloudWatchMetrics'][0]['Metrics']]
+    assert 'NewConnections' in names and 'ReusedConnections' in names
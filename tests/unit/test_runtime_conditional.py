@@ -0,0 +1,74 @@
+import pytest
+
+import handler
+from repository import Repository
+
+
+@pytest.fixture
+def repo(projects_table, signed_in, monkeypatch):
+    repo = Repository('Projects')
+    repo.write_listeners.append(handler.invalidate_item)
+    monkeypatch.setattr(handler, 'repository', repo)
+    handler.item_cache.clear()
+    return repo
+
+
+def get(path, **headers):
+    event = {
+        'httpMethod': 'GET',
+        'path': path,
+        'headers': {'Authorization': 'Bearer user-1', **headers},
+        'body': None,
+        'isBase64Encoded': False,
+    }
+    response = handler.main(event, None)
+    headers = {k: v[-1] for k, v in response['multiValueHeaders'].items()}
+    return response['statusCode'], headers, response['body']
+
+
+def test_item_etag_follows_the_version(repo):
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    status, headers, _ = get('/profiles/p1')
+    etag = headers['ETag']
+    assert status == 200 and headers['Last-Modified']
+
+    status, headers, body = get('/profiles/p1', **{'If-None-Match': etag})
+    assert status == 304 and body == ''
+    assert headers['ETag'] == etag
+
+    repo.put('profile', 'p1', {'name': 'Ada L.'})
+    status, headers, _ = get('/profiles/p1', **{'If-None-Match': etag})
+    assert status == 200 and headers['ETag'] != etag
+
+
+def test_list_etag_changes_when_membership_changes(repo):
+    repo.put('user', 'u1', {'name': 'Grace'})
+    _, headers, _ = get('/users')
+    etag = headers['ETag']
+    assert get('/users', **{'If-None-Match': etag})[0] == 304
+
+    repo.put('user', 'u2', {'name': 'Linus'})
+    assert get('/users', **{'If-None-Match': etag})[0] == 200
+
+
+def test_compressed_etag_is_accepted_back(repo):
+    for i in range(40):
+        repo.put('user', f'u{i}', {'name': f'User {i}', 'bio': 'x' * 50})
+    _, headers, _ = get('/users', **{'Accept-Encoding': 'gzip'})
+    assert headers['Content-Encoding'] == 'gzip'
+    assert headers['ETag'].endswith('-gzip"')
+    assert get('/users', **{'If-None-Match': headers['ETag']})[0] == 304
+
+
+def test_if_modified_since_is_used_without_if_none_match(repo):
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    _, headers, _ = get('/profiles/p1')
+    since = headers['Last-Modified']
+    assert get('/profiles/p1', **{'If-Modified-Since': since})[0] == 304
+    assert get('/profiles/p1', **{'If-Modified-Since': 'Mon, 01 Jan 2001 00:00:00 GMT'})[0] == 200
+
+
+def test_other_get_routes_get_a_content_hash_etag(repo):
+    status, headers, _ = get('/')
+    assert status == 200
+    assert get('/', **{'If-None-Match': headers['ETag']})[0] == 304
@@ -0,0 +1,254 @@
+import json
+import threading
+
+import boto3
+import pytest
+
+import fanout
+import goals
+import handler
+import repository
+from repository import Repository
+
+
+@pytest.fixture
+def repo(projects_table, signed_in, monkeypatch):
+    monkeypatch.setattr(repository, 'backoff', lambda attempt: None)
+    repo = Repository('Projects')
+    repo.write_listeners.append(handler.invalidate_item)
+    monkeypatch.setattr(handler, 'repository', repo)
+    handler.item_cache.clear()
+    return repo
+
+
+@pytest.fixture
+def goal_repo(projects_table, signed_in, monkeypatch):
+    boto3.resource('dynamodb').create_table(
+        TableName='Goals',
+        KeySchema=[
+            {'AttributeName': 'pk', 'KeyType': 'HASH'},
+            {'AttributeName': 'sk', 'KeyType': 'RANGE'},
+        ],
+        AttributeDefinitions=[
+            {'AttributeName': 'pk', 'AttributeType': 'S'},
+            {'AttributeName': 'sk', 'AttributeType': 'S'},
+        ],
+        BillingMode='PAY_PER_REQUEST',
+    )
+    goal_repo = goals.GoalRepository('Goals')
+    monkeypatch.setattr(goals, 'repository', goal_repo)
+    return goal_repo
+
+
+def call(module, method, path, body=None, headers=None):
+    event = {
+        'httpMethod': method,
+        'path': path,
+        'headers': {'Content-Type': 'application/json', 'Authorization': 'Bearer p1', **(headers or {})},
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+    }
+    response = module.main(event, None)
+    headers = {name: values[-1] for name, values in response['multiValueHeaders'].items()}
+    return response['statusCode'], json.loads(response['body'] or 'null'), headers
+
+
+def test_projects_live_in_the_profile_partition_and_list_as_summaries(repo):
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    repo.put_project('p1', 'x1', {'name': 'Engine', 'status': 'active', 'notes': 'long text'})
+    repo.put_project('p2', 'x2', {'name': 'Other profile'})
+
+    projects, cursor = repo.list_projects('p1')
+    assert cursor is None
+    assert projects == [{'id': 'x1', 'name': 'Engine', 'status': 'active', 'updated_at': projects[0]['updated_at']}]
+    assert repo.list_projects('p1', summary=False)[0][0]['notes'] == 'long text'
+    # not listed as a profile, and the profile item is untouched
+    assert [p['id'] for p in repo.list('profile')[0]] == ['p1']
+
+    status, body, _ = call(handler, 'PUT', '/profiles/p1/projects/x3', {'name': 'Docs', 'profile_id': 'p9'})
+    assert status == 200 and body['profile_id'] == 'p1' and body['version'] == 1
+    status, body, _ = call(handler, 'GET', '/profiles/p1/projects')
+    assert [p['id'] for p in body['projects']] == ['x1', 'x3']
+
+
+def test_goals_service_routes(goal_repo):
+    status, body, _ = call(goals, 'PUT', '/profiles/p1/goals/g1', {'title': 'Ship it'})
+    assert status == 200 and body['version'] == 1 and 'pk' not in body
+    call(goals, 'PUT', '/profiles/p1/goals/g2', {'title': 'Rest'})
+    call(goals, 'PUT', '/profiles/p2/goals/g3', {'title': 'Not p1'}, headers={'Authorization': 'Bearer p2'})
+
+    status, body, _ = call(goals, 'GET', '/profiles/p1/goals')
+    assert status == 200 and [g['title'] for g in body['goals']] == ['Ship it', 'Rest']
+
+    assert call(goals, 'DELETE', '/profiles/p1/goals/g2')[0] == 204
+    assert [g['id'] for g in call(goals, 'GET', '/profiles/p1/goals')[1]['goals']] == ['g1']
+    assert call(goals, 'PUT', '/profiles/p1/goals/g1')[0] == 400
+
+
+def test_goal_bodies_are_objects_and_may_hold_floats(goal_repo):
+    assert call(goals, 'PUT', '/profiles/p1/goals/g1', ['not', 'an', 'object'])[0] == 400
+
+    status, body, _ = call(goals, 'PUT', '/profiles/p1/goals/g1', {'title': 'Run', 'target_km': 42.195})
+    assert status == 200 and body['target_km'] == 42.195
+
+
+def test_dashboard_gathers_every_section(repo, monkeypatch):
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    repo.put_project('p1', 'x1', {'name': 'Engine', 'status': 'active'})
+    seen = []
+
+    def fetch_goals(profile_id, authorization, deadline):
+        seen.append((profile_id, authorization, threading.current_thread().name))
+        return [{'id': 'g1', 'title': 'Ship it'}]
+
+    monkeypatch.setattr(handler, 'fetch_goals', fetch_goals)
+
+    status, body, headers = call(handler, 'GET', '/profiles/p1/dashboard')
+
+    assert status == 200 and body['complete'] is True
+    assert body['profile']['name'] == 'Ada'
+    assert [g['id'] for g in body['goals']] == ['g1']
+    assert [p['id'] for p in body['projects']] == ['x1']
+    assert {name: s['status'] for name, s in body['sections'].items()} == dict.fromkeys(
+        ('profile', 'goals', 'projects'), 'ok'
+    )
+    assert seen[0][:2] == ('p1', 'Bearer p1') and seen[0][2].startswith('fanout')
+    assert headers.get('Cache-Control') != 'no-store'
+
+
+def test_dashboard_returns_partial_results_at_the_deadline(repo, monkeypatch):
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    release = threading.Event()
+
+    def slow_goals(profile_id, authorization, deadline):
+        release.wait(5)
+        return []
+
+    def broken_projects(self, profile_id, **kwargs):
+        raise RuntimeError('throttled')
+
+    monkeypatch.setattr(handler, 'fetch_goals', slow_goals)
+    # sections read through repository.bounded(), a repository of their own
+    monkeypatch.setattr(Repository, 'list_projects', broken_projects)
+    monkeypatch.setattr(handler, 'DASHBOARD_DEADLINE_SECONDS', 0.2)
+    try:
+        status, body, headers = call(handler, 'GET', '/profiles/p1/dashboard')
+    finally:
+        release.set()
+
+    assert status == 200 and body['complete'] is False
+    assert body['profile']['name'] == 'Ada'
+    assert body['goals'] is None and body['sections']['goals'] == {'status': 'timeout'}
+    assert body['projects'] is None
+    assert body['sections']['projects']['status'] == 'error'
+    assert body['sections']['projects']['error'] == 'throttled'
+    assert headers['Cache-Control'] == 'no-store'
+
+
+def test_dashboard_of_a_missing_profile_is_not_found(repo, monkeypatch):
+    monkeypatch.setattr(handler, 'fetch_goals', lambda *args: [])
+    assert call(handler, 'GET', '/profiles/missing/dashboard', headers={'Authorization': 'Bearer missing'})[0] == 404
+
+
+def test_callers_reach_only_their_own_profile(repo, goal_repo, monkeypatch):
+    monkeypatch.setattr(handler, 'fetch_goals', lambda *args: pytest.fail('goals fetched for another profile'))
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    call(handler, 'PUT', '/profiles/p1/projects/x1', {'name': 'Engine'})
+    call(goals, 'PUT', '/profiles/p1/goals/g1', {'title': 'Ship it'})
+    other = {'Authorization': 'Bearer p2'}
+
+    assert call(handler, 'GET', '/profiles/p1/projects', headers=other)[0] == 404
+    assert call(handler, 'PUT', '/profiles/p1/projects/x1', {'name': 'Mine now'}, headers=other)[0] == 404
+    assert call(handler, 'GET', '/profiles/p1/dashboard', headers=other)[0] == 404
+    assert call(goals, 'GET', '/profiles/p1/goals', headers=other)[0] == 404
+    assert call(goals, 'PUT', '/profiles/p1/goals/g1', {'title': 'Mine now'}, headers=other)[0] == 404
+    assert call(goals, 'DELETE', '/profiles/p1/goals/g1', headers=other)[0] == 404
+
+    assert repo.list_projects('p1', summary=False)[0][0]['name'] == 'Engine'
+    assert [g['title'] for g in goal_repo.list_goals('p1')[0]] == ['Ship it']
+
+
+def test_fetch_goals_forwards_the_token_and_bounds_the_call_by_the_deadline(monkeypatch):
+    calls = []
+
+    class Response:
+        def raise_for_status(self):
+            pass
+
+        def json(self):
+            return {'goals': [{'id': 'g1'}], 'next_cursor': None}
+
+    class Http:
+        def get(self, url, **kwargs):
+            calls.append((url, kwargs))
+            return Response()
+
+    monkeypatch.setattr(handler.clients, 'http', Http())
+    monkeypatch.setattr(handler, 'GOALS_API_URL', 'https://goals.example/api')
+
+    goals_found = handler.fetch_goals('p1', 'Bearer t', fanout.Deadline(0.5, clock=lambda: 0.0))
+
+    assert goals_found == [{'id': 'g1'}]
+    url, kwargs = calls[0]
+    assert url == 'https://goals.example/api/profiles/p1/goals'
+    assert kwargs['headers'] == {'Authorization': 'Bearer t'}
+    assert kwargs['timeout'] == (0.5, 0.5)
+
+
+def test_deadline_never_outlives_the_invocation():
+    class Context:
+        def get_remaining_time_in_millis(self):
+            return 700
+
+    deadline = fanout.Deadline.within(1.0, Context(), clock=lambda: 0.0)
+    assert deadline.remaining() == pytest.approx(0.5)
+    assert fanout.Deadline.within(1.0, None, clock=lambda: 0.0).remaining() == 1.0
+
+
+def test_timed_out_sections_are_dropped_or_bounded(monkeypatch):
+    monkeypatch.setattr(fanout, 'MAX_OVERRUNNING', 1)
+    release = threading.Event()
+    started = []
+
+    def stuck(deadline):
+        started.append('stuck')
+        release.wait(5)
+        return 'late'
+
+    def never_started(deadline):
+        started.append('never')
+
+    # nothing is left to run it by the time a worker is free
+    assert fanout._run(never_started, fanout.Deadline(0)) == (fanout.TIMEOUT, None, None, 0.0)
+
+    try:
+        sections = fanout.gather({'stuck': stuck}, fanout.Deadline(0.1))
+        assert sections['stuck'] == {'status': 'timeout', 'data': None}
+        assert fanout.overrunning() == 1
+
+        # the next call answers at once instead of queueing behind it
+        sections = fanout.gather({'other': never_started}, fanout.Deadline(5))
+        assert sections['other']['status'] == 'error'
+        assert sections['other']['error'] == 'fan-out workers are busy'
+    finally:
+        release.set()
+    for _ in range(50):
+        if not fanout.overrunning():
+            break
+        threading.Event().wait(0.02)
+    assert fanout.overrunning() == 0
+    assert started == ['stuck']
+
+
+def test_repository_methods_use_the_thread_safe_client(repo, monkeypatch):
+    # Table resources must stay on one thread; dashboard sections run on several
+    monkeypatch.setattr(Repository, 'table', property(lambda self: pytest.fail('Table used')))
+    repo.put('profile', 'p1', {'name': 'Ada'})
+    repo.put_project('p1', 'x1', {'name': 'Engine'})
+    bounded = repo.bounded(0.5)
+    assert bounded.get('profile', 'p1')['name'] == 'Ada'
+    assert [p['id'] for p in bounded.list_projects('p1')[0]] == ['x1']
+    assert bounded.dynamodb.meta.client.meta.config.read_timeout == 0.5
+    assert bounded.dynamodb.meta.client.meta.config.retries['total_max_attempts'] == 1
+    repo.delete('profile', 'p1')
+    assert repo.get('profile', 'p1') is None
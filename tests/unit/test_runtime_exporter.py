@@ -0,0 +1,119 @@
+import gzip
+import json
+
+import boto3
+import pytest
+
+import auth
+import exporter
+import handler
+import repository
+from repository import Repository
+
+
+@pytest.fixture
+def repo(projects_table, monkeypatch):
+    monkeypatch.setattr(repository, 'backoff', lambda attempt: None)
+    repo = Repository('Projects')
+    monkeypatch.setattr(handler, 'repository', repo)
+    return repo
+
+
+@pytest.fixture
+def s3(projects_table, monkeypatch):
+    client = boto3.client('s3')
+    client.create_bucket(Bucket='exports')
+    monkeypatch.setattr(exporter, 'BUCKET', 'exports')
+    return client
+
+
+def call(method, path, body=None):
+    event = {
+        'httpMethod': method,
+        'path': path,
+        'headers': {'Content-Type': 'application/json', 'Authorization': 'Bearer user-1'},
+        'body': json.dumps(body) if body is not None else None,
+    }
+    response = handler.main(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_parallel_scan_export_writes_gzip_ndjson(repo, s3):
+    repo.batch_write(
+        [repository.storage_item('profile', f'p{i}', {'n': i}, version=1, updated_at='t') for i in range(250)]
+        + [repository.storage_item('user', f'u{i}', {}, version=1, updated_at='t') for i in range(20)]
+    )
+    job = exporter.create_job(repo, 'profile')
+
+    done = exporter.run_export(repo, job['job_id'], 'profile', s3=s3, segments=4)
+
+    assert done['status'] == 'completed'
+    assert done['items'] == 250
+    body = s3.get_object(Bucket='exports', Key=done['key'])['Body'].read()
+    assert len(body) == done['bytes']
+    records = [json.loads(line) for line in gzip.decompress(body).splitlines()]
+    assert sorted(r['n'] for r in records) == list(range(250))
+    assert 'pk' not in records[0]
+    assert s3.list_multipart_uploads(Bucket='exports').get('Uploads') is None
+
+
+def test_failed_export_aborts_the_upload(repo, s3, monkeypatch):
+    job = exporter.create_job(repo, 'profile')
+    monkeypatch.setattr(repo.client, 'scan', lambda **kwargs: (_ for _ in ()).throw(RuntimeError('boom')))
+
+    with pytest.raises(RuntimeError):
+        exporter.run_export(repo, job['job_id'], 'profile', s3=s3, segments=2)
+
+    assert exporter.get_job(repo, job['job_id'])['status'] == 'failed'
+    assert s3.list_multipart_uploads(Bucket='exports').get('Uploads') is None
+
+
+def test_a_job_runs_once_however_often_it_is_delivered(repo, s3, monkeypatch):
+    job = exporter.create_job(repo, 'profile')
+    monkeypatch.setattr(exporter, 'Repository', lambda **kwargs: repo)
+    runs = []
+    real_run = exporter.run_export
+    monkeypatch.setattr(exporter, 'run_export', lambda *args, **kwargs: runs.append(args) or real_run(*args, s3=s3, **kwargs))
+
+    event = {'job_id': job['job_id'], 'entity': 'profile'}
+    assert exporter.main(event, None)['status'] == 'completed'
+    assert exporter.main(event, None)['status'] == 'completed'
+    assert len(runs) == 1
+
+
+def test_export_routes_start_a_job_and_sign_the_download(repo, s3, signed_in, monkeypatch):
+    invoked = []
+    monkeypatch.setattr(exporter, 'FUNCTION_NAME', 'project-export-lambda')
+
+    class FakeLambda:
+        def invoke(self, **kwargs):
+            invoked.append(kwargs)
+
+    monkeypatch.setattr(exporter, 'start', lambda repo, entity, real=exporter.start, **kwargs: real(repo, entity, lambda_client=FakeLambda(), **kwargs))
+    monkeypatch.setattr(exporter, 'download_url', lambda job, real=exporter.download_url: real(job, s3=s3))
+
+    assert call('POST', '/exports', {'entity': 'robot'})[0] == 400
+    status, job = call('POST', '/exports', {'entity': 'profile'})
+    assert status == 202 and job['status'] == 'queued'
+    assert json.loads(invoked[0]['Payload']) == {'job_id': job['job_id'], 'entity': 'profile'}
+    assert invoked[0]['InvocationType'] == 'Event'
+
+    status, pending = call('GET', f"/exports/{job['job_id']}")
+    assert status == 200 and 'download_url' not in pending
+
+    exporter.run_export(repo, job['job_id'], 'profile', s3=s3, segments=2)
+    status, done = call('GET', f"/exports/{job['job_id']}")
+    assert done['status'] == 'completed'
+    assert done['download_url'].startswith('https://exports.s3.amazonaws.com/exports/profile/')
+
+    assert call('GET', '/exports/nope')[0] == 404
+    assert job['requested_by'] == 'user-1'
+    # jobs are only shown to the caller who started them
+    monkeypatch.setattr(auth.verifier, 'verify', lambda token: {'sub': 'user-2'})
+    assert call('GET', f"/exports/{job['job_id']}")[0] == 404
+
+
+def test_export_routes_need_a_token(repo, monkeypatch):
+    monkeypatch.setattr(auth, 'verifier', None)
+    assert call('POST', '/exports', {'entity': 'profile'})[0] == 401
+    assert call('GET', '/exports/any')[0] == 401
@@ -0,0 +1,83 @@
+import datetime
+import decimal
+import json
+
+import pytest
+from boto3.dynamodb.types import Binary
+from flask import Flask, jsonify
+
+import fastjson
+import metrics
+
+ITEM = {
+    'id': 'p1',
+    'version': decimal.Decimal('3'),
+    'score': decimal.Decimal('2.5'),
+    'tags': {'beta', 'alpha'},
+    'counts': {decimal.Decimal('2'), decimal.Decimal('1')},
+    'avatar': Binary(b'\x89PNG'),
+    'raw': b'hi',
+    'updated_at': datetime.datetime(2026, 10, 18, 12, 30, tzinfo=datetime.timezone.utc),
+    'due': datetime.date(2026, 12, 31),
+    'nested': [{'n': decimal.Decimal('10')}],
+}
+
+EXPECTED = {
+    'id': 'p1',
+    'version': 3,
+    'score': 2.5,
+    'tags': ['alpha', 'beta'],
+    'counts': [1, 2],
+    'avatar': 'iVBORw==',
+    'raw': 'aGk=',
+    'updated_at': '2026-10-18T12:30:00+00:00',
+    'due': '2026-12-31',
+    'nested': [{'n': 10}],
+}
+
+
+@pytest.fixture(params=['orjson', 'stdlib'])
+def backend(request, monkeypatch):
+    if request.param == 'orjson':
+        pytest.importorskip('orjson')
+    else:
+        monkeypatch.setattr(fastjson, 'orjson', None)
+    return request.param
+
+
+def test_dynamodb_values_encode_without_a_conversion_pass(backend):
+    body = fastjson.dumps(ITEM)
+    assert isinstance(body, bytes)
+    assert json.loads(body) == EXPECTED
+    assert fastjson.loads(body) == EXPECTED
+    assert fastjson.dumps({'b': 1, 'a': 2}, sort_keys=True) == b'{"a":2,"b":1}'
+
+
+def test_unknown_types_still_fail(backend):
+    with pytest.raises(TypeError):
+        fastjson.dumps({'x': object()})
+
+
+def test_jsonify_builds_the_response_from_bytes(backend):
+    app = fastjson.install(Flask(__name__))
+
+    @app.route('/item')
+    def item():
+        return jsonify(ITEM)
+
+    response = app.test_client().get('/item')
+    assert response.mimetype == 'application/json'
+    assert response.get_data() == fastjson.dumps(ITEM, sort_keys=True) + b'\n'
+    assert app.json.loads(response.get_data()) == EXPECTED
+
+
+def test_timed_provider_still_charges_encoding_to_serialization():
+    app = metrics.install(fastjson.install(Flask(__name__)))
+    assert isinstance(app.json, fastjson.FastJSONProvider)
+    timer = metrics.RequestTimer()
+
+    with app.test_request_context(environ_base={'aws.timer': timer}):
+        response = app.json.response(ITEM)
+
+    assert json.loads(response.get_data()) == EXPECTED
+    assert timer.phases['serialization'] > 0
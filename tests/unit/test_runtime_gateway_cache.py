@@ -0,0 +1,58 @@
+import threading
+
+import pytest
+
+import clients
+import gateway_cache
+
+
+class StubAPIGateway:
+    def __init__(self, started=None, release=None):
+        self.flushes = []
+        self.started = started
+        self.release = release
+
+    def flush_stage_cache(self, **kwargs):
+        if self.started is not None:
+            self.started.set()
+            self.release.wait(5)
+        self.flushes.append(kwargs)
+
+
+@pytest.fixture
+def apigateway(monkeypatch):
+    stub = StubAPIGateway()
+    monkeypatch.setattr(gateway_cache, 'REST_API_ID', 'abc123')
+    monkeypatch.setattr(clients, 'client', lambda service, **kwargs: stub)
+    return stub
+
+
+def test_writes_to_cached_entities_flush_the_stage_in_the_background(apigateway):
+    gateway_cache.on_write('user', 'u1')
+    gateway_cache.on_write('profile', 'p1')
+    # the flush thread runs its work in order
+    gateway_cache.executor().submit(lambda: None).result(5)
+    assert apigateway.flushes == [{'restApiId': 'abc123', 'stageName': 'api'}]
+
+
+def test_writes_during_a_flush_share_the_next_one(apigateway):
+    started, release = threading.Event(), threading.Event()
+    apigateway.started, apigateway.release = started, release
+
+    running = gateway_cache.schedule_flush()
+    assert started.wait(5)
+    # the running flush may have read the item before these writes
+    following = gateway_cache.schedule_flush()
+    assert following is not running
+    assert gateway_cache.schedule_flush() is following
+    apigateway.started = None
+    release.set()
+    running.result(5)
+    following.result(5)
+    assert len(apigateway.flushes) == 2
+
+
+def test_without_a_stage_cache_nothing_is_flushed(monkeypatch):
+    monkeypatch.setattr(gateway_cache, 'REST_API_ID', '')
+    assert gateway_cache.schedule_flush() is None
+    assert gateway_cache.flush() is False
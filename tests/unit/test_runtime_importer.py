@@ -0,0 +1,111 @@
+import json
+
+import boto3
+import pytest
+
+import importer
+import repository
+from repository import Repository
+
+
+@pytest.fixture
+def repo(projects_table, monkeypatch):
+    monkeypatch.setattr(repository, 'backoff', lambda attempt: None)
+    return Repository('Projects')
+
+
+@pytest.fixture
+def bucket(projects_table):
+    s3 = boto3.client('s3')
+    s3.create_bucket(Bucket='imports')
+    return s3
+
+
+def upload(s3, key, lines):
+    s3.put_object(Bucket='imports', Key=key, Body=('\n'.join(lines) + '\n').encode())
+    return importer.S3Source('imports', key, client=s3)
+
+
+def test_read_lines_tracks_byte_offsets_across_chunks():
+    chunks = [b'ab\ncd', b'e\n\nf', b'gh']
+    assert list(importer.read_lines(chunks, 10)) == [
+        (b'ab', 13), (b'cde', 17), (b'', 18), (b'fgh', 21),
+    ]
+
+
+def test_jsonl_import_validates_dedupes_and_completes_once(repo, bucket):
+    lines = [json.dumps({'entity': 'user', 'id': f'u{i}', 'score': 1.5}) for i in range(60)]
+    # a repeat within the same batch: the later record wins
+    lines.insert(1, json.dumps({'entity': 'user', 'id': 'u0', 'score': 2.5}))
+    lines += [
+        json.dumps({'entity': 'robot', 'id': 'r1'}),
+        '{not json',
+        json.dumps({'entity': 'user'}),
+    ]
+    source = upload(bucket, 'users.jsonl', lines)
+
+    result = importer.run_import(source, repo, workers=3)
+
+    assert result['status'] == 'completed'
+    assert result['lines'] == 64
+    assert result['invalid'] == 3
+    assert [e['line'] for e in result['errors']] == [62, 63, 64]
+    assert result['run']['items_per_second'] > 0
+    user = repo.get('user', 'u0')
+    assert user['score'] == 2.5 and user['version'] == result['version']
+    assert len(repo.list('user', limit=100)[0]) == 60
+
+    again = importer.run_import(source, repo)
+    assert again['status'] == 'completed' and 'run' not in again
+
+
+def test_stopped_import_resumes_from_its_checkpoint(repo, bucket, monkeypatch):
+    source = upload(bucket, 'profiles.jsonl', [
+        json.dumps({'id': f'p{i:03d}', 'name': f'Profile {i}'}) for i in range(100)
+    ])
+    ranges = []
+    real_get = bucket.get_object
+    monkeypatch.setattr(bucket, 'get_object', lambda **kw: ranges.append(kw.get('Range')) or real_get(**kw))
+
+    first = importer.run_import(source, repo, entity='profile', should_stop=lambda: True)
+    assert first['status'] == 'running'
+    assert first['written'] == 25
+    assert importer.load_checkpoint(repo, first['job_id'])['offset'] == first['offset']
+
+    second = importer.run_import(source, repo, should_stop=lambda: False)
+    assert second['status'] == 'completed'
+    assert second['written'] == 100
+    assert second['run']['written'] == 75
+    assert ranges == [None, f"bytes={first['offset']}-"]
+    assert len(repo.list('profile', limit=100)[0]) == 100
+
+
+def test_csv_file_import_uses_the_header_row(repo, tmp_path):
+    path = tmp_path / 'profiles.csv'
+    path.write_bytes(b'\xef\xbb\xbfid,name,bio\r\np1,Ada,"likes, commas"\r\np2,Grace,\r\np3,bad\r\n')
+
+    result = importer.run_import(importer.FileSource(str(path)), repo, entity='profile')
+
+    assert result['status'] == 'completed'
+    assert result['columns'] == ['id', 'name', 'bio']
+    assert result['invalid'] == 1
+    assert repo.get('profile', 'p1')['bio'] == 'likes, commas'
+    assert 'bio' not in repo.get('profile', 'p2')
+
+
+def test_records_dynamodb_cannot_store_are_invalid_not_fatal(repo, bucket):
+    source = upload(bucket, 'odd.jsonl', [
+        json.dumps({'entity': 'user', 'id': 'u1'}),
+        '{"entity": "user", "id": "u2", "score": NaN}',
+        json.dumps({'entity': 'user', 'id': 'u3', 'bio': 'x' * 410 * 1024}),
+        '{"entity": "user", "id": "u4", "score": -Infinity}',
+        json.dumps({'entity': 'user', 'id': 'u5'}),
+    ])
+
+    result = importer.run_import(source, repo, workers=2)
+
+    assert result['status'] == 'completed'
+    assert result['written'] == 2 and result['invalid'] == 3
+    assert sorted(e['line'] for e in result['errors']) == [2, 3, 4]
+    assert 'NaN' in result['errors'][0]['error']
+    assert [u['id'] for u in repo.list('user')[0]] == ['u1', 'u5']
@@ -0,0 +1,27 @@
+import os
+import subprocess
+import sys
+
+import lazy
+
+
+def test_lazy_module_imports_on_first_attribute_access():
+    module = lazy.LazyModule('colorsys')
+    assert not lazy.is_loaded(module)
+    assert module.rgb_to_hsv(0, 0, 0) == (0.0, 0.0, 0.0)
+    assert lazy.is_loaded(module)
+
+
+def test_handler_import_does_not_load_heavy_sdks():
+    probe = (
+        'import sys, handler; '
+        'print(",".join(m for m in ("boto3", "requests") if m in sys.modules))'
+    )
+    output = subprocess.run(
+        [sys.executable, '-c', probe],
+        cwd=os.path.dirname(lazy.__file__),
+        capture_output=True,
+        text=True,
+        check=True,
+    ).stdout.strip()
+    assert output == ''
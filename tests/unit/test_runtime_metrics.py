@@ -0,0 +1,115 @@
+import base64
+import io
+import json
+from types import SimpleNamespace
+
+import pytest
+from flask import Flask
+
+import adapter
+import handler
+import metrics
+
+
+def make_event(path, method='GET'):
+    return {
+        'path': path,
+        'httpMethod': method,
+        'headers': {'Host': 'api.example.com'},
+        'multiValueHeaders': {'Host': ['api.example.com']},
+        'requestContext': {'identity': {'sourceIp': '203.0.113.9'}},
+    }
+
+
+@pytest.fixture
+def records(monkeypatch):
+    stream = io.StringIO()
+    monkeypatch.setattr(metrics, 'stream', stream)
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', True)
+    monkeypatch.setattr(metrics, 'SERVER_TIMING', True)
+
+    def read():
+        return [json.loads(line) for line in stream.getvalue().splitlines()]
+    return read
+
+
+def test_timer_charges_laps_to_phases():
+    timer = metrics.RequestTimer(clock=lambda: 10.0)
+    timer.lap('adapter', now=10.001)
+    timer.lap('routing', now=10.003)
+    timer.lap('handler', now=10.006)
+    timer.lap('serialization', now=10.010)
+    timer.lap('handler', now=10.011)
+
+    assert timer.phases['handler'] == pytest.approx(0.004)
+    assert timer.total == pytest.approx(0.011)
+    assert timer.server_timing() == (
+        'adapter;dur=1.00, routing;dur=2.00, handler;dur=4.00, serialization;dur=4.00, total;dur=11.00'
+    )
+
+
+def test_request_emits_emf_record_and_server_timing(records):
+    context = SimpleNamespace(aws_request_id='req-1')
+    response = adapter.handle(handler.app, make_event('/'), context)
+
+    timing = response['multiValueHeaders']['Server-Timing'][0]
+    assert [part.split(';')[0] for part in timing.split(', ')] == list(metrics.PHASES) + ['total']
+
+    [record] = records()
+    directive = record['_aws']['CloudWatchMetrics'][0]
+    assert directive['Dimensions'] == [['Service', 'Route'], ['Service']]
+    assert {m['Name'] for m in directive['Metrics']} >= {'Latency', 'ResponseSize', 'ColdStart'}
+    assert record['Route'] == 'GET /'
+    assert record['StatusCode'] == 200
+    assert record['ResponseSize'] == len(response['body'])
+    assert record['RequestId'] == 'req-1'
+    assert record['serializationMs'] > 0
+
+
+def test_response_size_counts_the_bytes_sent(records):
+    app = metrics.install(Flask(__name__))
+
+    @app.route('/text')
+    def text():
+        return 'héllo ' * 1000
+
+    event = make_event('/text')
+    adapter.handle(app, event)
+    event['multiValueHeaders']['Accept-Encoding'] = ['gzip']
+    compressed = adapter.handle(app, event)
+
+    plain_record, compressed_record = records()
+    assert plain_record['ResponseSize'] == len('héllo '.encode() * 1000)
+    assert compressed_record['ResponseSize'] == len(base64.b64decode(compressed['body']))
+
+
+def test_unmatched_routes_share_one_dimension_value(records):
+    response = adapter.handle(handler.app, make_event('/nope'))
+
+    assert response['statusCode'] == 404
+    [record] = records()
+    assert record['Route'] == 'GET UNMATCHED'
+    assert record['ClientError'] == 1
+
+
+def test_only_the_first_request_is_a_cold_start(records, monkeypatch):
+    monkeypatch.setattr(metrics, '_cold_start', True)
+    adapter.handle(handler.app, make_event('/'))
+    adapter.handle(handler.app, make_event('/'))
+
+    assert [r['ColdStart'] for r in records()] == [1, 0]
+
+
+def test_switches_turn_off_records_and_header(records, monkeypatch):
+    monkeypatch.setattr(metrics, 'METRICS_ENABLED', False)
+    monkeypatch.setattr(metrics, 'SERVER_TIMING', False)
+    response = adapter.handle(handler.app, make_event('/'))
+
+    assert 'Server-Timing' not in response['multiValueHeaders']
+    assert records() == []
+
+
+def test_warmup_requests_are_not_instrumented(records):
+    adapter.handle(handler.app, make_event('/'), instrument=False)
+
+    assert records() == []
@@ -0,0 +1,192 @@
+import decimal
+import json
+
+import pytest
+
+import handler
+import repository
+from repository import Repository
+
+
+@pytest.fixture
+def repo(projects_table, signed_in, monkeypatch):
+    monkeypatch.setattr(repository, 'backoff', lambda attempt: None)
+    repo = Repository('Projects')
+    repo.write_listeners.append(handler.invalidate_item)
+    monkeypatch.setattr(handler, 'repository', repo)
+    handler.item_cache.clear()
+    return repo
+
+
+def call(method, path, body=None, query=None):
+    event = {
+        'httpMethod': method,
+        'path': path,
+        'headers': {'Content-Type': 'application/json', 'Authorization': 'Bearer user-1'},
+        'queryStringParameters': query,
+        'body': json.dumps(body) if body is not None else None,
+        'isBase64Encoded': False,
+    }
+    response = handler.main(event, None)
+    return response['statusCode'], json.loads(response['body'])
+
+
+def test_put_bumps_version_and_strips_storage_keys(repo):
+    first = repo.put('profile', 'p1', {'name': 'Ada', 'version': 99})
+    second = repo.put('profile', 'p1', {'name': 'Ada L.'})
+    assert first['version'] == 1
+    assert second['version'] == 2
+    assert second['name'] == 'Ada L.'
+    assert 'pk' not in second and 'gsi1pk' not in second
+    assert repo.get('profile', 'p1') == second
+
+
+def test_list_pages_through_the_index_without_mixing_entities(repo):
+    for i in range(5):
+        repo.put('user', f'u{i}', {'name': f'User {i}'})
+    repo.put('profile', 'p1', {'name': 'not a user'})
+
+    page, cursor = repo.list('user', limit=3)
+    assert len(page) == 3 and cursor
+    rest, cursor = repo.list('user', limit=3, cursor=cursor)
+    assert cursor is None
+    assert sorted(u['id'] for u in page + rest) == [f'u{i}' for i in range(5)]
+
+
+def test_batch_write_and_get_chunk_and_retry_unprocessed(repo, monkeypatch):
+    items = [{**repository.key('user', f'u{i}'), 'id': f'u{i}'} for i in range(60)]
+    calls = []
+    real_write = repo.client.batch_write_item
+
+    def flaky_write(RequestItems):
+        calls.append(len(RequestItems['Projects']))
+        if len(calls) == 1:
+            # pretend the last request of the first chunk was throttled
+            head, tail = RequestItems['Projects'][:-1], RequestItems['Projects'][-1:]
+            real_write(RequestItems={'Projects': head})
+            return {'UnprocessedItems': {'Projects': tail}}
+        return real_write(RequestItems=RequestItems)
+
+    monkeypatch.setattr(repo.client, 'batch_write_item', flaky_write)
+    repo.batch_write(items)
+    assert calls == [25, 1, 25, 10]
+
+    keys = [repository.key('user', f'u{i}') for i in range(60)] * 2
+    found = repo.batch_get(keys[:150])
+    assert {item['id'] for item in found} == {f'u{i}' for i in range(60)}
+
+
+def test_routes_are_backed_by_the_table(repo):
+    assert call('GET', '/users/u1')[0] == 404
+
+    status, body = call('PUT', '/users/u1', {'name': 'Grace'})
+    assert status == 200 and body['version'] == 1
+
+    status, body = call('GET', '/users/u1')
+    assert status == 200 and body['name'] == 'Grace'
+
+    status, body = call('GET', '/users', query={'limit': '10'})
+    assert [u['id'] for u in body['users']] == ['u1']
+    assert body['next_cursor'] is None
+
+    assert call('PUT', '/profiles/p1', None)[0] == 400
+
+
+def test_malformed_cursors_and_float_values_are_client_input_not_errors(repo):
+    for cursor in ('garbage!!', 'bm90IGpzb24', 'MTIz'):
+        status, body = call('GET', '/users', query={'cursor': cursor})
+        assert status == 400 and body['error'] == 'invalid cursor'
+
+    # well-formed, but not a start key of the users list
+    forged = [
+        {'pk': 'USER#u1'},
+        {'pk': 'USER#u1', 'sk': 'META', 'gsi1pk': 'USERS', 'gsi1sk': 1},
+        {'pk': 'USER#u1', 'sk': 'META', 'gsi1pk': 'PROFILES', 'gsi1sk': 'PROFILE#p1'},
+        {'pk': 'USER#u1', 'sk': 'META', 'gsi1pk': 'USERS', 'gsi1sk': 'USER#u1', 'extra': 'x'},
+    ]
+    for start_key in forged:
+        status, body = call('GET', '/users', query={'cursor': repository.encode_cursor(start_key)})
+        assert status == 400 and body['error'] == 'invalid cursor'
+
+    status, body = call('PUT', '/users/u1', {'score': 1.5, 'nested': {'ratio': [0.1, 2]}})
+    assert status == 200 and body['score'] == 1.5 and body['nested'] == {'ratio': [0.1, 2]}
+    assert repo.get('user', 'u1')['nested']['ratio'][0] == decimal.Decimal('0.1')
+
+
+def test_item_reads_are_cached_and_invalidated_by_writes(repo, monkeypatch):
+    call('PUT', '/profiles/p1', {'name': 'Ada'})
+    reads = []
+    real_get = repo.get
+    monkeypatch.setattr(repo, 'get', lambda *args: reads.append(args) or real_get(*args))
+
+    assert call('GET', '/profiles/p1')[1]['name'] == 'Ada'
+    assert call('GET', '/profiles/p1')[1]['name'] == 'Ada'
+    assert len(reads) == 1
+
+    call('PUT', '/profiles/p1', {'name': 'Ada L.'})
+    assert call('GET', '/profiles/p1')[1]['name'] == 'Ada L.'
+    assert len(reads) == 2
+
+    assert call('GET', '/profiles/missing')[0] == 404
+    assert call('GET', '/profiles/missing')[0] == 404
+    assert len(reads) == 3
+
+
+def test_cache_control_max_age_zero_bypasses_the_item_cache(repo, monkeypatch):
+    call('PUT', '/profiles/p1', {'name': 'Ada'})
+    reads = []
+    real_get = repo.get
+    monkeypatch.setattr(repo, 'get', lambda *args: reads.append(args) or real_get(*args))
+
+    call('GET', '/profiles/p1')
+    event = {
+        'httpMethod': 'GET',
+        'path': '/profiles/p1',
+        'headers': {'Cache-Control': 'max-age=0', 'Authorization': 'Bearer user-1'},
+        'body': None,
+    }
+    assert handler.main(event, None)['statusCode'] == 200
+    assert len(reads) == 2
+
+
+def test_get_many_fans_out_chunks_and_keeps_request_order(repo, monkeypatch):
+    repo.batch_write([{**repository.key('user', f'u{i}'), 'id': f'u{i}'} for i in range(250)])
+    calls = []
+    real_get = repo.client.batch_get_item
+
+    def flaky_get(RequestItems):
+        keys = RequestItems['Projects']['Keys']
+        calls.append(len(keys))
+        if len(keys) == 100 and keys[0]['pk'] == 'USER#u259':
+            # pretend the tail of the first chunk was throttled
+            response = real_get(RequestItems={'Projects': {'Keys': keys[:90]}})
+            response['UnprocessedKeys'] = {'Projects': {'Keys': keys[90:]}}
+            return response
+        return real_get(RequestItems=RequestItems)
+
+    monkeypatch.setattr(repo.client, 'batch_get_item', flaky_get)
+    ids = [f'u{i}' for i in reversed(range(260))] + ['u5']
+    found = repo.get_many('user', ids)
+
+    assert sorted(calls) == [10, 60, 100, 100]
+    assert [item and item['id'] for item in found] == [None] * 10 + ids[10:]
+    assert 'pk' not in found[-1]
+
+
+def test_batch_get_route_returns_items_in_order_with_misses(repo, monkeypatch):
+    call('PUT', '/profiles/p1', {'name': 'Ada'})
+    call('PUT', '/profiles/p2', {'name': 'Grace'})
+    call('GET', '/profiles/p1')
+    fetched = []
+    real_get_many = repo.get_many
+    monkeypatch.setattr(repo, 'get_many', lambda entity, ids: fetched.append(ids) or real_get_many(entity, ids))
+
+    status, body = call('POST', '/profiles:batchGet', {'ids': ['p2', 'nope', 'p1', 'p2', 'nope']})
+    assert status == 200
+    assert [p and p['name'] for p in body['profiles']] == ['Grace', None, 'Ada', 'Grace', None]
+    assert body['missing'] == ['nope']
+    # p1 came from the item cache, repeated ids were fetched once
+    assert fetched == [['p2', 'nope']]
+
+    assert call('POST', '/profiles:batchGet', {'ids': 'p1'})[0] == 400
+    assert call('POST', '/users:batchGet', {'ids': ['u'] * 501})[0] == 400
@@ -0,0 +1,76 @@
+import os
+import subprocess
+import sys
+
+import pytest
+from flask import Flask, jsonify
+
+import handler
+import schemas
+from app_components.project_svc_backend.api.routes import gateway_path, load_app, routes
+
+
+def test_validate_reports_every_violation_with_its_location():
+    assert schemas.validate({'ids': ['a', 'b']}, schemas.BATCH_GET) == []
+    assert schemas.validate(None, schemas.BATCH_GET) == ['body must be of type object']
+    assert schemas.validate({}, schemas.BATCH_GET) == ['body.ids is required']
+    assert schemas.validate({'ids': ['a', '', 3]}, schemas.BATCH_GET) == [
+        'body.ids[1] must be at least 1 characters',
+        'body.ids[2] must be of type string',
+    ]
+    assert schemas.validate({'ids': ['a'] * 501}, schemas.BATCH_GET) == ['body.ids must have at most 500 items']
+    assert schemas.validate({'entity': 'robot'}, handler.EXPORT_REQUEST) == ['body.entity must be one of user, profile']
+    assert schemas.validate(True, {'type': 'integer'}) == ['body must be of type integer']
+    assert schemas.validate(None, {'type': ['string', 'null']}) == []
+
+
+@pytest.mark.parametrize('at_gateway, expected', [(False, 400), (True, 200)])
+def test_route_checks_the_body_only_when_the_gateway_did_not(monkeypatch, at_gateway, expected):
+    monkeypatch.setattr(schemas, 'VALIDATED_AT_GATEWAY', at_gateway)
+    app = Flask(__name__)
+
+    @app.route('/batch', methods=['POST'])
+    @schemas.route(body=schemas.BATCH_GET)
+    def batch():
+        return jsonify(ok=True)
+
+    assert batch.schemas.body is schemas.BATCH_GET
+    assert app.test_client().post('/batch', json={'ids': 'p1'}).status_code == expected
+
+
+def test_routes_carry_the_declared_schemas_in_gateway_form():
+    found = {(route.method, route.path): route for route in routes(load_app())}
+
+    assert gateway_path('/profiles/<profile_id>/projects/<int:n>') == '/profiles/{profile_id}/projects/{n}'
+    batch_get = found[('POST', '/profiles:batchGet')]
+    assert batch_get.body is schemas.BATCH_GET
+    assert batch_get.responses[200]['title'] == 'ProfilesBatchResult'
+    assert found[('GET', '/profiles')].request_parameters() == {
+        'method.request.querystring.limit': False,
+        'method.request.querystring.cursor': False,
+        'method.request.header.Authorization': False,
+    }
+    assert found[('PUT', '/profiles/{profile_id}/projects/{project_id}')].request_parameters() == {
+        'method.request.path.profile_id': True,
+        'method.request.path.project_id': True,
+        'method.request.header.Authorization': False,
+    }
+    assert found[('GET', '/users')].request_parameters() == {
+        'method.request.querystring.limit': False,
+        'method.request.querystring.cursor': False,
+    }
+    assert found[('GET', '/')].body is None
+
+
+def test_load_app_leaves_no_runtime_modules_behind():
+    # the runtime tests import those modules already, so check in a fresh interpreter
+    script = (
+        'import sys\n'
+        'from app_components.project_svc_backend.api.routes import RUNTIME_DIR, load_app, routes\n'
+        'assert routes(load_app())\n'
+        'left = [m for m in ("handler", "auth", "cache", "clients", "metrics") if m in sys.modules]\n'
+        'assert not left and RUNTIME_DIR not in sys.path, left\n'
+    )
+    root = os.path.join(os.path.dirname(__file__), '..', '..')
+    completed = subprocess.run([sys.executable, '-c', script], cwd=root, capture_output=True, text=True)
+    assert completed.returncode == 0, completed.stderr
@@ -0,0 +1,39 @@
+import sys
+
+import auth
+import handler
+import warmup
+
+
+def test_prewarm_loads_sdks_without_calling_aws(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+    handler.prewarm()
+    assert 'boto3' in sys.modules and 'requests' in sys.modules
+    assert handler.repository._dynamodb is not None
+    assert len(handler.item_cache) == 0
+
+
+def test_prewarm_survives_an_unreachable_jwks_endpoint(monkeypatch):
+    monkeypatch.setenv('AWS_DEFAULT_REGION', 'us-east-1')
+
+    def unreachable(url):
+        raise ConnectionError('jwks endpoint unreachable')
+
+    jwks = auth.JWKSCache('https://issuer.example/.well-known/jwks.json', fetch=unreachable)
+    monkeypatch.setattr(auth, 'verifier', auth.TokenVerifier('https://issuer.example', ['web-client'], jwks=jwks))
+    handler.prewarm()
+    assert len(handler.item_cache) == 0
+
+
+def test_hooks_run_during_init_under_provisioned_concurrency(monkeypatch):
+    calls = []
+    monkeypatch.setattr(warmup, '_before_snapshot', [lambda: calls.append('before')])
+    monkeypatch.setattr(warmup, '_after_restore', [lambda: calls.append('after')])
+
+    monkeypatch.setattr(warmup, 'INIT_TYPE', 'on-demand')
+    warmup.install()
+    assert calls == []
+
+    monkeypatch.setattr(warmup, 'INIT_TYPE', 'provisioned-concurrency')
+    warmup.install()
+    assert calls == ['before']